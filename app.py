@@ -13,12 +13,26 @@ if 'src.utils' in sys.modules:
     importlib.reload(utils)
 
 from src.notion_integration import NotionIntegration, format_database_id
-from src.view_scraper_selenium import ViewScraperSelenium
+from src.view_scraper import ViewScraper
+from src.browser_worker import SupervisedBrowser
+from src.tiered_scraper import TieredScraper
+from src.scrape_cache import ScrapeCache
+from src.refresh_policy import RefreshPolicy
+from src.circuit_breaker import CircuitBreaker
+from src.scrape_metrics import ScrapeMetrics
+from src.endpoints import EndpointStrategy
+from src.rate_controller import RateController
+from src.retry_queue import RetryQueue
+from src.settlement_ledger import SettlementLedger
 from src.utils import SettlementCalculator, DataStorage, format_number
 from src.i18n import get_text, LANGUAGE_OPTIONS, translate_ugc_type
 import src.ui as ui
 import pandas as pd
 from datetime import datetime
+from typing import Optional
+import json
+import math
+import os
 import traceback
 
 
@@ -112,6 +126,32 @@ def main():
             step=0.5,
             help=get_text("scrape_delay_help", lang)
         )
+        cache_ttl = st.slider(
+            get_text("cache_ttl", lang),
+            min_value=0.0,
+            max_value=48.0,
+            value=6.0,
+            step=1.0,
+            help=get_text("cache_ttl_help", lang)
+        )
+        fetch_workers = st.slider(
+            get_text("fetch_workers", lang),
+            min_value=1,
+            max_value=8,
+            value=4,
+            step=1,
+            help=get_text("fetch_workers_help", lang)
+        )
+        run_budget = st.slider(
+            get_text("run_budget", lang),
+            min_value=0,
+            max_value=120,
+            value=0,
+            step=5,
+            help=get_text("run_budget_help", lang)
+        )
+        hedge = st.checkbox(get_text("hedge_requests", lang), value=False,
+                            help=get_text("hedge_requests_help", lang))
 
         st.divider()
 
@@ -161,7 +201,7 @@ def main():
 
     # Tab 1: 更新Notion Views
     with tab1:
-        show_update_views_page(scrape_delay, lang)
+        show_update_views_page(scrape_delay, cache_ttl, fetch_workers, run_budget, hedge, lang)
 
     # Tab 2: 结算计算
     with tab2:
@@ -176,7 +216,8 @@ def main():
         show_system_info_page(lang)
 
 
-def show_update_views_page(scrape_delay: float, lang: str = "zh"):
+def show_update_views_page(scrape_delay: float, cache_ttl: float, fetch_workers: int = 1,
+                           run_budget: float = 0, hedge: bool = False, lang: str = "zh"):
     """显示更新Views页面"""
 
     st.header(get_text("update_views_header", lang))
@@ -196,9 +237,20 @@ def show_update_views_page(scrape_delay: float, lang: str = "zh"):
         st.info(f"⏱️ {delay_text}: {scrape_delay}" + ("s" if lang == "en" else "秒"))
 
     with col2:
+        # 默认只刷新到期的视频；勾选后全部重新爬取
+        full_refresh = st.checkbox(get_text("full_refresh", lang), value=False,
+                                   help=get_text("full_refresh_help", lang))
+
         # 开始更新按钮
         if st.button(get_text("start_batch_update", lang), type="primary", use_container_width=True):
-            start_batch_update(scrape_delay, lang)
+            start_batch_update(scrape_delay, cache_ttl, full_refresh, fetch_workers, run_budget, hedge, lang)
+
+        # 只重试上次失败的视频行
+        queued = len(RetryQueue())
+        if st.button(get_text("retry_failures", lang, count=queued), use_container_width=True,
+                     disabled=queued == 0, help=get_text("retry_failures_help", lang)):
+            start_batch_update(scrape_delay, cache_ttl, False, fetch_workers, run_budget, hedge, lang,
+                               retry_only=True)
 
     st.divider()
 
@@ -209,8 +261,14 @@ def show_update_views_page(scrape_delay: float, lang: str = "zh"):
                 st.text(log)
 
 
-def start_batch_update(scrape_delay: float, lang: str = "zh"):
-    """开始批量更新"""
+def start_batch_update(scrape_delay: float, cache_ttl: float, full_refresh: bool = False,
+                       fetch_workers: int = 1, run_budget: float = 0, hedge: bool = False, lang: str = "zh",
+                       retry_only: bool = False):
+    """
+    开始批量更新（run_budget 为爬取阶段的时间预算，单位分钟，0为不限制）
+
+    retry_only 为True时只重试失败队列中的视频行（忽略重试时间）
+    """
 
     # 清空之前的日志
     st.session_state.debug_logs = []
@@ -224,19 +282,80 @@ def start_batch_update(scrape_delay: float, lang: str = "zh"):
         # 初始化
         status_text.text(get_text("initializing", lang))
         notion = NotionIntegration(st.session_state.notion_token)
-        scraper = ViewScraperSelenium(delay=scrape_delay, headless=True)
+        # HTTP优先，浏览器只在HTTP失败时启动；两级共用一个指标收集器
+        metrics = ScrapeMetrics()
+        # 先试嵌入页/JSON接口等轻量端点，记住每个平台哪个端点有效
+        endpoints = EndpointStrategy()
+        # 每个平台的请求间隔和并发数自动调整：侧边栏的延迟和并发数只作为上限
+        rate_controller = RateController(max_delay=scrape_delay, max_concurrency=fetch_workers)
+        scraper = TieredScraper(
+            fast_scraper=ViewScraper(delay=scrape_delay, metrics=metrics, hedge=hedge, endpoints=endpoints,
+                                     rate_controller=rate_controller),
+            # 浏览器在受监督的子进程中运行：打开页面过多或内存过高时主动重启，崩溃后重新爬取正在爬取的链接；
+            # 每个子进程一个Chrome（不超过2个），并发下载数分到各个Chrome的标签页中
+            browser_scraper=SupervisedBrowser(workers=min(fetch_workers, 2),
+                                              tabs=math.ceil(fetch_workers / min(fetch_workers, 2)),
+                                              delay=scrape_delay, headless=True,
+                                              metrics=metrics, rate_controller=rate_controller)
+        )
+        # 浏览器在后台启动，与下面读取Notion创作者和视频表并行
+        scraper.prelaunch()
+        # 有效期内的结果直接复用（例如上次中途失败的运行），已删除/私密视频按退避时间跳过
+        cache = ScrapeCache(ttl_hours=cache_ttl)
+
+        # 按视频日期和播放量增长决定是否刷新，已结算月份的视频冻结
+        refresh_policy = None
+        if not full_refresh:
+            storage = DataStorage()
+            refresh_policy = RefreshPolicy(
+                settled_months=RefreshPolicy.settled_months_from_records(storage.list_settlement_records())
+            )
+
+        # 平台持续返回登录墙/限流页时暂停该平台，其链接推迟到最后再探测
+        breaker = CircuitBreaker()
+
+        # 失败的视频行进入重试队列，本轮结束时自动重试一次，之后可以只重试队列
+        retry_queue = RetryQueue()
+
+        # 每写回一行新的播放量，按差值更新按月的结算汇总（结算页面的实时结算）
+        ledger = SettlementLedger()
 
         # 开始批量更新
         status_text.text(get_text("batch_updating", lang))
-        stats = notion.batch_update_all_creators(
-            master_db_id=st.session_state.master_db_id,
-            scraper=scraper,
-            delay=scrape_delay
-        )
+        if retry_only:
+            stats = notion.retry_failed_videos(
+                master_db_id=st.session_state.master_db_id,
+                scraper=scraper,
+                retry_queue=retry_queue,
+                cache=cache,
+                breaker=breaker,
+                fetch_workers=fetch_workers,
+                run_budget=run_budget * 60 if run_budget else None,
+                force=True,
+                ledger=ledger
+            )
+        else:
+            stats = notion.batch_update_all_creators(
+                master_db_id=st.session_state.master_db_id,
+                scraper=scraper,
+                delay=scrape_delay,
+                cache=cache,
+                refresh_policy=refresh_policy,
+                breaker=breaker,
+                fetch_workers=fetch_workers,
+                run_budget=run_budget * 60 if run_budget else None,
+                retry_queue=retry_queue,
+                ledger=ledger
+            )
 
         # 关闭浏览器
         scraper.close()
 
+        # 保存爬取指标（系统信息页显示，Prometheus文本供外部采集）和端点记录
+        metrics.save()
+        endpoints.save()
+        rate_controller.save()
+
         # 保存日志
         st.session_state.debug_logs = notion.debug_info
 
@@ -257,7 +376,8 @@ def start_batch_update(scrape_delay: float, lang: str = "zh"):
                 st.metric(get_text("tables_found", lang), f"{stats['tables_found']}")
 
             with col3:
-                st.metric(get_text("videos_updated", lang), f"{stats['videos_updated']}")
+                st.metric(get_text("videos_updated", lang), f"{stats['videos_updated']}",
+                          help=get_text("videos_skipped", lang, count=stats.get('videos_skipped', 0)))
 
             with col4:
                 st.metric(get_text("total_views", lang), format_number(stats['total_views']))
@@ -308,7 +428,7 @@ def start_batch_update(scrape_delay: float, lang: str = "zh"):
         storage = DataStorage()
         storage.save_update_log({
             'timestamp': datetime.now().isoformat(),
-            'action': 'batch_update',
+            'action': 'retry_failures' if retry_only else 'batch_update',
             'details': stats
         })
 
@@ -356,12 +476,28 @@ def show_settlement_page(lang: str = "zh"):
             index=current_month - 1
         )
 
+    # 季度、年度结算：一次读取数据，计算并保存范围内每个月的结算
+    settle_range = st.checkbox(get_text("settle_range", lang), help=get_text("settle_range_help", lang))
+    end_year, end_month = year, month
+    if settle_range:
+        col_a, col_b, _ = st.columns([1, 1, 2])
+        with col_a:
+            year_options = list(range(current_year - 2, current_year + 1))
+            end_year = st.selectbox(get_text("end_year", lang), options=year_options,
+                                    index=year_options.index(year))
+        with col_b:
+            end_month = st.selectbox(get_text("end_month", lang), options=list(range(1, 13)),
+                                     index=month - 1)
+
     with col3:
         if st.button(get_text("calculate_settlement", lang), type="primary", use_container_width=True):
-            calculate_settlement(year, month, lang)
+            calculate_settlement(year, month, lang, end_year, end_month)
 
     st.divider()
 
+    # 截至目前的实时结算（来自批量更新时持续维护的汇总，不读取Notion）
+    show_live_settlement(year, month, lang)
+
     # 显示结算明细
     storage = DataStorage()
     settlement_df = storage.load_settlement_record(year, month)
@@ -410,12 +546,72 @@ def show_settlement_page(lang: str = "zh"):
             mime="text/csv"
         )
 
+        # 费率方案对比：按配置中的候选费率表重新计算本月结算（不需要重新读取Notion）
+        show_rate_scenarios(settlement_df, lang)
+
     else:
         st.info(get_text("no_records", lang, year=year, month=month))
 
 
-def calculate_settlement(year: int, month: int, lang: str = "zh"):
-    """计算结算"""
+def show_live_settlement(year: int, month: int, lang: str = "zh"):
+    """显示按持续更新的汇总计算的本月截至目前的结算"""
+    ledger = SettlementLedger()
+    try:
+        live_df = SettlementCalculator().calculate_live_settlement(ledger, year, month)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    with st.expander(get_text("live_settlement", lang, year=year, month=month), expanded=not live_df.empty):
+        if live_df.empty:
+            st.info(get_text("no_live_settlement", lang))
+            return
+
+        updated_at = ledger.updated_at[:16].replace('T', ' ') if ledger.updated_at else '-'
+        st.caption(get_text("live_settlement_help", lang, time=updated_at))
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric(get_text("total_creators", lang), len(live_df))
+        with col2:
+            st.metric(get_text("total_videos", lang), int(live_df['video_count'].sum()))
+        with col3:
+            st.metric(get_text("total_views", lang), format_number(live_df['total_views'].sum()))
+        with col4:
+            st.metric(get_text("total_settlement", lang), f"${live_df['total'].sum():.2f}")
+
+        st.dataframe(live_df, use_container_width=True, hide_index=True)
+
+
+def show_rate_scenarios(settlement_df: pd.DataFrame, lang: str = "zh"):
+    """显示候选费率表下的结算总额对比（费率配置中没有 scenarios 时不显示）"""
+    try:
+        calculator = SettlementCalculator()
+    except ValueError as e:
+        st.error(str(e))
+        return
+    if not calculator.rates.scenarios:
+        return
+
+    comparison = calculator.compare_rate_tables(settlement_df)
+    with st.expander(get_text("rate_scenarios", lang)):
+        st.caption(get_text("rate_scenarios_help", lang))
+        columns = st.columns(len(calculator.rates.scenarios) + 1)
+        with columns[0]:
+            st.metric(get_text("current_rates", lang), f"${comparison['total'].sum():.2f}")
+        for column, name in zip(columns[1:], calculator.rates.scenarios):
+            with column:
+                difference = comparison[name].sum() - comparison['total'].sum()
+                st.metric(name, f"${comparison[name].sum():.2f}", delta=f"{difference:+.2f}")
+        st.dataframe(comparison, use_container_width=True, hide_index=True)
+
+
+def calculate_settlement(year: int, month: int, lang: str = "zh", end_year: Optional[int] = None,
+                         end_month: Optional[int] = None):
+    """计算结算（指定结束月份时一次计算并保存范围内每个月的结算）"""
+
+    end_year = year if end_year is None else end_year
+    end_month = month if end_month is None else end_month
 
     progress_bar = st.progress(0)
     status_text = st.empty()
@@ -428,63 +624,47 @@ def calculate_settlement(year: int, month: int, lang: str = "zh"):
         calculator = SettlementCalculator()
         storage = DataStorage()
 
-        # 获取所有创作者
+        # 读取所有创作者的视频并按月份建立索引（只读取一次，范围内的每个月直接查表）
         progress_bar.progress(20)
-        creators = notion.get_all_creators(st.session_state.master_db_id)
-
-        # 收集数据
-        progress_bar.progress(40)
-        status_text.text(get_text("processing_data", lang))
-
-        creators_data = []
-        for creator in creators:
-            creator_id = creator['id']
-            creator_name = creator['name']
-            creator_label = creator.get('label', '')  # 从Notion获取Label字段
-
-            # 查找子数据库
-            child_dbs = notion.find_child_databases(creator_id)
-
-            videos = []
-            for child_db in child_dbs:
-                # 检测字段
-                link_fields, views_field = notion.detect_fields(child_db['id'])
-
-                if not views_field:
-                    continue
-
-                # 获取视频行
-                video_rows = notion.get_video_rows(child_db['id'], link_fields, views_field)
-
-                for video in video_rows:
-                    videos.append({
-                        'date': video['name'],  # 假设Name是日期格式
-                        'views': video['current_views']
-                    })
-
-            creators_data.append({
-                'name': creator_name,
-                'label': creator_label,  # 使用从Notion获取的Label
-                'videos': videos
-            })
+        video_index = notion.collect_settlement_data(st.session_state.master_db_id, ledger=SettlementLedger())
 
         # 计算结算
         progress_bar.progress(60)
         status_text.text(get_text("calculating_settlement", lang))
 
-        settlement_df = calculator.calculate_monthly_settlement(creators_data, year, month)
+        settlements = calculator.calculate_range_settlement(video_index, year, month, end_year, end_month)
+        if not settlements:
+            st.error(get_text("invalid_range", lang))
+            progress_bar.progress(0)
+            return
 
-        # 保存结算记录
+        # 保存每个月的结算记录
         progress_bar.progress(80)
         status_text.text(get_text("saving_records", lang))
 
-        storage.save_settlement_record(settlement_df, year, month)
+        for (settle_year, settle_month), settlement_df in settlements.items():
+            if len(settlements) == 1 or not settlement_df.empty:
+                storage.save_settlement_record(settlement_df, settle_year, settle_month)
 
         # 完成
         progress_bar.progress(100)
         status_text.text(get_text("calculation_complete", lang))
 
-        st.success(get_text("calculation_success", lang, year=year, month=month, count=len(settlement_df)))
+        if len(settlements) == 1:
+            st.success(get_text("calculation_success", lang, year=year, month=month,
+                                count=len(settlements[(year, month)])))
+        else:
+            st.success(get_text("range_calculation_success", lang, start=f"{year}-{month:02d}",
+                                end=f"{end_year}-{end_month:02d}", months=len(settlements),
+                                count=sum(len(df) for df in settlements.values())))
+
+        # 标题无法识别日期的视频不计入任何月份，提示一次后再刷新页面
+        if video_index.unparsed:
+            st.warning(get_text("unparsed_titles", lang, count=len(video_index.unparsed)))
+            with st.expander(get_text("view_unparsed_titles", lang)):
+                for title, creator_name in video_index.unparsed.items():
+                    st.text(f"{creator_name}: {title}")
+            return
 
         # 刷新页面
         st.rerun()
@@ -585,25 +765,27 @@ def show_system_info_page(lang: str = "zh"):
     st.subheader(get_text("settlement_rules", lang))
     col1, col2 = st.columns(2)
 
-    with col1:
-        base_pay_title = "**Base Pay**" if lang == "en" else "**底薪**"
-        st.markdown(base_pay_title)
-        if lang == "zh":
-            st.markdown("- 大UGC: $20/条")
-            st.markdown("- 小UGC: $10/条")
-        else:
-            st.markdown("- Core UGC: $20/video")
-            st.markdown("- Discord UGC: $10/video")
+    # 按当月生效的费率表显示（费率配置见 data/rate_tables.json）
+    try:
+        rate_table = SettlementCalculator().rate_table()
+    except ValueError as e:
+        st.error(str(e))
+        rate_table = None
 
-    with col2:
-        commission_title = "**Commission**" if lang == "en" else "**提成**"
-        st.markdown(commission_title)
-        if lang == "zh":
-            st.markdown("- 每1000 views = $1 (向下取整)")
-            st.markdown("- 跨平台自动合并")
-        else:
-            st.markdown("- $1 per 1000 views (rounded down)")
-            st.markdown("- Auto-merge cross-platform")
+    if rate_table is not None:
+        with col1:
+            base_pay_title = "**Base Pay**" if lang == "en" else "**底薪**"
+            st.markdown(base_pay_title)
+            for name, base_pay in zip(rate_table.tier_names, rate_table.base_pay):
+                st.markdown(f"- {name}: ${base_pay:g}/{'video' if lang == 'en' else '条'}")
+
+        with col2:
+            commission_title = "**Commission**" if lang == "en" else "**提成**"
+            st.markdown(commission_title)
+            st.markdown("- " + get_text("commission_rule", lang, unit=rate_table.commission_unit,
+                                        rate=f"{rate_table.commission_rate:g}",
+                                        rounding=get_text(f"rounding_{rate_table.rounding}", lang)))
+            st.markdown("- 跨平台自动合并" if lang == "zh" else "- Auto-merge cross-platform")
 
     # 技术栈
     st.subheader(get_text("tech_stack", lang))
@@ -622,6 +804,10 @@ def show_system_info_page(lang: str = "zh"):
         - **pandas**: Data processing
         """)
 
+    # 上次批量更新的爬取指标
+    st.subheader(get_text("scrape_metrics", lang))
+    show_scrape_metrics(lang)
+
     # 数据目录
     st.subheader(get_text("data_directory", lang))
     storage = DataStorage()
@@ -643,5 +829,39 @@ def show_system_info_page(lang: str = "zh"):
         st.info(get_text("no_update_logs", lang))
 
 
+def show_scrape_metrics(lang: str = "zh"):
+    """显示上次批量更新的爬取指标汇总"""
+    snapshot = ScrapeMetrics.load_snapshot()
+    if not snapshot:
+        st.info(get_text("no_scrape_metrics", lang))
+        return
+
+    rows = []
+    for key, entry in sorted(snapshot.items()):
+        requests_count = entry['requests']
+        top_methods = sorted(entry['methods'].items(), key=lambda item: -item[1])[:3]
+        failures = sorted(entry['failures'].items(), key=lambda item: -item[1])
+        rows.append({
+            get_text("metrics_series", lang): key,
+            get_text("metrics_requests", lang): requests_count,
+            get_text("metrics_success_rate", lang): f"{entry['success'] / requests_count:.0%}" if requests_count else "-",
+            "p50 (s)": round(entry['p50'], 2) if entry.get('p50') is not None else None,
+            "p95 (s)": round(entry['p95'], 2) if entry.get('p95') is not None else None,
+            "MB": round(entry['bytes'] / 1024 / 1024, 1),
+            get_text("metrics_methods", lang): ", ".join(f"{name}×{count}" for name, count in top_methods),
+            get_text("metrics_failures", lang): ", ".join(f"{name}×{count}" for name, count in failures),
+        })
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("JSON", json.dumps(snapshot, indent=2, ensure_ascii=False),
+                           file_name="scrape_metrics.json", mime="application/json")
+    with col2:
+        if os.path.exists('./data/scrape_metrics.prom'):
+            with open('./data/scrape_metrics.prom', 'r', encoding='utf-8') as f:
+                st.download_button("Prometheus", f.read(), file_name="scrape_metrics.prom", mime="text/plain")
+
+
 if __name__ == "__main__":
     main()
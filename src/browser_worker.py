@@ -0,0 +1,438 @@
+"""
+浏览器工作进程模块
+在受监督的子进程中运行Selenium爬取器（每个子进程一个浏览器，每个浏览器可以同时打开多个标签页）：
+主进程记录每个浏览器打开的页面数和内存占用，超过阈值时主动重启；
+子进程或浏览器崩溃、卡住时重启子进程，并重新分发正在爬取的链接
+"""
+
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    # 没有psutil时无法读取内存占用，只按页面数重启
+    psutil = None
+
+try:
+    from .view_scraper_selenium import ViewScraperSelenium, adaptive_network_timeout
+    from .scrape_metrics import ScrapeMetrics
+    from .rate_controller import RateController
+except ImportError:
+    from view_scraper_selenium import ViewScraperSelenium, adaptive_network_timeout
+    from scrape_metrics import ScrapeMetrics
+    from rate_controller import RateController
+
+
+def _worker_main(conn, factory: Callable, scraper_kwargs: Dict):
+    """
+    子进程入口：创建爬取器，按主进程发来的命令逐个爬取
+
+    命令: ('scrape', urls, network_timeout, deadline) / ('session', platform) / ('prelaunch',) / ('close',)
+    一批链接在浏览器的多个标签页中并发爬取（见 ViewScraperSelenium.scrape_many），每完成一个链接返回一个结果
+    """
+    scraper = factory(**scraper_kwargs)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            command = message[0]
+            if command == 'close':
+                break
+            if command == 'prelaunch':
+                scraper.prelaunch()
+            elif command == 'session':
+                conn.send(('session', scraper.export_session(message[1])))
+            elif command == 'scrape':
+                _, urls, network_timeout, deadline = message
+                scraper.network_timeout = network_timeout
+                scraper.set_deadline(deadline)
+                if len(urls) == 1:
+                    results = [(urls[0], scraper.scrape_views(urls[0]))]
+                else:
+                    results = scraper.scrape_many(urls)
+                for url, views in results:
+                    conn.send(('result', url, views, scraper.last_method, scraper.last_failure,
+                               getattr(scraper, '_page_bytes', 0)))
+    finally:
+        try:
+            scraper.close()
+        except Exception:
+            pass
+
+
+def process_tree_rss_mb(pid: int) -> Optional[float]:
+    """
+    进程及其所有子进程（chromedriver、Chrome的各个进程）的常驻内存合计
+
+    Args:
+        pid: 进程ID
+
+    Returns:
+        MB；没有psutil或进程已退出时返回None
+    """
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for item in processes:
+        try:
+            total += item.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
+
+
+class SupervisedBrowser:
+    """在受监督的子进程中运行的浏览器爬取器（接口与ViewScraperSelenium相同，可作为TieredScraper的浏览器层级）"""
+
+    def __init__(self, workers: int = 1, tabs: int = 1, delay: float = 2.0, network_timeout: float = 15.0,
+                 profile_dir: Optional[str] = './data/chrome_profile', max_pages: int = 200,
+                 max_rss_mb: float = 1500.0, task_timeout: float = 90.0, max_redispatch: int = 1,
+                 metrics: Optional[ScrapeMetrics] = None, rate_controller: Optional[RateController] = None,
+                 scraper_factory: Optional[Callable] = None, **scraper_kwargs):
+        """
+        初始化
+
+        Args:
+            workers: 子进程数（每个子进程一个浏览器）
+            tabs: 每个浏览器同时打开的标签页数（每次分发给一个子进程的链接数）
+            delay: 每个浏览器两次请求之间的延迟（秒），设置了 rate_controller 时由限速器决定
+            network_timeout: 等待网络响应中出现播放量的最长时间（秒），有足够样本时按p95自适应
+            profile_dir: Chrome用户目录，第2个及之后的子进程使用 profile_dir_1、profile_dir_2...（同一目录不能被两个Chrome同时使用）
+            max_pages: 一个浏览器打开多少个页面后主动重启（释放长时间运行积累的内存）
+            max_rss_mb: 子进程（含chromedriver和Chrome）常驻内存超过该值（MB）时主动重启，需要psutil
+            task_timeout: 一个链接超过多少秒没有结果时判定子进程卡住，结束并重启
+            max_redispatch: 子进程崩溃或卡住时，正在爬取的链接最多重新分发几次
+            metrics: 爬取指标收集器（可选，在主进程中记录）
+            rate_controller: 按平台的自适应限速（可选，在主进程中调整）
+            scraper_factory: 在子进程中创建爬取器的可调用对象（需要可以pickle），默认 ViewScraperSelenium
+            **scraper_kwargs: 传给爬取器的其它参数（headless、driver_cache_file、offline、capture_network等）
+        """
+        self.workers = max(1, workers)
+        self.tabs = max(1, tabs)
+        self.delay = delay
+        self.network_timeout = network_timeout
+        self.profile_dir = profile_dir
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.task_timeout = task_timeout
+        self.max_redispatch = max_redispatch
+        self.metrics = metrics
+        self.rate_controller = rate_controller
+        self.scraper_factory = scraper_factory or ViewScraperSelenium
+        self.scraper_kwargs = scraper_kwargs
+
+        # 本轮爬取的截止时间（time.time()），见 set_deadline
+        self.deadline = None
+
+        # 最近一次爬取的提取方法和失败原因（与ViewScraper一致）
+        self.last_method = None
+        self.last_failure = None
+
+        # 按原因统计的重启次数
+        self.restarts = {'crash': 0, 'hang': 0, 'pages': 0, 'memory': 0}
+
+        # 子进程不使用fork：Streamlit等多线程进程中fork不安全
+        self._context = multiprocessing.get_context('spawn')
+        # [{'process', 'conn', 'pages', 'tasks': {url: task}, 'sent_at', 'ready_at'}]，未启动的为None
+        self._workers: List[Optional[Dict]] = [None] * self.workers
+
+    def _safe_print(self, message: str):
+        """安全的 print 函数（避免 Broken pipe 错误）"""
+        try:
+            print(message)
+        except (BrokenPipeError, IOError):
+            pass
+
+    def identify_platform(self, url: str) -> str:
+        """识别平台"""
+        url_lower = url.lower()
+        if 'instagram.com' in url_lower or 'instagr.am' in url_lower:
+            return 'instagram'
+        elif 'tiktok.com' in url_lower:
+            return 'tiktok'
+        else:
+            return 'unknown'
+
+    def _worker_kwargs(self, index: int) -> Dict:
+        """第 index 个子进程的爬取器参数"""
+        profile_dir = self.profile_dir
+        if profile_dir and index > 0:
+            profile_dir = f"{profile_dir}_{index}"
+        # 间隔由主进程控制（每个标签页一次只分到一个链接），不单独收集指标
+        return dict(self.scraper_kwargs, delay=0, tabs=self.tabs, profile_dir=profile_dir,
+                    network_timeout=self.network_timeout)
+
+    def _start_worker(self, index: int) -> Dict:
+        """启动（或返回已启动的）第 index 个子进程，空闲时已退出的子进程（例如被系统因内存不足结束）重新启动"""
+        worker = self._workers[index]
+        if worker is not None and worker['process'].is_alive():
+            return worker
+        if worker is not None:
+            self.restarts['crash'] += 1
+            self._stop_worker(index, graceful=False)
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main,
+                                        args=(child_conn, self.scraper_factory, self._worker_kwargs(index)),
+                                        daemon=True)
+        process.start()
+        child_conn.close()
+        worker = {'process': process, 'conn': parent_conn, 'pages': 0, 'tasks': {}, 'sent_at': 0.0, 'ready_at': 0.0}
+        self._workers[index] = worker
+        return worker
+
+    def _stop_worker(self, index: int, graceful: bool = True):
+        """结束第 index 个子进程（graceful=False时直接结束整个进程树，用于崩溃或卡住的子进程）"""
+        worker = self._workers[index]
+        if worker is None:
+            return
+        self._workers[index] = None
+        process = worker['process']
+        if graceful and process.is_alive():
+            try:
+                worker['conn'].send(('close',))
+                process.join(15)
+            except (OSError, ValueError):
+                pass
+        if process.is_alive():
+            self._kill_tree(process.pid)
+            process.kill()
+            process.join(5)
+        worker['conn'].close()
+
+    def _kill_tree(self, pid: int):
+        """结束子进程留下的chromedriver和Chrome进程"""
+        if psutil is None:
+            return
+        try:
+            children = psutil.Process(pid).children(recursive=True)
+        except psutil.Error:
+            return
+        for child in children:
+            try:
+                child.kill()
+            except psutil.Error:
+                pass
+
+    def _restart_reason(self, worker: Dict) -> Optional[str]:
+        """浏览器是否需要主动重启：打开的页面数或内存超过阈值时返回原因"""
+        if worker['pages'] >= self.max_pages:
+            return 'pages'
+        rss = process_tree_rss_mb(worker['process'].pid)
+        if rss is not None and rss >= self.max_rss_mb:
+            return 'memory'
+        return None
+
+    def set_deadline(self, deadline: Optional[float]):
+        """设置本轮爬取的截止时间（None表示不限制），超过后不再分发新链接"""
+        self.deadline = deadline
+
+    def _budget_exhausted(self) -> bool:
+        """本轮时间预算是否已用完"""
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def _delay_for(self, platform: str) -> float:
+        """该平台两次请求之间的间隔（秒）"""
+        if self.rate_controller is not None:
+            return self.rate_controller.delay(platform)
+        return self.delay
+
+    def _record_rate(self, platform: str, views: Optional[int]):
+        """把一次爬取结果交给自适应限速"""
+        if self.rate_controller is not None and self.last_failure not in ('deferred', 'budget', 'unsupported'):
+            self.rate_controller.record(platform, views is not None, self.last_failure)
+
+    def prelaunch(self):
+        """启动第一个子进程，并让它在后台启动浏览器（与读取Notion并行）"""
+        try:
+            self._start_worker(0)['conn'].send(('prelaunch',))
+        except Exception as e:
+            self._safe_print(f"[浏览器进程] 预启动失败: {str(e)}")
+
+    def close(self):
+        """关闭所有子进程和浏览器"""
+        for index in range(self.workers):
+            self._stop_worker(index)
+
+    def export_session(self, platform: str) -> Optional[Dict]:
+        """
+        在第一个子进程的浏览器中导出平台会话（见 ViewScraperSelenium.export_session）
+
+        Args:
+            platform: 平台名称
+
+        Returns:
+            {'cookies': [...], 'user_agent': str}，失败返回None
+        """
+        try:
+            worker = self._start_worker(0)
+            worker['conn'].send(('session', platform))
+            if worker['conn'].poll(self.task_timeout):
+                message = worker['conn'].recv()
+                return message[1]
+        except (EOFError, OSError):
+            pass
+        self._safe_print(f"[浏览器进程] 导出 {platform} 浏览器会话失败，重启子进程")
+        self._stop_worker(0, graceful=False)
+        return None
+
+    def scrape_views(self, url: str) -> Optional[int]:
+        """自动识别平台并爬取播放量（在子进程中）"""
+        self.last_method = None
+        self.last_failure = None
+        if not url:
+            return None
+        for _, views in self.scrape_many([url]):
+            return views
+        return None
+
+    def scrape_many(self, urls: List[str], allow=None, **kwargs):
+        """
+        把链接分发给各个子进程并发爬取，结果完成一个返回一个
+
+        每个子进程同时爬取最多 tabs 个链接（每个标签页一个）；子进程崩溃或卡住时结束整个进程树并重启，正在爬取的链接重新分发
+        （最多 max_redispatch 次，之后记为 'error'）；浏览器打开的页面数或内存超过阈值时，在两个链接之间主动重启。
+        每次产出结果前设置 last_method / last_failure
+
+        Args:
+            urls: 视频链接列表
+            allow: 请求前的放行检查（例如熔断器），被拒绝的链接 last_failure 为 'deferred'
+            **kwargs: 与 ViewScraper.scrape_many 兼容的其它参数（忽略）
+
+        Yields:
+            (url, views) - 失败时views为None
+        """
+        # [(url, 已重新分发次数)]
+        queue = [(url, 0) for url in urls]
+
+        try:
+            yield from self._dispatch(queue, allow)
+        finally:
+            # 调用方提前停止时，仍在爬取的子进程结束掉，避免下一批收到这一批的结果
+            for index, worker in enumerate(self._workers):
+                if worker is not None and worker['tasks']:
+                    self._stop_worker(index, graceful=False)
+
+    def _loading(self, platform: str) -> int:
+        """该平台正在爬取的链接数（所有子进程）"""
+        return sum(1 for worker in self._workers if worker is not None
+                   for task in worker['tasks'].values() if task['platform'] == platform)
+
+    def _dispatch(self, queue: List, allow):
+        """scrape_many 的分发循环"""
+
+        while queue or any(worker is not None and worker['tasks'] for worker in self._workers):
+            # 空闲的子进程领取下一批链接（每个标签页一个）
+            for index in range(self.workers):
+                worker = self._workers[index]
+                if not queue or (worker is not None and (worker['tasks'] or time.time() < worker['ready_at'])):
+                    continue
+
+                batch = []
+                while queue and len(batch) < self.tabs:
+                    url, redispatched = queue[0]
+                    platform = self.identify_platform(url)
+                    if self.rate_controller is not None and platform != 'unknown':
+                        # 同一平台同时爬取的链接数不超过限速器允许的并发数
+                        loading = self._loading(platform) + sum(1 for item in batch if item[1] == platform)
+                        if loading >= self.rate_controller.concurrency(platform):
+                            break
+                    queue.pop(0)
+
+                    if platform == 'unknown' or self._budget_exhausted() or (
+                            redispatched == 0 and allow is not None and not allow(url)):
+                        self.last_method = None
+                        if platform == 'unknown':
+                            self.last_failure = 'unsupported'
+                        elif self._budget_exhausted():
+                            self.last_failure = 'budget'
+                        else:
+                            self.last_failure = 'deferred'
+                        yield url, None
+                        continue
+                    batch.append((url, platform, redispatched))
+                if not batch:
+                    continue
+
+                worker = self._start_worker(index)
+                timeout = max(adaptive_network_timeout(self.metrics, platform, self.network_timeout, self.deadline)
+                              for _, platform, _ in batch)
+                worker['conn'].send(('scrape', [url for url, _, _ in batch], timeout, self.deadline))
+                worker['tasks'] = {url: {'url': url, 'platform': platform, 'redispatched': redispatched,
+                                         'started': time.perf_counter()}
+                                   for url, platform, redispatched in batch}
+                worker['sent_at'] = time.time()
+                worker['pages'] += len(batch)
+
+            busy = {worker['conn']: index for index, worker in enumerate(self._workers)
+                    if worker is not None and worker['tasks']}
+            if not busy:
+                if queue:
+                    time.sleep(0.1)
+                continue
+
+            ready = wait(list(busy), timeout=0.1)
+            for index in busy.values():
+                worker = self._workers[index]
+                message = None
+                if worker['conn'] in ready:
+                    try:
+                        message = worker['conn'].recv()
+                    except (EOFError, OSError):
+                        message = None
+
+                if message is None:
+                    # 没有结果：子进程退出（崩溃）或超过 task_timeout 没有新结果（卡住）时重启
+                    if worker['process'].is_alive() and time.time() - worker['sent_at'] < self.task_timeout:
+                        continue
+                    reason = 'hang' if worker['process'].is_alive() else 'crash'
+                    self.restarts[reason] += 1
+                    self._stop_worker(index, graceful=False)
+                    failed = []
+                    for task in worker['tasks'].values():
+                        if task['redispatched'] < self.max_redispatch:
+                            self._safe_print(f"[浏览器进程] 子进程{'卡住' if reason == 'hang' else '崩溃'}，"
+                                             f"重启并重新爬取: {task['url']}")
+                            queue.insert(0, (task['url'], task['redispatched'] + 1))
+                        else:
+                            self._safe_print(f"[浏览器进程] ✗ 重新爬取后子进程仍然"
+                                             f"{'卡住' if reason == 'hang' else '崩溃'}: {task['url']}")
+                            failed.append(task)
+                    for task in failed:
+                        self.last_method, self.last_failure = None, 'error'
+                        self._record_result(task, None, 0)
+                        yield task['url'], None
+                    continue
+
+                _, url, views, self.last_method, self.last_failure, page_bytes = message
+                task = worker['tasks'].pop(url)
+                worker['sent_at'] = time.time()
+                if not worker['tasks']:
+                    # 这一批全部完成，按间隔领取下一批；页面数或内存超过阈值时先主动重启
+                    worker['ready_at'] = time.time() + self._delay_for(task['platform'])
+                    reason = self._restart_reason(worker)
+                    if reason:
+                        self.restarts[reason] += 1
+                        self._safe_print(f"[浏览器进程] 浏览器已打开 {worker['pages']} 个页面"
+                                         f"{'，内存超过上限' if reason == 'memory' else ''}，主动重启")
+                        self._stop_worker(index)
+
+                self._record_result(task, views, page_bytes)
+                yield task['url'], views
+
+    def _record_result(self, task: Dict, views: Optional[int], page_bytes: int):
+        """在主进程中记录一个链接的指标和限速结果（last_method / last_failure 已设置）"""
+        if self.metrics is not None:
+            self.metrics.record(task['platform'], 'browser', time.perf_counter() - task['started'], views,
+                                method=self.last_method, failure=self.last_failure,
+                                bytes_downloaded=page_bytes)
+        self._record_rate(task['platform'], views)
@@ -0,0 +1,147 @@
+"""
+熔断模块
+平台开始返回登录墙/验证页/限流时，按平台熔断：连续失败达到阈值后暂停该平台，
+冷却后放行一个探测请求（半开），成功则恢复，失败则继续熔断并延长冷却时间
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+
+# 这些失败是视频本身的问题，不说明平台在拦截
+VIDEO_LEVEL_FAILURES = ('not_found', 'private', 'unsupported')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """按平台的熔断器"""
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 120.0,
+                 max_cooldown_seconds: float = 900.0):
+        """
+        初始化熔断器
+
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            cooldown_seconds: 熔断后多久放行探测请求（秒）
+            max_cooldown_seconds: 探测连续失败时冷却时间翻倍的上限（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+
+        # {platform: {'state': str, 'failures': int, 'opened_at': float, 'cooldown': float,
+        #             'last_reason': str, 'trips': int}}
+        self.platforms: Dict[str, Dict] = {}
+
+        # 并发下载时多个线程同时检查放行
+        self._lock = threading.Lock()
+
+    def _entry(self, platform: str) -> Dict:
+        """获取（或创建）平台状态"""
+        if platform not in self.platforms:
+            self.platforms[platform] = {
+                'state': CLOSED,
+                'failures': 0,
+                'opened_at': 0.0,
+                'cooldown': self.cooldown_seconds,
+                'last_reason': None,
+                'trips': 0
+            }
+        return self.platforms[platform]
+
+    def allow(self, platform: str, now: Optional[float] = None) -> bool:
+        """
+        判断该平台现在是否可以发请求
+
+        Args:
+            platform: 平台名称
+            now: 当前时间戳（测试用）
+
+        Returns:
+            关闭状态返回True；熔断中且冷却已过时转为半开并放行一个探测请求
+        """
+        with self._lock:
+            entry = self._entry(platform)
+            if entry['state'] == CLOSED:
+                return True
+
+            now = time.time() if now is None else now
+            if entry['state'] == OPEN and now - entry['opened_at'] >= entry['cooldown']:
+                entry['state'] = HALF_OPEN
+                return True
+
+            # 半开状态下只放行一个探测请求，结果出来之前其他请求继续等待
+            return False
+
+    def retry_after(self, platform: str, now: Optional[float] = None) -> float:
+        """
+        距离下次可以探测还有多少秒
+
+        Args:
+            platform: 平台名称
+            now: 当前时间戳（测试用）
+
+        Returns:
+            秒数，可以立即请求时返回0
+        """
+        entry = self._entry(platform)
+        if entry['state'] != OPEN:
+            return 0.0
+        now = time.time() if now is None else now
+        return max(0.0, entry['opened_at'] + entry['cooldown'] - now)
+
+    def record(self, platform: str, success: bool, reason: Optional[str] = None, now: Optional[float] = None):
+        """
+        记录一次请求结果
+
+        Args:
+            platform: 平台名称
+            success: 是否成功
+            reason: 失败原因（scraper.last_failure）
+            now: 当前时间戳（测试用）
+        """
+        with self._lock:
+            entry = self._entry(platform)
+
+            if success or reason in VIDEO_LEVEL_FAILURES:
+                # 视频级失败说明平台能正常返回页面，同样视为平台可用
+                entry['state'] = CLOSED
+                entry['failures'] = 0
+                entry['cooldown'] = self.cooldown_seconds
+                return
+
+            now = time.time() if now is None else now
+            entry['failures'] += 1
+            entry['last_reason'] = reason
+
+            if entry['state'] == HALF_OPEN:
+                # 探测失败，继续熔断并延长冷却
+                entry['state'] = OPEN
+                entry['opened_at'] = now
+                entry['cooldown'] = min(entry['cooldown'] * 2, self.max_cooldown_seconds)
+                entry['trips'] += 1
+            elif entry['state'] == CLOSED and entry['failures'] >= self.failure_threshold:
+                entry['state'] = OPEN
+                entry['opened_at'] = now
+                entry['trips'] += 1
+
+    def is_open(self, platform: str) -> bool:
+        """该平台是否处于熔断（或半开）状态"""
+        return self._entry(platform)['state'] != CLOSED
+
+    def snapshot(self) -> Dict:
+        """各平台状态快照（用于日志和统计）"""
+        return {
+            platform: {
+                'state': entry['state'],
+                'failures': entry['failures'],
+                'trips': entry['trips'],
+                'last_reason': entry['last_reason']
+            }
+            for platform, entry in self.platforms.items()
+        }
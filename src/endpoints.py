@@ -0,0 +1,131 @@
+"""
+轻量端点模块
+同一个视频除了完整的视频页面，还可以通过更小的嵌入页或JSON详情接口获取播放量；
+按平台记录每个端点的成功率（指数衰减，反映最近的结果），成功率高的端点优先，持续失败的端点暂停使用并定期重新试探
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .url_canonical import video_id_from_url
+except ImportError:
+    from url_canonical import video_id_from_url
+
+
+# 每个平台的轻量端点: (名称, 链接模板, 内容类型)，按默认优先级排列
+# 内容类型为 'html' 时用该平台的提取流水线解析，'json' 时按视频ID在JSON中查找播放量
+ENDPOINTS = {
+    'instagram': (
+        ('embed', 'https://www.instagram.com/p/{video_id}/embed/captioned/', 'html'),
+        ('detail_json', 'https://www.instagram.com/p/{video_id}/?__a=1&__d=dis', 'json'),
+    ),
+    'tiktok': (
+        ('embed', 'https://www.tiktok.com/embed/v2/{video_id}', 'html'),
+        ('detail_json', 'https://www.tiktok.com/api/item/detail/?itemId={video_id}', 'json'),
+    ),
+}
+
+
+class EndpointStrategy:
+    """按平台选择轻量端点，完整页面作为最后的兜底（由爬取器自己处理）"""
+
+    def __init__(self, state_file: Optional[str] = './data/endpoints.json', min_samples: int = 5,
+                 min_success_rate: float = 0.2, reprobe_interval: int = 50, rate_weight: float = 0.25):
+        """
+        初始化端点策略
+
+        Args:
+            state_file: 端点成功记录的保存路径（None则不保存）
+            min_samples: 至少尝试多少次后才允许暂停一个端点
+            min_success_rate: 成功率低于该值的端点暂停使用
+            reprobe_interval: 暂停的端点每跳过多少次，重新试一次
+            rate_weight: 成功率按指数衰减计算，每次结果所占的权重（越大越快反映端点的变化）
+        """
+        self.state_file = state_file
+        self.min_samples = min_samples
+        self.min_success_rate = min_success_rate
+        self.reprobe_interval = reprobe_interval
+        self.rate_weight = rate_weight
+
+        # {'platform:endpoint': {'success': int, 'fail': int, 'rate': float, 'skipped': int}}
+        self.stats = self._load_state()
+        self._lock = threading.Lock()
+
+    def _load_state(self) -> Dict:
+        """加载历史端点记录"""
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+
+    def save(self):
+        """保存端点记录"""
+        if not self.state_file:
+            return
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._lock:
+            stats = json.loads(json.dumps(self.stats))
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2, ensure_ascii=False)
+
+    def _entry(self, platform: str, name: str) -> Dict:
+        """获取（或创建）某个端点的记录"""
+        return self.stats.setdefault(f"{platform}:{name}", {'success': 0, 'fail': 0, 'skipped': 0})
+
+    @staticmethod
+    def _success_rate(entry: Dict) -> float:
+        """指数衰减后的成功率（没有样本的端点为0.5；旧的记录没有衰减后的成功率时按累计次数平滑）"""
+        return entry.get('rate', (entry['success'] + 1) / (entry['success'] + entry['fail'] + 2))
+
+    def candidates(self, url: str, platform: str) -> List[Tuple[str, str, str]]:
+        """
+        本次应该尝试的轻量端点，成功率高的在前
+
+        Args:
+            url: 视频链接
+            platform: 平台名称
+
+        Returns:
+            [(端点名称, 端点链接, 内容类型)]；链接中没有视频ID（例如短链接）时为空列表
+        """
+        video_id = video_id_from_url(url)
+        if not video_id:
+            return []
+
+        result = []
+        with self._lock:
+            endpoints = ENDPOINTS.get(platform, ())
+            ranked = sorted(endpoints, key=lambda endpoint: -self._success_rate(self._entry(platform, endpoint[0])))
+            for name, template, kind in ranked:
+                entry = self._entry(platform, name)
+                attempts = entry['success'] + entry['fail']
+                if attempts >= self.min_samples and self._success_rate(entry) < self.min_success_rate:
+                    entry['skipped'] += 1
+                    if entry['skipped'] < self.reprobe_interval:
+                        continue
+                    entry['skipped'] = 0
+                result.append((name, template.format(video_id=video_id), kind))
+        return result
+
+    def record(self, platform: str, name: str, success: bool):
+        """
+        记录一次端点请求的结果
+
+        Args:
+            platform: 平台名称
+            name: 端点名称
+            success: 是否拿到了播放量
+        """
+        with self._lock:
+            entry = self._entry(platform, name)
+            rate = self._success_rate(entry)
+            entry['rate'] = rate + self.rate_weight * (float(success) - rate)
+            entry['success' if success else 'fail'] += 1
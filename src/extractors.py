@@ -0,0 +1,421 @@
+"""
+播放量提取策略模块
+按平台注册提取策略（预编译的模式 + 共享的数字解析），
+运行时根据每个策略的命中率和耗时重新排序，让最便宜且通常能命中的策略先执行
+"""
+
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from .html_extract import find_meta_content, find_ld_json, find_script_json, find_script_jsons, visible_text
+except ImportError:
+    from html_extract import find_meta_content, find_ld_json, find_script_json, find_script_jsons, visible_text
+
+
+# 数字后缀倍数（较长的后缀放前面，避免"百万"被当成"万"）
+_MULTIPLIERS = (
+    ('百万', 1000000),
+    ('亿', 100000000),
+    ('万', 10000),
+    ('千', 1000),
+    ('K', 1000),
+    ('M', 1000000),
+    ('B', 1000000000),
+)
+
+# 播放量文本模式
+_INSTAGRAM_VIEWS_TEXT = re.compile(r'([\d,]+(?:\.\d+)?[KMB万千百]?)\s*(?:views?|次播放)', re.IGNORECASE)
+_TIKTOK_VIEWS_TEXT = re.compile(r'([\d.]+[KMB]?)\s*(?:views?)', re.IGNORECASE)
+
+# 页面中内嵌的JSON计数字段（浏览器渲染后的页面和部分HTTP响应中都会出现）
+_INSTAGRAM_RAW_COUNT = re.compile(rb'"(?:video_view_count|videoViewCount|viewCount|play_count)"\s*:\s*"?(\d+)')
+_TIKTOK_RAW_COUNT = re.compile(rb'"(?:playCount|viewCount)"\s*:\s*"?(\d+)')
+
+# 接口JSON中的播放量字段和视频标识字段
+_JSON_COUNT_KEYS = ('playCount', 'play_count', 'video_view_count', 'videoViewCount', 'view_count')
+_JSON_ID_KEYS = ('id', 'aweme_id', 'code', 'shortcode')
+_JSON_STATS_KEYS = ('stats', 'statsV2', 'statistics')
+
+
+def _count_in_item(item: dict) -> Optional[int]:
+    """在视频对象本身及其 stats/statsV2 中查找播放量"""
+    for node in [item] + [item.get(key) for key in _JSON_STATS_KEYS]:
+        if not isinstance(node, dict):
+            continue
+        for key in _JSON_COUNT_KEYS:
+            if key in node:
+                try:
+                    views = int(node[key])
+                except (TypeError, ValueError):
+                    continue
+                if views > 0:
+                    return views
+    return None
+
+
+def find_view_count(data, video_id: Optional[str]) -> Optional[int]:
+    """
+    在接口返回的JSON中查找指定视频的播放量
+
+    只接受标识字段（id/aweme_id/code/shortcode）等于 video_id 的对象，
+    避免取到推荐列表中其他视频的数字
+
+    Args:
+        data: 解析后的JSON
+        video_id: TikTok数字ID或Instagram短码
+
+    Returns:
+        播放量，没有找到返回None
+    """
+    if not video_id:
+        return None
+
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if any(str(node.get(key)) == video_id for key in _JSON_ID_KEYS if key in node):
+                views = _count_in_item(node)
+                if views is not None:
+                    return views
+            stack.extend(value for value in node.values() if isinstance(value, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(value for value in node if isinstance(value, (dict, list)))
+    return None
+
+
+def find_embedded_view_count(body: bytes, video_id: Optional[str]) -> Optional[int]:
+    """
+    在嵌入页内嵌的JSON脚本中查找指定视频的播放量（只接受该视频ID的计数，代替完整页面的兜底策略）
+
+    Args:
+        body: 页面原始字节
+        video_id: TikTok数字ID或Instagram短码
+
+    Returns:
+        播放量，没有找到返回None
+    """
+    if not video_id:
+        return None
+    for data in find_script_jsons(body):
+        views = find_view_count(data, video_id)
+        if views is not None:
+            return views
+    return None
+
+
+def parse_views_number(views_str) -> Optional[int]:
+    """
+    解析播放量字符串为整数
+
+    支持格式:
+    - "1,234,567" → 1234567
+    - "1.2M" → 1200000
+    - "1.2K" → 1200
+    - "1.2B" → 1200000000
+    - "1.2万" → 12000
+
+    Args:
+        views_str: 播放量字符串
+
+    Returns:
+        播放量整数，解析失败返回None
+    """
+    try:
+        views_str = str(views_str).strip().replace(',', '')
+
+        for suffix, multiplier in _MULTIPLIERS:
+            if views_str.upper().endswith(suffix):
+                number_str = views_str[:-len(suffix)].strip()
+                return int(float(number_str) * multiplier)
+
+        # 直接转换为整数
+        return int(float(views_str))
+
+    except (ValueError, TypeError):
+        return None
+
+
+class Extractor:
+    """单个提取策略"""
+
+    def __init__(self, name: str, func: Callable[[bytes], Optional[int]], cost: float, fallback: bool = False,
+                 marker: Optional[bytes] = None, terminator: bytes = b'>'):
+        """
+        Args:
+            name: 策略名称（记录为 last_method）
+            func: 提取函数，输入页面原始字节，返回播放量或None
+            cost: 预估的相对成本（越大越贵），实测耗时出来前用于排序
+            fallback: 是否为兜底策略（可能取到无关数字），只在精确策略都失败后执行
+            marker: 目标片段的起始标志，流式下载时用于判断片段是否已到达
+            terminator: 标志之后出现该字节串，说明片段已完整
+        """
+        self.name = name
+        self.func = func
+        self.cost = cost
+        self.fallback = fallback
+        self.marker = marker
+        self.terminator = terminator
+
+    def is_ready(self, body: bytes, state: Dict) -> bool:
+        """
+        判断是否有新的目标片段完整到达（流式下载时每收到一块调用一次，只扫描新到达的字节）
+
+        Args:
+            body: 目前已下载的字节
+            state: 该策略在本次下载中的扫描位置，原地更新（每次下载使用新的空字典）
+
+        Returns:
+            自上次调用以来有新的完整片段返回True；没有起始标志的策略只能在下载完成后执行，返回False
+        """
+        if self.marker is None:
+            return False
+
+        start = state.get('start')
+        if start is None:
+            marker_from = state.get('marker_from', 0)
+            start = body.find(self.marker, marker_from)
+            if start == -1:
+                # 标志可能被分在两块之间，下次从末尾回退标志长度处继续查找
+                state['marker_from'] = max(marker_from, len(body) - len(self.marker) + 1)
+                return False
+            state['start'] = start
+            state['terminator_from'] = start + len(self.marker)
+
+        end = body.find(self.terminator, state['terminator_from'])
+        if end == -1:
+            state['terminator_from'] = max(state['terminator_from'], len(body) - len(self.terminator) + 1)
+            return False
+
+        # 片段完整；之后只在这个片段后面查找新的片段（例如后面的另一个 ld+json 块）
+        del state['start']
+        state['marker_from'] = end + len(self.terminator)
+        return True
+
+
+# {platform: [Extractor, ...]}
+EXTRACTORS: Dict[str, List[Extractor]] = {
+    'instagram': [],
+    'tiktok': [],
+}
+
+
+def register_extractor(platform: str, name: str, cost: float, fallback: bool = False,
+                       marker: Optional[bytes] = None, terminator: bytes = b'>'):
+    """
+    注册提取策略的装饰器
+
+    Args:
+        platform: 平台名称
+        name: 策略名称
+        cost: 预估的相对成本
+        fallback: 是否为兜底策略
+        marker: 目标片段的起始标志（流式下载时使用）
+        terminator: 片段结束标志
+    """
+    def decorator(func):
+        EXTRACTORS.setdefault(platform, []).append(Extractor(name, func, cost, fallback, marker, terminator))
+        return func
+    return decorator
+
+
+# ---------- Instagram ----------
+
+@register_extractor('instagram', 'meta', cost=1, marker=b'og:description')
+def _instagram_meta(body: bytes) -> Optional[int]:
+    """og:description 中的 "X views" """
+    content = find_meta_content(body, 'og:description')
+    if content:
+        match = _INSTAGRAM_VIEWS_TEXT.search(content)
+        if match:
+            return parse_views_number(match.group(1))
+    return None
+
+
+@register_extractor('instagram', 'json_ld', cost=2, marker=b'application/ld+json', terminator=b'</script')
+def _instagram_json_ld(body: bytes) -> Optional[int]:
+    """ld+json 中的 WatchAction 计数"""
+    for data in find_ld_json(body):
+        if isinstance(data, dict):
+            for stat in data.get('interactionStatistic') or []:
+                if isinstance(stat, dict) and stat.get('interactionType') == 'http://schema.org/WatchAction':
+                    return int(stat.get('userInteractionCount', 0))
+    return None
+
+
+@register_extractor('instagram', 'raw_json', cost=4, fallback=True)
+def _instagram_raw_json(body: bytes) -> Optional[int]:
+    """页面内嵌JSON中的 video_view_count 等字段"""
+    match = _INSTAGRAM_RAW_COUNT.search(body)
+    if match:
+        views = int(match.group(1))
+        return views if views > 0 else None
+    return None
+
+
+@register_extractor('instagram', 'page_text', cost=10, fallback=True)
+def _instagram_page_text(body: bytes) -> Optional[int]:
+    """可见文本中的 "X views"（最贵的兜底）"""
+    match = _INSTAGRAM_VIEWS_TEXT.search(visible_text(body))
+    if match:
+        return parse_views_number(match.group(1))
+    return None
+
+
+# ---------- TikTok ----------
+
+@register_extractor('tiktok', 'meta', cost=1, marker=b'og:description')
+def _tiktok_meta(body: bytes) -> Optional[int]:
+    """og:description 中的 "X views" """
+    content = find_meta_content(body, 'og:description')
+    if content:
+        match = _TIKTOK_VIEWS_TEXT.search(content)
+        if match:
+            return parse_views_number(match.group(1))
+    return None
+
+
+@register_extractor('tiktok', 'rehydration', cost=3, marker=b'__UNIVERSAL_DATA_FOR_REHYDRATION__',
+                    terminator=b'</script')
+def _tiktok_rehydration(body: bytes) -> Optional[int]:
+    """__UNIVERSAL_DATA_FOR_REHYDRATION__ 中的 playCount"""
+    data = find_script_json(body, '__UNIVERSAL_DATA_FOR_REHYDRATION__')
+    try:
+        # TikTok的数据结构: __DEFAULT_SCOPE__.webapp.video-detail.itemInfo.itemStruct
+        stats = data['__DEFAULT_SCOPE__']['webapp.video-detail']['itemInfo']['itemStruct'].get('stats', {})
+        views = int(stats.get('playCount', 0))
+        return views if views > 0 else None
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return None
+
+
+@register_extractor('tiktok', 'sigi_state', cost=3, marker=b'SIGI_STATE', terminator=b'</script')
+def _tiktok_sigi_state(body: bytes) -> Optional[int]:
+    """SIGI_STATE.ItemModule 中的 playCount"""
+    data = find_script_json(body, 'SIGI_STATE')
+    try:
+        for item_data in data['ItemModule'].values():
+            if 'stats' in item_data:
+                views = int(item_data['stats'].get('playCount', 0))
+                if views > 0:
+                    return views
+    except (KeyError, TypeError, AttributeError, ValueError):
+        pass
+    return None
+
+
+@register_extractor('tiktok', 'raw_json', cost=4, fallback=True)
+def _tiktok_raw_json(body: bytes) -> Optional[int]:
+    """页面内嵌JSON中的第一个 playCount 字段"""
+    match = _TIKTOK_RAW_COUNT.search(body)
+    if match:
+        views = int(match.group(1))
+        return views if views > 0 else None
+    return None
+
+
+@register_extractor('tiktok', 'page_text', cost=10, fallback=True)
+def _tiktok_page_text(body: bytes) -> Optional[int]:
+    """可见文本中的 "X views"（最贵的兜底）"""
+    match = _TIKTOK_VIEWS_TEXT.search(visible_text(body))
+    if match:
+        return parse_views_number(match.group(1))
+    return None
+
+
+class ExtractorPipeline:
+    """按命中率和耗时自适应排序的提取流水线"""
+
+    # 预估成本单位换算为秒，用作实测耗时的初始值
+    COST_UNIT_SECONDS = 0.001
+
+    def __init__(self, platform: str, extractors: Optional[List[Extractor]] = None, smoothing: float = 0.2):
+        """
+        初始化流水线
+
+        Args:
+            platform: 平台名称
+            extractors: 提取策略列表，默认使用该平台注册的全部策略
+            smoothing: 耗时滑动平均的权重
+        """
+        self.platform = platform
+        self.extractors = list(extractors if extractors is not None else EXTRACTORS.get(platform, []))
+        self.smoothing = smoothing
+
+        # {name: {'attempts': int, 'hits': int, 'avg_seconds': float}}
+        self.stats = {
+            extractor.name: {
+                'attempts': 0,
+                'hits': 0,
+                'avg_seconds': extractor.cost * self.COST_UNIT_SECONDS
+            }
+            for extractor in self.extractors
+        }
+
+    def _expected_cost(self, extractor: Extractor) -> float:
+        """每次命中的期望耗时 = 平均耗时 / 命中率（命中率做拉普拉斯平滑）"""
+        stat = self.stats[extractor.name]
+        hit_rate = (stat['hits'] + 1) / (stat['attempts'] + 2)
+        return stat['avg_seconds'] / hit_rate
+
+    def ordered(self) -> List[Extractor]:
+        """当前的执行顺序：先精确策略再兜底策略，同类中按期望耗时排序"""
+        return sorted(self.extractors, key=lambda e: (e.fallback, self._expected_cost(e)))
+
+    def _attempt(self, extractor: Extractor, body: bytes) -> Optional[int]:
+        """执行一个策略并更新其命中率和耗时"""
+        stat = self.stats[extractor.name]
+        started = time.perf_counter()
+        try:
+            views = extractor.func(body)
+        except Exception:
+            views = None
+        elapsed = time.perf_counter() - started
+
+        stat['attempts'] += 1
+        stat['avg_seconds'] += self.smoothing * (elapsed - stat['avg_seconds'])
+        if views is not None:
+            stat['hits'] += 1
+        return views
+
+    def run(self, body: bytes) -> Tuple[Optional[int], Optional[str]]:
+        """
+        依次执行提取策略，直到有一个命中
+
+        Args:
+            body: 页面原始字节
+
+        Returns:
+            (播放量, 策略名称)，全部未命中返回 (None, None)
+        """
+        for extractor in self.ordered():
+            views = self._attempt(extractor, body)
+            if views is not None:
+                return views, extractor.name
+
+        return None, None
+
+    def run_ready(self, body: bytes, scan: Dict[str, Dict]) -> Tuple[Optional[int], Optional[str]]:
+        """
+        流式下载时调用：只执行有新的目标片段完整到达的精确策略
+
+        在部分内容上没有命中的策略，之后有新片段到达时会再执行；下载完成后仍在完整正文上执行所有策略
+        （例如第一个 ld+json 块与播放量无关，WatchAction 在后面的块中）
+
+        Args:
+            body: 目前已下载的字节
+            scan: {策略名称: 扫描位置}，本次下载中原地更新（每次下载使用新的空字典）
+
+        Returns:
+            (播放量, 策略名称)，没有命中返回 (None, None)
+        """
+        for extractor in self.ordered():
+            if extractor.fallback or not extractor.is_ready(body, scan.setdefault(extractor.name, {})):
+                continue
+            views = self._attempt(extractor, body)
+            if views is not None:
+                return views, extractor.name
+
+        return None, None
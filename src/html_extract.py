@@ -0,0 +1,183 @@
+"""
+HTML片段定位模块
+直接在原始字节上用预编译的正则定位需要的片段（rehydration/SIGI_STATE/ld+json脚本、og:description），
+只解析这些片段，避免构建整棵BeautifulSoup树和对整页做get_text
+"""
+
+import html
+import json
+import re
+from typing import Any, List, Optional
+
+
+# <script ... id="X" ...> ... </script>，id 可能出现在其它属性之前或之后
+_SCRIPT_BY_ID_TEMPLATE = rb'<script\b[^>]*\bid\s*=\s*["\']%s["\'][^>]*>(.*?)</script\s*>'
+
+_REHYDRATION_SCRIPT = re.compile(_SCRIPT_BY_ID_TEMPLATE % rb'__UNIVERSAL_DATA_FOR_REHYDRATION__', re.S | re.I)
+_SIGI_STATE_SCRIPT = re.compile(_SCRIPT_BY_ID_TEMPLATE % rb'SIGI_STATE', re.S | re.I)
+_SCRIPT_BLOCK = re.compile(rb'<script\b[^>]*>\s*([\[{].*?)</script\s*>', re.S | re.I)
+_LD_JSON_SCRIPT = re.compile(rb'<script\b[^>]*\btype\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script\s*>', re.S | re.I)
+
+_META_TAG = re.compile(rb'<meta\b[^>]*>', re.I)
+_META_PROPERTY = re.compile(rb'\b(?:property|name)\s*=\s*["\']([^"\']+)["\']', re.I)
+_META_CONTENT = re.compile(rb'\bcontent\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.I | re.S)
+
+# 提取可见文本时要整体去掉的块，以及剩下的标签
+_INVISIBLE_BLOCKS = re.compile(rb'<(script|style|noscript|template)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+_TAGS = re.compile(rb'<[^>]+>')
+_COMMENTS = re.compile(rb'<!--.*?-->', re.S)
+
+# 登录墙/验证页/同意页/限流页的标志，出现时页面里不会有播放量
+WALL_MARKERS = {
+    'login_wall': (
+        b'"require_login":true',
+        b'<title>Login \xe2\x80\xa2 Instagram</title>',
+        b'id="loginForm"',
+    ),
+    'captcha': (
+        b'captcha-verify',
+        b'verify-bar-close',
+    ),
+    'consent_wall': (
+        b'id="consent-dialog"',
+        b'consent-banner-blocking',
+    ),
+    'rate_limited': (
+        b'Please wait a few minutes before you try again',
+        b'<title>429 Too Many Requests</title>',
+    ),
+}
+
+# 流式扫描时两块之间需要重叠的字节数（最长标志的长度减一）
+_WALL_MARKER_OVERLAP = max(len(marker) for markers in WALL_MARKERS.values() for marker in markers) - 1
+
+SCRIPT_IDS = {
+    '__UNIVERSAL_DATA_FOR_REHYDRATION__': _REHYDRATION_SCRIPT,
+    'SIGI_STATE': _SIGI_STATE_SCRIPT,
+}
+
+
+def _load_json(fragment: bytes) -> Optional[Any]:
+    """解析JSON片段，失败返回None"""
+    try:
+        return json.loads(fragment)
+    except ValueError:
+        return None
+
+
+def find_script_json(body: bytes, script_id: str) -> Optional[Any]:
+    """
+    定位指定id的script标签并解析其JSON内容
+
+    Args:
+        body: 页面原始字节
+        script_id: script标签的id（'__UNIVERSAL_DATA_FOR_REHYDRATION__' 或 'SIGI_STATE'）
+
+    Returns:
+        解析后的JSON对象，不存在或解析失败返回None
+    """
+    pattern = SCRIPT_IDS.get(script_id)
+    if pattern is None:
+        pattern = re.compile(_SCRIPT_BY_ID_TEMPLATE % re.escape(script_id.encode()), re.S | re.I)
+
+    match = pattern.search(body)
+    if not match:
+        return None
+    return _load_json(match.group(1))
+
+
+def find_script_jsons(body: bytes) -> List[Any]:
+    """
+    解析页面中所有内容为JSON的script标签（不限id和type，用于嵌入页等结构不固定的页面）
+
+    Args:
+        body: 页面原始字节
+
+    Returns:
+        解析成功的JSON对象列表
+    """
+    results = []
+    for match in _SCRIPT_BLOCK.finditer(body):
+        data = _load_json(match.group(1))
+        if data is not None:
+            results.append(data)
+    return results
+
+
+def find_ld_json(body: bytes) -> List[Any]:
+    """
+    定位所有 application/ld+json 脚本并解析
+
+    Args:
+        body: 页面原始字节
+
+    Returns:
+        解析成功的JSON对象列表
+    """
+    results = []
+    for match in _LD_JSON_SCRIPT.finditer(body):
+        data = _load_json(match.group(1))
+        if data is not None:
+            results.append(data)
+    return results
+
+
+def find_meta_content(body: bytes, prop: str = 'og:description') -> Optional[str]:
+    """
+    定位指定property（或name）的meta标签并返回其content
+
+    Args:
+        body: 页面原始字节
+        prop: meta标签的property/name，例如 'og:description'
+
+    Returns:
+        反转义后的content文本，不存在返回None
+    """
+    wanted = prop.encode().lower()
+    for tag in _META_TAG.finditer(body):
+        tag_bytes = tag.group(0)
+        prop_match = _META_PROPERTY.search(tag_bytes)
+        if not prop_match or prop_match.group(1).lower() != wanted:
+            continue
+
+        content_match = _META_CONTENT.search(tag_bytes)
+        if content_match:
+            raw = content_match.group(1) if content_match.group(1) is not None else content_match.group(2)
+            return html.unescape(raw.decode('utf-8', errors='replace'))
+    return None
+
+
+def detect_wall(body: bytes, start: int = 0) -> Optional[str]:
+    """
+    检测登录墙/验证页/同意页/限流页
+
+    Args:
+        body: 页面原始字节（可以是部分内容）
+        start: 从该位置开始扫描（流式下载时传入上次扫描时的长度，自动回退最长标志的长度，
+               避免漏掉被分在两块之间的标志）
+
+    Returns:
+        'login_wall'、'captcha'、'consent_wall' 或 'rate_limited'，正常页面返回None
+    """
+    start = max(0, start - _WALL_MARKER_OVERLAP)
+    for reason, markers in WALL_MARKERS.items():
+        for marker in markers:
+            if body.find(marker, start) != -1:
+                return reason
+    return None
+
+
+def visible_text(body: bytes) -> str:
+    """
+    提取页面可见文本（去掉脚本、样式和标签），作为最后的兜底
+
+    Args:
+        body: 页面原始字节
+
+    Returns:
+        可见文本
+    """
+    stripped = _COMMENTS.sub(b' ', body)
+    stripped = _INVISIBLE_BLOCKS.sub(b' ', stripped)
+    stripped = _TAGS.sub(b' ', stripped)
+    return html.unescape(stripped.decode('utf-8', errors='replace'))
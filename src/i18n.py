@@ -64,8 +64,60 @@ TRANSLATIONS = {
         "zh": "爬取延迟（秒）"
     },
     "scrape_delay_help": {
-        "en": "Delay between each scrape to avoid being blocked",
-        "zh": "每次爬取之间的延迟，避免被封禁"
+        "en": "Maximum delay between requests. The delay per platform adapts automatically: shorter while requests succeed, longer (up to this value) on rate limits, login walls or timeouts",
+        "zh": "请求间隔的上限。每个平台的间隔自动调整：请求正常时缩短，遇到限流、登录墙或超时时加长（不超过该值）"
+    },
+    "cache_ttl": {
+        "en": "Result Cache TTL (hours)",
+        "zh": "结果缓存有效期（小时）"
+    },
+    "full_refresh": {
+        "en": "Refresh all videos",
+        "zh": "全部重新爬取"
+    },
+    "full_refresh_help": {
+        "en": "By default only videos due for refresh are scraped (new or still growing); settled months are frozen",
+        "zh": "默认只爬取到期的视频（新视频或仍在增长的视频），已结算月份的视频不再刷新"
+    },
+    "videos_skipped": {
+        "en": "{count} video(s) not due for refresh were skipped",
+        "zh": "{count} 个未到期的视频已跳过"
+    },
+    "cache_ttl_help": {
+        "en": "Reuse view counts scraped within this window; 0 re-scrapes everything",
+        "zh": "在此时间内爬取过的播放量直接复用，设为0则全部重新爬取"
+    },
+    "fetch_workers": {
+        "en": "Concurrent Downloads",
+        "zh": "并发下载数"
+    },
+    "fetch_workers_help": {
+        "en": "Maximum pages downloaded in parallel (browser tabs when a browser is needed); each platform ramps up to this while requests succeed and halves on blocks. Parsing runs in separate processes. 1 scrapes one link at a time",
+        "zh": "同时下载的页面数上限（需要浏览器时为同时打开的标签页数），每个平台请求正常时逐步增加到该值，被拦截时减半；页面解析在独立进程中进行；设为1则逐个爬取"
+    },
+    "retry_failures": {
+        "en": "🔁 Retry Failures ({count})",
+        "zh": "🔁 重试失败的视频 ({count})"
+    },
+    "retry_failures_help": {
+        "en": "Re-scrape only the rows whose links all failed in earlier runs; healthy links are not scraped again",
+        "zh": "只重新爬取之前所有链接都失败的视频行，不重新爬取正常的链接"
+    },
+    "run_budget": {
+        "en": "Time Budget (minutes)",
+        "zh": "时间预算（分钟）"
+    },
+    "run_budget_help": {
+        "en": "Stop sending new requests after this many minutes; unscraped videos are left for the next run. 0 means no limit",
+        "zh": "超过该时间后不再发新请求，未爬取的视频留到下次运行；设为0则不限制"
+    },
+    "hedge_requests": {
+        "en": "Hedge slow requests",
+        "zh": "慢请求发送备份请求"
+    },
+    "hedge_requests_help": {
+        "en": "When a page takes longer than the platform's usual p95, send a duplicate request and use whichever finishes first",
+        "zh": "页面耗时超过该平台平时的p95时再发一个相同的请求，取先完成的结果"
     },
 
     # 使用说明
@@ -227,6 +279,26 @@ TRANSLATIONS = {
         "en": "📊 Calculate Settlement",
         "zh": "📊 计算结算"
     },
+    "settle_range": {
+        "en": "Settle a range of months",
+        "zh": "结算多个月"
+    },
+    "settle_range_help": {
+        "en": "Read Notion once and calculate and save a settlement for every month from the selected month to the end month (e.g. quarter or year-end close)",
+        "zh": "只读取一次Notion，计算并保存从所选月份到结束月份的每个月的结算（例如季度、年度结算）"
+    },
+    "end_year": {
+        "en": "End Year",
+        "zh": "结束年份"
+    },
+    "end_month": {
+        "en": "End Month",
+        "zh": "结束月份"
+    },
+    "invalid_range": {
+        "en": "❌ The end month must not be earlier than the start month",
+        "zh": "❌ 结束月份不能早于起始月份"
+    },
     "settlement_details": {
         "en": "📋 Settlement Details for {year}-{month}",
         "zh": "📋 {year}年{month}月结算明细"
@@ -243,6 +315,30 @@ TRANSLATIONS = {
         "en": "Total Settlement",
         "zh": "总结算"
     },
+    "live_settlement": {
+        "en": "📈 Live Settlement {year}-{month:02d} (to date)",
+        "zh": "📈 {year}年{month}月实时结算（截至目前）"
+    },
+    "live_settlement_help": {
+        "en": "Updated whenever a batch update writes new views (last change: {time}); use Calculate Settlement to save the official record",
+        "zh": "批量更新每写回新的播放量时自动更新（最后更新: {time}）；正式结算记录请点击计算结算保存"
+    },
+    "no_live_settlement": {
+        "en": "No live data for this month yet. It is built by the next batch update or settlement calculation",
+        "zh": "本月还没有实时数据，下次批量更新或计算结算后生成"
+    },
+    "rate_scenarios": {
+        "en": "📐 Rate Scenario Comparison",
+        "zh": "📐 费率方案对比"
+    },
+    "rate_scenarios_help": {
+        "en": "This month's settlement re-priced under the candidate rate tables in data/rate_tables.json (scenarios); actual settlements are not affected",
+        "zh": "按 data/rate_tables.json 中的候选费率表（scenarios）重新计算本月结算，不影响实际结算"
+    },
+    "current_rates": {
+        "en": "Current Rates",
+        "zh": "当前费率"
+    },
     "download_csv": {
         "en": "📥 Download CSV",
         "zh": "📥 下载CSV"
@@ -287,6 +383,54 @@ TRANSLATIONS = {
         "en": "💰 Settlement Rules",
         "zh": "💰 结算规则"
     },
+    "commission_rule": {
+        "en": "${rate} per {unit} views ({rounding})",
+        "zh": "每{unit} views = ${rate} ({rounding})"
+    },
+    "rounding_floor": {
+        "en": "rounded down",
+        "zh": "向下取整"
+    },
+    "rounding_round": {
+        "en": "rounded to nearest",
+        "zh": "四舍五入"
+    },
+    "rounding_ceil": {
+        "en": "rounded up",
+        "zh": "向上取整"
+    },
+    "rounding_none": {
+        "en": "pro rata",
+        "zh": "按比例"
+    },
+    "scrape_metrics": {
+        "en": "📈 Scrape Metrics (last run)",
+        "zh": "📈 爬取指标（上次运行）"
+    },
+    "no_scrape_metrics": {
+        "en": "No scrape metrics yet. Run a batch update first.",
+        "zh": "暂无爬取指标，请先运行一次批量更新"
+    },
+    "metrics_series": {
+        "en": "Platform / Tier",
+        "zh": "平台 / 层级"
+    },
+    "metrics_requests": {
+        "en": "Requests",
+        "zh": "请求数"
+    },
+    "metrics_success_rate": {
+        "en": "Success Rate",
+        "zh": "成功率"
+    },
+    "metrics_methods": {
+        "en": "Top Methods",
+        "zh": "主要提取方法"
+    },
+    "metrics_failures": {
+        "en": "Failures",
+        "zh": "失败原因"
+    },
     "tech_stack": {
         "en": "🛠️ Tech Stack",
         "zh": "🛠️ 技术栈"
@@ -347,6 +491,18 @@ TRANSLATIONS = {
         "en": "Successfully calculated settlement for {year}-{month}, total {count} creator(s)",
         "zh": "成功计算{year}年{month}月的结算，共{count}位创作者"
     },
+    "unparsed_titles": {
+        "en": "⚠️ {count} video title(s) have no recognizable date (e.g. 20251114-1) and were not included in any month",
+        "zh": "⚠️ {count} 个视频标题无法识别日期（应为 20251114-1 这样的格式），未计入任何月份"
+    },
+    "view_unparsed_titles": {
+        "en": "View titles",
+        "zh": "查看标题"
+    },
+    "range_calculation_success": {
+        "en": "Successfully calculated settlements for {months} month(s) from {start} to {end}, {count} row(s) in total",
+        "zh": "成功计算{start}至{end}共{months}个月的结算，共{count}条记录"
+    },
 
     # 配置错误
     "config_error": {
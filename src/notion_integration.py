@@ -9,6 +9,23 @@ import time
 import traceback
 import requests
 
+try:
+    from .url_canonical import URLCanonicalizer
+    from .scrape_cache import ScrapeCache, DEAD_REASONS
+    from .refresh_policy import RefreshPolicy
+    from .circuit_breaker import CircuitBreaker
+    from .retry_queue import RetryQueue
+    from .utils import VideoIndex
+    from .settlement_ledger import SettlementLedger
+except ImportError:
+    from url_canonical import URLCanonicalizer
+    from scrape_cache import ScrapeCache, DEAD_REASONS
+    from refresh_policy import RefreshPolicy
+    from circuit_breaker import CircuitBreaker
+    from retry_queue import RetryQueue
+    from utils import VideoIndex
+    from settlement_ledger import SettlementLedger
+
 
 def format_database_id(database_id: str) -> str:
     """
@@ -381,22 +398,21 @@ class NotionIntegration:
             self.add_debug(f"获取视频行失败: {str(e)}")
             raise
 
-    def process_creator_tables(self, creator_id: str, creator_name: str, scraper) -> Dict:
+    def collect_creator_videos(self, creator_id: str, creator_name: str) -> Dict:
         """
-        处理单个创作者的所有表格
+        收集单个创作者所有表格中的视频行（只读取Notion，不爬取）
 
         Args:
             creator_id: 创作者页面ID
             creator_name: 创作者名称
-            scraper: ViewScraper实例
 
         Returns:
-            处理结果统计 {'tables_found': int, 'videos_updated': int, 'total_views': int}
+            {'tables_found': int, 'videos': List[Dict], 'errors': List[str]}
+            videos 中每一行额外包含 'views_field' 和 'creator_id'
         """
-        stats = {
+        result = {
             'tables_found': 0,
-            'videos_updated': 0,
-            'total_views': 0,
+            'videos': [],
             'errors': []
         }
 
@@ -410,9 +426,9 @@ class NotionIntegration:
 
             if not child_dbs:
                 self.add_debug(f"创作者 {creator_name} 没有子表格，跳过")
-                return stats
+                return result
 
-            stats['tables_found'] = len(child_dbs)
+            result['tables_found'] = len(child_dbs)
 
             # 处理每个子表格
             for idx, child_db in enumerate(child_dbs, 1):
@@ -433,66 +449,482 @@ class NotionIntegration:
 
                     # 获取所有视频行
                     video_rows = self.get_video_rows(db_id, link_fields, views_field)
-
-                    # 处理每个视频
                     for video in video_rows:
-                        self.add_debug(f"\n处理视频: {video['name']}")
-
-                        total_views = 0
-                        success_count = 0
-
-                        # 爬取所有链接的播放量
-                        for link in video['links']:
-                            views = scraper.scrape_views(link)
-                            if views is not None:
-                                total_views += views
-                                success_count += 1
-                                self.add_debug(f"  {link}: {views} views")
-                            else:
-                                self.add_debug(f"  {link}: 爬取失败")
-
-                        # 更新到Notion
-                        if success_count > 0:
-                            try:
-                                self.update_page_views(video['id'], views_field, total_views)
-                                stats['videos_updated'] += 1
-                                stats['total_views'] += total_views
-                                self.add_debug(f"✓ 更新成功: {video['name']} → {total_views} views")
-                            except Exception as e:
-                                error_msg = f"更新失败: {video['name']} - {str(e)}"
-                                self.add_debug(f"✗ {error_msg}")
-                                stats['errors'].append(error_msg)
-                        else:
-                            error_msg = f"所有链接爬取失败: {video['name']}"
-                            self.add_debug(f"✗ {error_msg}")
-                            stats['errors'].append(error_msg)
+                        video['views_field'] = views_field
+                        video['creator_id'] = creator_id
+                        result['videos'].append(video)
 
                 except Exception as e:
                     error_msg = f"处理表格失败: {str(e)}"
                     self.add_debug(f"✗ {error_msg}")
-                    stats['errors'].append(error_msg)
-
-            self.add_debug(f"\n创作者 {creator_name} 处理完成:")
-            self.add_debug(f"- 找到表格: {stats['tables_found']}")
-            self.add_debug(f"- 更新视频: {stats['videos_updated']}")
-            self.add_debug(f"- 总播放量: {stats['total_views']}")
+                    result['errors'].append(error_msg)
 
-            return stats
+            return result
 
         except Exception as e:
             error_msg = f"处理创作者失败: {creator_name} - {str(e)}"
             self.add_debug(f"✗ {error_msg}")
+            result['errors'].append(error_msg)
+            return result
+
+    def collect_settlement_data(self, master_db_id: str, ledger: Optional[SettlementLedger] = None) -> VideoIndex:
+        """
+        读取所有创作者的视频标题和当前播放量，边读取边建立按月份的索引（读取一次可结算任意多个月）
+
+        Args:
+            master_db_id: 主数据库ID
+            ledger: 结算汇总（可选），按读取到的播放量同步
+
+        Returns:
+            VideoIndex（无法识别日期的标题在 unparsed 中，并在调试日志中报告一次）
+        """
+        index = VideoIndex()
+        creators = self.get_all_creators(master_db_id)
+        all_videos = []
+        complete = True
+        for creator in creators:
+            collected = self.collect_creator_videos(creator['id'], creator['name'])
+            all_videos.extend(collected['videos'])
+            complete = complete and not collected['errors']
+            # 视频名称即日期（如 20251114-1）
+            unparsed = index.add_creator(creator['name'], creator.get('label', ''),
+                                         [{'date': video['name'], 'views': video['current_views']}
+                                          for video in collected['videos']])
+            for title in unparsed:
+                self.add_debug(f"无法识别日期的视频标题（不计入结算）: {creator['name']} - {title}")
+
+        if ledger is not None:
+            ledger.set_creators(creators)
+            ledger.sync(all_videos, complete=complete)
+            ledger.save()
+        return index
+
+    def _scrape_unique_links(self, targets: Dict[str, Dict], scraper, cache: Optional[ScrapeCache] = None,
+                             breaker: Optional[CircuitBreaker] = None, max_deferred_wait: float = 300.0,
+                             blocked: Optional[Dict[str, str]] = None, fetch_workers: int = 1,
+                             deadline: Optional[float] = None, failures: Optional[Dict[str, str]] = None,
+                             cached: Optional[set] = None):
+        """
+        逐个爬取去重后的链接
+
+        平台熔断期间，该平台的链接推迟到本轮最后；冷却结束后先放行一个探测请求，
+        平台恢复则继续爬取推迟的链接，等待总时长超过 max_deferred_wait 则放弃；
+        超过 deadline 后剩余的链接不再爬取
+
+        Args:
+            targets: {canonical_key: {'url': str, 'platform': str, ...}}
+            scraper: 爬取器实例
+            cache: 爬取结果缓存（可选），有效期内的结果直接复用，不可用的视频直接跳过
+            breaker: 按平台的熔断器（可选）
+            max_deferred_wait: 等待熔断平台恢复的最长总时间（秒）
+            blocked: 最终没有爬取的链接 {canonical_key: 原因}，原因为 'breaker'（平台熔断）或 'budget'（超出时间预算），原地更新（可选）
+            fetch_workers: 并发下载数，大于1且爬取器支持 scrape_many 时并发下载、多进程解析
+            deadline: 本轮爬取的截止时间（time.time()，可选）
+            failures: 爬取失败（或缓存中已知不可用）的链接 {canonical_key: 失败原因}，原地更新（可选）
+            cached: 结果来自缓存（本轮没有重新爬取）的链接，原地更新（可选）
+
+        Yields:
+            (canonical_key, views) - 失败时views为None
+        """
+        if blocked is None:
+            blocked = {}
+        if failures is None:
+            failures = {}
+        if cached is None:
+            cached = set()
+        over_budget = lambda: deadline is not None and time.time() >= deadline
+
+        deferred = []
+        to_scrape = []
+        for key, target in targets.items():
+            if cache is not None:
+                entry = cache.get(key)
+                if entry is not None:
+                    cached.add(key)
+                    if entry['status'] == 'ok':
+                        self.add_debug(f"  缓存命中: {target['url']}")
+                        yield key, entry['views']
+                    else:
+                        self.add_debug(f"  跳过不可用视频 ({entry['reason']}): {target['url']}")
+                        failures[key] = entry['reason']
+                        yield key, None
+                    continue
+
+            to_scrape.append(key)
+
+        if fetch_workers > 1 and hasattr(scraper, 'scrape_many'):
+            # 并发模式：结果按完成顺序返回，熔断器在下载线程发请求前检查
+            by_url = {targets[key]['url']: key for key in to_scrape}
+            allow = None
+            if breaker is not None:
+                allow = lambda url: breaker.allow(targets[by_url[url]].get('platform'))
+
+            for url, views in scraper.scrape_many(list(by_url), fetch_workers=fetch_workers, allow=allow):
+                key = by_url[url]
+                failure = getattr(scraper, 'last_failure', None)
+                if failure == 'deferred':
+                    deferred.append(key)
+                    continue
+                if failure == 'budget':
+                    self.add_debug(f"  超出时间预算，未爬取: {url}")
+                    blocked[key] = 'budget'
+                    yield key, None
+                    continue
+                self._record_result(key, targets[key], views, scraper, cache, breaker)
+                if views is None:
+                    failures[key] = failure or 'error'
+                yield key, views
+        else:
+            for key in to_scrape:
+                if over_budget():
+                    self.add_debug(f"  超出时间预算，未爬取: {targets[key]['url']}")
+                    blocked[key] = 'budget'
+                    yield key, None
+                    continue
+                if breaker is not None and not breaker.allow(targets[key].get('platform')):
+                    deferred.append(key)
+                    continue
+                yield key, self._scrape_target(key, targets[key], scraper, cache, breaker, blocked, failures)
+
+        if not deferred:
+            return
+
+        self.add_debug(f"\n{len(deferred)} 个链接因平台熔断被推迟: {breaker.snapshot()}")
+
+        waited = 0.0
+        while deferred and not over_budget():
+            ready = next((key for key in deferred if breaker.allow(targets[key].get('platform'))), None)
+            if ready is None:
+                wait = min(breaker.retry_after(targets[key].get('platform')) for key in deferred)
+                if waited + wait > max_deferred_wait or (deadline is not None and time.time() + wait > deadline):
+                    break
+                self.add_debug(f"  等待 {wait:.0f} 秒后探测被熔断的平台")
+                time.sleep(wait)
+                waited += wait
+                continue
+
+            deferred.remove(ready)
+            yield ready, self._scrape_target(ready, targets[ready], scraper, cache, breaker, blocked, failures)
+
+        for key in deferred:
+            self.add_debug(f"  平台仍被拦截，放弃: {targets[key]['url']}")
+            blocked[key] = 'breaker'
+            yield key, None
+
+    def _scrape_target(self, key: str, target: Dict, scraper, cache: Optional[ScrapeCache],
+                       breaker: Optional[CircuitBreaker], blocked: Dict[str, str],
+                       failures: Dict[str, str]) -> Optional[int]:
+        """
+        爬取单个链接，并把结果记录到缓存和熔断器
+
+        爬取器因超出时间预算没有发请求时记入 blocked，其它失败记入 failures
+        """
+        views = scraper.scrape_views(target['url'])
+        if getattr(scraper, 'last_failure', None) == 'budget':
+            blocked[key] = 'budget'
+            return None
+        self._record_result(key, target, views, scraper, cache, breaker)
+        if views is None:
+            failures[key] = getattr(scraper, 'last_failure', None) or 'error'
+        return views
+
+    def _record_result(self, key: str, target: Dict, views: Optional[int], scraper,
+                       cache: Optional[ScrapeCache], breaker: Optional[CircuitBreaker]):
+        """把一次爬取结果记录到缓存和熔断器"""
+        if cache is not None:
+            cache.record(key, views, scraper)
+        if breaker is not None:
+            platform = target.get('platform')
+            was_open = breaker.is_open(platform)
+            breaker.record(platform, views is not None, getattr(scraper, 'last_failure', None))
+            if breaker.is_open(platform) and not was_open:
+                self.add_debug(f"  ⚠ {platform} 连续被拦截，暂停该平台 ({getattr(scraper, 'last_failure', None)})")
+            elif was_open and not breaker.is_open(platform):
+                self.add_debug(f"  ✓ {platform} 已恢复")
+
+    def update_videos(self, videos: List[Dict], scraper, canonicalizer: Optional[URLCanonicalizer] = None,
+                      cache: Optional[ScrapeCache] = None, refresh_policy: Optional[RefreshPolicy] = None,
+                      breaker: Optional[CircuitBreaker] = None, fetch_workers: int = 1,
+                      run_budget: Optional[float] = None, retry_queue: Optional[RetryQueue] = None,
+                      ledger: Optional[SettlementLedger] = None) -> Dict:
+        """
+        爬取并更新一批视频行
+
+        同一个视频（规范化后的链接相同）在整批中只爬取一次，结果分发给所有引用它的行；
+        每一行的所有链接都有结果后立即写回Notion；含有被平台拦截或超出时间预算而没有爬取的链接的行不写回，
+        避免写入偏小的总数（这些行下次运行时仍然到期）
+
+        Args:
+            videos: 视频行列表（来自 collect_creator_videos）
+            scraper: 爬取器实例
+            canonicalizer: 链接规范化器，默认新建一个
+            cache: 爬取结果缓存（可选）
+            refresh_policy: 刷新策略（可选），只爬取到期的视频行
+            breaker: 按平台的熔断器（可选），平台持续拦截时推迟其链接
+            fetch_workers: 并发下载数（1为逐个爬取），结果按完成顺序写回
+            run_budget: 本轮爬取的时间预算（秒，None为不限制），到时后不再发新请求
+            retry_queue: 失败重试队列（可选），有链接失败的行加入队列，所有链接都成功的行移出队列
+            ledger: 结算汇总（可选），每写回一行按播放量的差值更新所在月份的汇总
+
+        Returns:
+            按创作者统计 {creator_id: {'videos_updated': int, 'videos_skipped': int,
+                                       'total_views': int, 'errors': List[str],
+                                       'failed': {page_id: 错误信息}}}
+        """
+        if canonicalizer is None:
+            canonicalizer = URLCanonicalizer()
+
+        results = {}
+        for video in videos:
+            results.setdefault(video['creator_id'], {
+                'videos_updated': 0,
+                'videos_skipped': 0,
+                'total_views': 0,
+                'errors': [],
+                'failed': {}
+            })
+
+        # 按刷新策略筛选本次需要爬取的行
+        if refresh_policy is not None:
+            due_videos = []
+            for video in videos:
+                due, _ = refresh_policy.is_due(video)
+                if due:
+                    due_videos.append(video)
+                else:
+                    results[video['creator_id']]['videos_skipped'] += 1
+            self.add_debug(f"\n刷新策略: {len(due_videos)}/{len(videos)} 个视频行到期需要刷新")
+            videos = due_videos
+
+        # 规范化并去重：同一行内重复的视频只算一次，不同行共享同一次爬取
+        targets = {}
+        pending = {}
+        for idx, video in enumerate(videos):
+            keys = []
+            for link in video['links']:
+                canonical = canonicalizer.canonicalize(link)
+                if canonical['key'] in keys:
+                    continue
+                keys.append(canonical['key'])
+                target = targets.setdefault(canonical['key'], {
+                    'url': canonical['url'],
+                    'platform': canonical['platform'],
+                    'rows': []
+                })
+                target['rows'].append(idx)
+            video['link_keys'] = keys
+            pending[idx] = len(keys)
+
+        canonicalizer.save_cache()
+
+        total_links = sum(len(video['links']) for video in videos)
+        self.add_debug(f"\n共 {len(videos)} 个视频行, {total_links} 个链接, 去重后需爬取 {len(targets)} 个")
+
+        deadline = None
+        if run_budget:
+            deadline = time.time() + run_budget
+            self.add_debug(f"本轮爬取时间预算: {run_budget:.0f} 秒")
+        if hasattr(scraper, 'set_deadline'):
+            scraper.set_deadline(deadline)
+
+        scraped = {}
+        blocked = {}
+        failures = {}
+        cached = set()
+        try:
+            for key, views in self._scrape_unique_links(targets, scraper, cache, breaker, blocked=blocked,
+                                                         fetch_workers=fetch_workers, deadline=deadline,
+                                                         failures=failures, cached=cached):
+                scraped[key] = views
+                self.add_debug(f"  {targets[key]['url']}: {views if views is not None else '爬取失败'} views")
+
+                # 所有链接都有结果的行立即写回
+                for idx in targets[key]['rows']:
+                    pending[idx] -= 1
+                    if pending[idx] == 0:
+                        total_views = self._write_video_views(videos[idx], scraped,
+                                                              results[videos[idx]['creator_id']], blocked)
+                        # 含有缓存结果或失败链接的行不记为新的观测：缓存的播放量与上次相同、
+                        # 部分链接失败的总播放量偏低，都会被误判为增长放缓而拉长刷新间隔
+                        if (total_views is not None and refresh_policy is not None
+                                and all(scraped.get(key) is not None for key in videos[idx]['link_keys'])
+                                and not any(key in cached for key in videos[idx]['link_keys'])):
+                            refresh_policy.record(videos[idx], total_views)
+                        if total_views is not None and ledger is not None:
+                            ledger.record(videos[idx], total_views)
+                        if retry_queue is not None:
+                            reasons = {targets[key]['url']: blocked.get(key) or failures.get(key)
+                                       for key in videos[idx]['link_keys'] if scraped.get(key) is None}
+                            self._queue_retry(retry_queue, videos[idx], reasons, total_views)
+        finally:
+            if hasattr(scraper, 'set_deadline'):
+                scraper.set_deadline(None)
+
+        budget_skipped = sum(1 for reason in blocked.values() if reason == 'budget')
+        if budget_skipped:
+            self.add_debug(f"\n⏱ 时间预算用完，{budget_skipped} 个链接留到下次运行")
+
+        if cache is not None:
+            cache.compact()
+        if refresh_policy is not None:
+            refresh_policy.save_history()
+        if ledger is not None:
+            ledger.save()
+
+        return results
+
+    def _queue_retry(self, retry_queue: RetryQueue, video: Dict, reasons: Dict[str, str],
+                     total_views: Optional[int]):
+        """
+        根据一行的写回结果更新重试队列
+
+        Args:
+            retry_queue: 失败重试队列
+            video: 视频行
+            reasons: 该行失败链接的失败原因 {url: reason}
+            total_views: 写回的总播放量（失败为None；部分链接失败时只包含成功的链接，失败的链接仍加入队列）
+        """
+        if not reasons:
+            retry_queue.remove(video['id'])
+            return
+
+        if all(reason in DEAD_REASONS or reason == 'unsupported' for reason in reasons.values()):
+            # 视频已删除/私密，重试不会成功（缓存会按退避时间跳过）
+            retry_queue.remove(video['id'])
+            return
+        if all(reason == 'budget' for reason in reasons.values()):
+            # 只是本轮没来得及爬取，下次运行仍然到期
+            return
+
+        if retry_queue.add(video, reasons):
+            self.add_debug(f"  加入重试队列: {video['name']}")
+        else:
+            self.add_debug(f"  多次重试仍失败，移出重试队列: {video['name']}")
+
+    def _write_video_views(self, video: Dict, scraped: Dict, stats: Dict,
+                           blocked: Optional[Dict[str, str]] = None) -> Optional[int]:
+        """
+        汇总一行的所有链接播放量并写回Notion
+
+        Args:
+            video: 视频行
+            scraped: {canonical_key: views}
+            stats: 该创作者的统计，原地更新
+            blocked: 没有爬取的链接 {canonical_key: 'breaker' 或 'budget'}（可选）
+
+        Returns:
+            写回的总播放量，失败返回None
+        """
+        self.add_debug(f"\n处理视频: {video['name']}")
+
+        reasons = {blocked[key] for key in video['link_keys'] if blocked and key in blocked}
+        if reasons:
+            if 'breaker' in reasons:
+                error_msg = f"平台拦截，已推迟: {video['name']}"
+            else:
+                error_msg = f"超出时间预算，未爬取: {video['name']}"
+            self.add_debug(f"✗ {error_msg}")
             stats['errors'].append(error_msg)
-            return stats
+            stats['failed'][video['id']] = error_msg
+            return None
+
+        total_views = 0
+        success_count = 0
+        for key in video['link_keys']:
+            views = scraped.get(key)
+            if views is not None:
+                total_views += views
+                success_count += 1
+
+        if success_count > 0:
+            try:
+                self.update_page_views(video['id'], video['views_field'], total_views)
+                stats['videos_updated'] += 1
+                stats['total_views'] += total_views
+                self.add_debug(f"✓ 更新成功: {video['name']} → {total_views} views")
+                return total_views
+            except Exception as e:
+                error_msg = f"更新失败: {video['name']} - {str(e)}"
+                self.add_debug(f"✗ {error_msg}")
+                stats['errors'].append(error_msg)
+                stats['failed'][video['id']] = error_msg
+        else:
+            error_msg = f"所有链接爬取失败: {video['name']}"
+            self.add_debug(f"✗ {error_msg}")
+            stats['errors'].append(error_msg)
+            stats['failed'][video['id']] = error_msg
+        return None
+
+    def process_creator_tables(self, creator_id: str, creator_name: str, scraper,
+                               cache: Optional[ScrapeCache] = None,
+                               refresh_policy: Optional[RefreshPolicy] = None,
+                               breaker: Optional[CircuitBreaker] = None,
+                               retry_queue: Optional[RetryQueue] = None) -> Dict:
+        """
+        处理单个创作者的所有表格
+
+        Args:
+            creator_id: 创作者页面ID
+            creator_name: 创作者名称
+            scraper: ViewScraper实例
+            cache: 爬取结果缓存（可选），复用有效期内的结果并跳过已知不可用的视频
+            refresh_policy: 刷新策略（可选），只爬取到期的视频行
+            breaker: 按平台的熔断器（可选）
+            retry_queue: 失败重试队列（可选），有链接失败的行加入队列
 
-    def batch_update_all_creators(self, master_db_id: str, scraper, delay: float = 2.0) -> Dict:
+        Returns:
+            处理结果统计 {'tables_found': int, 'videos_updated': int, 'total_views': int}
+        """
+        collected = self.collect_creator_videos(creator_id, creator_name)
+        stats = {
+            'tables_found': collected['tables_found'],
+            'videos_updated': 0,
+            'total_views': 0,
+            'errors': collected['errors']
+        }
+
+        if collected['videos']:
+            results = self.update_videos(collected['videos'], scraper, cache=cache,
+                                         refresh_policy=refresh_policy, breaker=breaker, retry_queue=retry_queue)
+            if retry_queue is not None:
+                retry_queue.save()
+            creator_result = results[creator_id]
+            stats['videos_updated'] = creator_result['videos_updated']
+            stats['total_views'] = creator_result['total_views']
+            stats['errors'].extend(creator_result['errors'])
+
+        self.add_debug(f"\n创作者 {creator_name} 处理完成:")
+        self.add_debug(f"- 找到表格: {stats['tables_found']}")
+        self.add_debug(f"- 更新视频: {stats['videos_updated']}")
+        self.add_debug(f"- 总播放量: {stats['total_views']}")
+
+        return stats
+
+    def batch_update_all_creators(self, master_db_id: str, scraper, delay: float = 2.0,
+                                  cache: Optional[ScrapeCache] = None,
+                                  refresh_policy: Optional[RefreshPolicy] = None,
+                                  breaker: Optional[CircuitBreaker] = None, fetch_workers: int = 1,
+                                  run_budget: Optional[float] = None, retry_queue: Optional[RetryQueue] = None,
+                                  retry_passes: int = 1, retry_wait: float = 30.0,
+                                  ledger: Optional[SettlementLedger] = None) -> Dict:
         """
         批量更新所有创作者的视频播放量
 
+        先收集所有创作者的视频行，再对整批链接去重后爬取，避免重复视频被多次加载
+
         Args:
             master_db_id: 主数据库ID
             scraper: ViewScraper实例
-            delay: 每个视频之间的延迟（秒）
+            delay: 每个创作者之间读取Notion的延迟（秒）
+            cache: 爬取结果缓存（可选）
+            refresh_policy: 刷新策略（可选），只爬取到期的视频行
+            breaker: 按平台的熔断器（可选）
+            fetch_workers: 并发下载数（1为逐个爬取）
+            run_budget: 爬取阶段的时间预算（秒，None为不限制），包括结束时的重试
+            retry_queue: 失败重试队列（可选），失败的行加入队列
+            retry_passes: 本轮结束时对本轮失败的行重试几次（需要 retry_queue）
+            retry_wait: 每次重试前等待的秒数（让偶发的拦截或网络问题恢复）
+            ledger: 结算汇总（可选），先按读取到的播放量同步，写回时按差值更新
 
         Returns:
             总体统计结果，包含creator_details列表
@@ -501,6 +933,7 @@ class NotionIntegration:
             'creators_processed': 0,
             'tables_found': 0,
             'videos_updated': 0,
+            'videos_skipped': 0,
             'total_views': 0,
             'errors': [],
             'creator_details': []  # 新增：存储每个创作者的详细信息
@@ -514,37 +947,53 @@ class NotionIntegration:
                 self.add_debug("没有找到任何创作者")
                 return total_stats
 
-            # 处理每个创作者
+            # 第一阶段：收集所有创作者的视频行
+            all_videos = []
             for idx, creator in enumerate(creators, 1):
                 self.add_debug(f"\n\n{'#'*60}")
                 self.add_debug(f"进度: {idx}/{len(creators)}")
                 self.add_debug(f"{'#'*60}")
 
-                stats = self.process_creator_tables(
-                    creator['id'],
-                    creator['name'],
-                    scraper
-                )
-
-                # 保存创作者详细信息
-                creator_detail = {
-                    'name': creator['name'],
-                    'label': creator['label'],
-                    'videos_updated': stats['videos_updated'],
-                    'total_views': stats['total_views']
-                }
-                total_stats['creator_details'].append(creator_detail)
+                collected = self.collect_creator_videos(creator['id'], creator['name'])
+                all_videos.extend(collected['videos'])
 
-                total_stats['creators_processed'] += 1
-                total_stats['tables_found'] += stats['tables_found']
-                total_stats['videos_updated'] += stats['videos_updated']
-                total_stats['total_views'] += stats['total_views']
-                total_stats['errors'].extend(stats['errors'])
+                total_stats['tables_found'] += collected['tables_found']
+                total_stats['errors'].extend(collected['errors'])
 
                 # 延迟，避免请求过快
                 if idx < len(creators):
                     time.sleep(delay)
 
+            # 汇总先与Notion中的当前播放量同步（所有表格都读取成功时删除已不存在的行）
+            if ledger is not None:
+                ledger.set_creators(creators)
+                ledger.sync(all_videos, complete=not total_stats['errors'])
+
+            # 第二阶段：整批去重爬取并写回
+            run_started = time.time()
+            results = self.update_videos(all_videos, scraper, cache=cache, refresh_policy=refresh_policy,
+                                         breaker=breaker, fetch_workers=fetch_workers, run_budget=run_budget,
+                                         retry_queue=retry_queue, ledger=ledger)
+
+            # 第三阶段：只重试本轮失败的行
+            if retry_queue is not None:
+                for attempt in range(1, retry_passes + 1):
+                    retry_videos = retry_queue.failed_since(run_started)
+                    remaining = run_budget - (time.time() - run_started) if run_budget else None
+                    if not retry_videos or (remaining is not None and remaining <= retry_wait):
+                        break
+                    self.add_debug(f"\n第 {attempt} 次重试: {len(retry_videos)} 个失败的视频行，"
+                                   f"{retry_wait:.0f} 秒后开始")
+                    time.sleep(retry_wait)
+                    retried = self.update_videos(retry_videos, scraper, cache=cache, refresh_policy=refresh_policy,
+                                                 breaker=breaker, fetch_workers=fetch_workers,
+                                                 run_budget=remaining - retry_wait if remaining else None,
+                                                 retry_queue=retry_queue, ledger=ledger)
+                    self._merge_retry_results(results, retried, retry_videos)
+                retry_queue.save()
+
+            self._add_creator_results(creators, results, total_stats)
+
             # 输出总结
             self.add_debug(f"\n\n{'='*60}")
             self.add_debug(f"批量更新完成！")
@@ -552,6 +1001,7 @@ class NotionIntegration:
             self.add_debug(f"处理创作者: {total_stats['creators_processed']}")
             self.add_debug(f"找到表格: {total_stats['tables_found']}")
             self.add_debug(f"更新视频: {total_stats['videos_updated']}")
+            self.add_debug(f"未到期跳过: {total_stats['videos_skipped']}")
             self.add_debug(f"总播放量: {total_stats['total_views']}")
             self.add_debug(f"错误数量: {len(total_stats['errors'])}")
 
@@ -562,3 +1012,115 @@ class NotionIntegration:
             self.add_debug(f"✗ {error_msg}")
             total_stats['errors'].append(error_msg)
             return total_stats
+
+    def retry_failed_videos(self, master_db_id: str, scraper, retry_queue: RetryQueue,
+                            cache: Optional[ScrapeCache] = None, breaker: Optional[CircuitBreaker] = None,
+                            fetch_workers: int = 1, run_budget: Optional[float] = None, force: bool = False,
+                            ledger: Optional[SettlementLedger] = None) -> Dict:
+        """
+        重试模式：只爬取重试队列中到期的视频行（不读取创作者的表格，不爬取健康的链接）
+
+        Args:
+            master_db_id: 主数据库ID（读取创作者名称和标签用于显示）
+            scraper: 爬取器实例
+            retry_queue: 失败重试队列
+            cache: 爬取结果缓存（可选），行内已成功的链接直接复用
+            breaker: 按平台的熔断器（可选）
+            fetch_workers: 并发下载数（1为逐个爬取）
+            run_budget: 时间预算（秒，None为不限制）
+            force: 忽略下次重试时间，重试队列中所有的行
+            ledger: 结算汇总（可选），写回时按差值更新
+
+        Returns:
+            总体统计结果（格式与 batch_update_all_creators 相同）
+        """
+        total_stats = {
+            'creators_processed': 0,
+            'tables_found': 0,
+            'videos_updated': 0,
+            'videos_skipped': 0,
+            'total_views': 0,
+            'errors': [],
+            'creator_details': []
+        }
+
+        try:
+            videos = retry_queue.due(force=force)
+            self.add_debug(f"重试队列: {len(videos)}/{len(retry_queue)} 个视频行到期")
+            if not videos:
+                return total_stats
+
+            results = self.update_videos(videos, scraper, cache=cache, breaker=breaker,
+                                         fetch_workers=fetch_workers, run_budget=run_budget,
+                                         retry_queue=retry_queue, ledger=ledger)
+            retry_queue.save()
+
+            creators = [creator for creator in self.get_all_creators(master_db_id) if creator['id'] in results]
+            self._add_creator_results(creators, results, total_stats)
+            self.add_debug(f"\n重试完成: 更新 {total_stats['videos_updated']} 个视频行，"
+                           f"队列中还有 {len(retry_queue)} 个")
+            return total_stats
+
+        except Exception as e:
+            error_msg = f"重试失败: {str(e)}\n{traceback.format_exc()}"
+            self.add_debug(f"✗ {error_msg}")
+            total_stats['errors'].append(error_msg)
+            return total_stats
+
+    def _merge_retry_results(self, results: Dict, retried: Dict, retry_videos: List[Dict]):
+        """
+        把重试的结果合并到本轮结果中：重试成功的行计入更新数，并去掉第一次失败时的错误信息
+
+        Args:
+            results: 本轮 update_videos 的结果，原地更新
+            retried: 重试的 update_videos 结果
+            retry_videos: 重试的视频行
+        """
+        recovered = 0
+        for video in retry_videos:
+            creator_result = results.get(video['creator_id'])
+            retry_result = retried.get(video['creator_id'])
+            if creator_result is None or retry_result is None or video['id'] in retry_result['failed']:
+                continue
+            error_msg = creator_result['failed'].pop(video['id'], None)
+            if error_msg in creator_result['errors']:
+                creator_result['errors'].remove(error_msg)
+            recovered += 1
+
+        for creator_id, retry_result in retried.items():
+            if creator_id in results:
+                results[creator_id]['videos_updated'] += retry_result['videos_updated']
+                results[creator_id]['total_views'] += retry_result['total_views']
+        self.add_debug(f"重试恢复 {recovered}/{len(retry_videos)} 个视频行")
+
+    def _add_creator_results(self, creators: List[Dict], results: Dict, total_stats: Dict):
+        """
+        把按创作者的 update_videos 结果汇总到总体统计中
+
+        Args:
+            creators: 创作者列表（来自 get_all_creators）
+            results: update_videos 的结果
+            total_stats: 总体统计，原地更新
+        """
+        for creator in creators:
+            creator_result = results.get(creator['id'], {
+                'videos_updated': 0,
+                'videos_skipped': 0,
+                'total_views': 0,
+                'errors': []
+            })
+
+            # 保存创作者详细信息
+            creator_detail = {
+                'name': creator['name'],
+                'label': creator['label'],
+                'videos_updated': creator_result['videos_updated'],
+                'total_views': creator_result['total_views']
+            }
+            total_stats['creator_details'].append(creator_detail)
+
+            total_stats['creators_processed'] += 1
+            total_stats['videos_updated'] += creator_result['videos_updated']
+            total_stats['videos_skipped'] += creator_result['videos_skipped']
+            total_stats['total_views'] += creator_result['total_views']
+            total_stats['errors'].extend(creator_result['errors'])
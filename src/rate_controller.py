@@ -0,0 +1,152 @@
+"""
+自适应限速模块
+按平台用AIMD（加性增、乘性减）调整并发数和请求间隔：
+成功率保持正常时逐步提高并发、缩短间隔；遇到限流、登录墙、验证页或超时时并发减半、间隔加倍
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+# 说明请求过快被平台拦截的失败原因
+BACKOFF_FAILURES = ('rate_limited', 'login_wall', 'captcha', 'timeout')
+
+
+class RateController:
+    """按平台的AIMD并发/间隔控制器（线程安全）"""
+
+    def __init__(self, max_delay: float = 2.0, min_delay: float = 0.2, max_concurrency: int = 4,
+                 increase_every: int = 5, delay_step: float = 0.25, backoff_factor: float = 2.0,
+                 state_file: Optional[str] = './data/rate_control.json'):
+        """
+        初始化控制器
+
+        Args:
+            max_delay: 请求间隔的上限（秒），拦截时加倍到此为止，持续拦截交给熔断器处理
+            min_delay: 请求间隔的下限（秒）
+            max_concurrency: 每个平台并发数的上限
+            increase_every: 连续多少次正常结果后加一个并发、缩短一次间隔
+            delay_step: 每次缩短的间隔（秒）
+            backoff_factor: 拦截时间隔乘以该值、并发除以该值
+            state_file: 各平台当前速度的保存路径（下次运行从这里开始），None则不保存
+        """
+        self.max_delay = max_delay
+        self.min_delay = min(min_delay, max_delay)
+        self.max_concurrency = max(1, max_concurrency)
+        self.increase_every = increase_every
+        self.delay_step = delay_step
+        self.backoff_factor = backoff_factor
+        self.state_file = state_file
+
+        # {platform: {'delay': float, 'concurrency': int, 'streak': int, 'backoffs': int,
+        #             'backoff_at': float}}
+        self.platforms: Dict[str, Dict] = self._load_state()
+        self._in_flight: Dict[str, int] = {}
+        self._condition = threading.Condition()
+
+    def _load_state(self) -> Dict:
+        """加载上次运行结束时的速度（按本次的上下限截断）"""
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    platforms = json.load(f)
+                for state in platforms.values():
+                    state['delay'] = min(self.max_delay, max(self.min_delay, state['delay']))
+                    state['concurrency'] = min(self.max_concurrency, max(1, state['concurrency']))
+                    state['streak'] = 0
+                return platforms
+            except:
+                return {}
+        return {}
+
+    def save(self):
+        """保存各平台当前速度"""
+        if not self.state_file:
+            return
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+    def _state(self, platform: str) -> Dict:
+        """获取（或创建）平台状态，新平台从最慢的速度开始"""
+        if platform not in self.platforms:
+            self.platforms[platform] = {
+                'delay': self.max_delay,
+                'concurrency': 1,
+                'streak': 0,
+                'backoffs': 0,
+                'backoff_at': 0.0
+            }
+        return self.platforms[platform]
+
+    def delay(self, platform: str) -> float:
+        """该平台当前的请求间隔（秒）"""
+        with self._condition:
+            return self._state(platform)['delay']
+
+    def concurrency(self, platform: str) -> int:
+        """该平台当前允许的并发数"""
+        with self._condition:
+            return self._state(platform)['concurrency']
+
+    def acquire(self, platform: str):
+        """占用该平台的一个并发名额，名额用完时等待"""
+        with self._condition:
+            while self._in_flight.get(platform, 0) >= self._state(platform)['concurrency']:
+                self._condition.wait()
+            self._in_flight[platform] = self._in_flight.get(platform, 0) + 1
+
+    def release(self, platform: str):
+        """释放该平台的一个并发名额"""
+        with self._condition:
+            self._in_flight[platform] = max(0, self._in_flight.get(platform, 0) - 1)
+            self._condition.notify_all()
+
+    def record(self, platform: str, success: bool, failure: Optional[str] = None, now: Optional[float] = None):
+        """
+        记录一次请求的结果并调整速度
+
+        只有拿到播放量的请求计入连续正常结果；页面没有播放量（no_data，可能是返回200的软拦截）
+        不加速并清零连续正常结果；视频级失败（已删除、私密等）和偶发错误不加速也不减速；
+        同一批并发请求一起被拦截时只减速一次（两次减速至少间隔一个请求间隔）
+
+        Args:
+            platform: 平台名称
+            success: 是否成功
+            failure: 失败原因
+            now: 当前时间（测试用）
+        """
+        now = time.time() if now is None else now
+        with self._condition:
+            state = self._state(platform)
+            if not success and failure in BACKOFF_FAILURES:
+                state['streak'] = 0
+                if now - state['backoff_at'] < state['delay']:
+                    return
+                state['delay'] = min(self.max_delay, state['delay'] * self.backoff_factor)
+                state['concurrency'] = max(1, int(state['concurrency'] / self.backoff_factor))
+                state['backoffs'] += 1
+                state['backoff_at'] = now
+                return
+
+            if not success:
+                if failure == 'no_data':
+                    state['streak'] = 0
+                return
+
+            state['streak'] += 1
+            if state['streak'] >= self.increase_every:
+                state['streak'] = 0
+                state['concurrency'] = min(self.max_concurrency, state['concurrency'] + 1)
+                state['delay'] = max(self.min_delay, state['delay'] - self.delay_step)
+                self._condition.notify_all()
+
+    def snapshot(self) -> Dict:
+        """各平台当前速度的副本"""
+        with self._condition:
+            return json.loads(json.dumps(self.platforms))
@@ -0,0 +1,259 @@
+"""
+结算费率表模块
+底薪档位（按创作者标签匹配）、提成单位和取整方式、生效月份都从配置文件读取（./data/rate_tables.json），
+没有配置文件时使用默认费率（Core UGC $20/条，其他 $10/条，每1000 views $1，向下取整）；
+费率表编译成数组，可以一次计算整月的结算，也可以同时按多个候选费率表计算（费率调整的假设分析）
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# 默认费率（与配置文件中一个费率表的格式相同）
+DEFAULT_TABLE = {
+    'name': 'default',
+    # 按顺序匹配，第一个匹配的档位生效；labels 为空的档位匹配所有标签（放在最后作为默认档位）
+    'tiers': [
+        {'name': 'Core UGC', 'labels': ['Core UGC'], 'base_pay': 20},
+        {'name': 'Discord UGC', 'labels': [], 'base_pay': 10}
+    ],
+    'commission_unit': 1000,
+    'commission_rate': 1,
+    'rounding': 'floor',
+    # 生效月份 'YYYY-MM'（包含），None表示不限
+    'effective_from': None,
+    'effective_to': None
+}
+
+# 提成取整方式：floor 按单位向下取整，round 四舍五入，ceil 向上取整，none 按比例不取整
+ROUNDING_MODES = ('floor', 'round', 'ceil', 'none')
+
+
+def normalize_label(label) -> str:
+    """标签比较前去掉空格并转小写（Notion中可能是 "Core UGC" 或 "coreugc"）"""
+    if not isinstance(label, str):
+        return ''
+    return label.lower().replace(' ', '')
+
+
+def _parse_month(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """把 'YYYY-MM' 解析为 (年, 月)"""
+    if value is None:
+        return None
+    try:
+        year, month = str(value).split('-')
+        year, month = int(year), int(month)
+    except ValueError:
+        raise ValueError(f"费率表生效月份格式错误（应为 YYYY-MM）: {value}")
+    if not 1 <= month <= 12:
+        raise ValueError(f"费率表生效月份格式错误（应为 YYYY-MM）: {value}")
+    return year, month
+
+
+class RateTable:
+    """编译后的费率表"""
+
+    def __init__(self, config: Dict):
+        """
+        从配置编译费率表
+
+        Args:
+            config: 费率表配置（格式见 DEFAULT_TABLE）
+
+        Raises:
+            ValueError: 配置无效
+        """
+        tiers = config.get('tiers') or []
+        if not tiers:
+            raise ValueError(f"费率表 {config.get('name')} 没有底薪档位")
+        rounding = config.get('rounding', 'floor')
+        if rounding not in ROUNDING_MODES:
+            raise ValueError(f"费率表 {config.get('name')} 的取整方式无效: {rounding}（可选 {', '.join(ROUNDING_MODES)}）")
+        unit = config.get('commission_unit', 1000)
+        if not unit or unit <= 0:
+            raise ValueError(f"费率表 {config.get('name')} 的提成单位必须大于0")
+
+        self.config = config
+        self.name = config.get('name', 'default')
+        self.tier_names = [tier['name'] for tier in tiers]
+        self.tier_keys = [[normalize_label(label) for label in tier.get('labels', [])] for tier in tiers]
+        self.base_pay = np.array([tier['base_pay'] for tier in tiers])
+        self.ugc_types = np.array([f"{tier['name']} (${tier['base_pay']:g}/video)" for tier in tiers], dtype=object)
+        self.commission_unit = unit
+        self.commission_rate = config.get('commission_rate', 1)
+        self.rounding = rounding
+        self.effective_from = _parse_month(config.get('effective_from'))
+        self.effective_to = _parse_month(config.get('effective_to'))
+
+    def covers(self, year: int, month: int) -> bool:
+        """该月份是否在生效范围内"""
+        if self.effective_from is not None and (year, month) < self.effective_from:
+            return False
+        if self.effective_to is not None and (year, month) > self.effective_to:
+            return False
+        return True
+
+    def _match_tier(self, normalized: str) -> int:
+        """一个（已规范化的）标签对应的档位序号，都不匹配时使用最后一个档位"""
+        for index, keys in enumerate(self.tier_keys):
+            if not keys or any(key in normalized for key in keys):
+                return index
+        return len(self.tier_keys) - 1
+
+    def tier_index(self, labels: Sequence) -> np.ndarray:
+        """
+        批量匹配档位（每个不同的标签只匹配一次）
+
+        Args:
+            labels: 标签序列
+
+        Returns:
+            档位序号数组
+        """
+        codes, uniques = pd.factorize(pd.Series(list(labels), dtype=object).map(normalize_label))
+        if len(uniques) == 0:
+            return np.zeros(len(codes), dtype='int64')
+        return np.array([self._match_tier(label) for label in uniques], dtype='int64')[codes]
+
+    def commission(self, total_views: np.ndarray) -> np.ndarray:
+        """
+        批量计算提成
+
+        Args:
+            total_views: 总播放量数组
+
+        Returns:
+            提成数组（floor/round/ceil 为整数个单位乘以单价）
+        """
+        units = np.asarray(total_views) / self.commission_unit
+        if self.rounding == 'floor':
+            # 与 int(total_views / 1000) 相同（播放量非负）
+            units = np.trunc(units).astype('int64')
+        elif self.rounding == 'round':
+            units = np.floor(units + 0.5).astype('int64')
+        elif self.rounding == 'ceil':
+            units = np.ceil(units).astype('int64')
+        return units * self.commission_rate
+
+    def price(self, video_count: np.ndarray, total_views: np.ndarray, labels: Sequence) -> Dict[str, np.ndarray]:
+        """
+        批量计算底薪、提成和总额
+
+        Args:
+            video_count: 视频数数组
+            total_views: 总播放量数组
+            labels: 标签序列
+
+        Returns:
+            {'ugc_type', 'base_pay', 'commission', 'total'}，每项为与输入等长的数组
+        """
+        tiers = self.tier_index(labels)
+        base_pay = np.asarray(video_count) * self.base_pay[tiers]
+        commission = self.commission(total_views)
+        return {
+            'ugc_type': self.ugc_types[tiers],
+            'base_pay': base_pay,
+            'commission': commission,
+            'total': base_pay + commission
+        }
+
+
+class RateSchedule:
+    """按生效月份选用的费率表，以及用于假设分析的候选费率表"""
+
+    def __init__(self, tables: Optional[List[RateTable]] = None, scenarios: Optional[Dict[str, RateTable]] = None):
+        """
+        初始化
+
+        Args:
+            tables: 费率表列表（后面的优先，生效范围重叠时使用后面的），默认只有 DEFAULT_TABLE
+            scenarios: {方案名称: 费率表}，只用于假设分析，不影响实际结算
+        """
+        self.tables = tables or [RateTable(DEFAULT_TABLE)]
+        self.scenarios = scenarios or {}
+
+    @classmethod
+    def load(cls, config_file: Optional[str] = './data/rate_tables.json') -> 'RateSchedule':
+        """
+        从配置文件加载费率表，文件不存在时使用默认费率
+
+        配置文件格式: {'tables': [费率表, ...], 'scenarios': {方案名称: 费率表, ...}}，
+        费率表格式见 DEFAULT_TABLE
+
+        Args:
+            config_file: 配置文件路径（None则使用默认费率）
+
+        Returns:
+            RateSchedule
+
+        Raises:
+            ValueError: 配置文件无法解析或费率表无效（结算金额不能在配置出错时悄悄改用默认值）
+        """
+        if not config_file or not os.path.exists(config_file):
+            return cls()
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"费率配置文件无法解析: {config_file} - {str(e)}")
+
+        tables = [RateTable(table) for table in config.get('tables', [])]
+        scenarios = {name: RateTable(dict(table, name=name)) for name, table in config.get('scenarios', {}).items()}
+        return cls(tables, scenarios)
+
+    def table_for(self, year: int, month: int) -> RateTable:
+        """
+        该月份适用的费率表
+
+        Raises:
+            ValueError: 没有覆盖该月份的费率表
+        """
+        for table in reversed(self.tables):
+            if table.covers(year, month):
+                return table
+        raise ValueError(f"没有适用于 {year}-{month:02d} 的费率表")
+
+
+def price_scenarios(video_count: np.ndarray, total_views: np.ndarray, labels: Sequence,
+                    tables: Dict[str, RateTable]) -> pd.DataFrame:
+    """
+    同时按多个费率表计算总额（假设分析）
+
+    档位按每个费率表各自匹配；底薪按 (方案数, 行数) 的矩阵一次计算，提成按方案的单位和单价广播计算
+
+    Args:
+        video_count: 视频数数组
+        total_views: 总播放量数组
+        labels: 标签序列
+        tables: {方案名称: 费率表}
+
+    Returns:
+        DataFrame，每个方案一列总额（行与输入对应）
+    """
+    if not tables:
+        return pd.DataFrame(index=range(len(video_count)))
+
+    names = list(tables)
+    video_count = np.asarray(video_count)
+    total_views = np.asarray(total_views, dtype='float64')
+
+    # (方案数, 档位数) 的底薪矩阵，档位数不同的方案补0
+    tier_count = max(len(table.base_pay) for table in tables.values())
+    base_matrix = np.zeros((len(names), tier_count))
+    for row, name in enumerate(names):
+        base_matrix[row, :len(tables[name].base_pay)] = tables[name].base_pay
+    tiers = np.vstack([tables[name].tier_index(labels) for name in names])
+    base_pay = np.take_along_axis(base_matrix, tiers, axis=1) * video_count[None, :]
+
+    units = total_views[None, :] / np.array([tables[name].commission_unit for name in names], dtype='float64')[:, None]
+    rounding = np.array([tables[name].rounding for name in names])[:, None]
+    units = np.select([rounding == 'floor', rounding == 'round', rounding == 'ceil'],
+                      [np.trunc(units), np.floor(units + 0.5), np.ceil(units)], default=units)
+    commission = units * np.array([tables[name].commission_rate for name in names], dtype='float64')[:, None]
+
+    totals = base_pay + commission
+    return pd.DataFrame({name: totals[row] for row, name in enumerate(names)})
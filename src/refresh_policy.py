@@ -0,0 +1,141 @@
+"""
+刷新调度模块
+根据视频日期（行标题）和历史播放量增长决定本次是否需要重新爬取
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    from .utils import cached_video_date, get_month_range
+except ImportError:
+    from utils import cached_video_date, get_month_range
+
+
+class RefreshPolicy:
+    """视频刷新策略"""
+
+    def __init__(self, history_file: str = './data/refresh_history.json',
+                 settled_months: Optional[Iterable[Tuple[int, int]]] = None,
+                 fresh_days: int = 7, base_interval_hours: float = 12.0,
+                 max_interval_days: float = 30.0, slow_growth: float = 0.01,
+                 max_observations: int = 10):
+        """
+        初始化刷新策略
+
+        Args:
+            history_file: 播放量历史记录文件，None表示不落盘
+            settled_months: 已结算的 (year, month) 列表，这些月份结束后其视频不再刷新
+            fresh_days: 发布不满多少天的视频每次都刷新
+            base_interval_hours: 增长放缓后的基础刷新间隔（小时）
+            max_interval_days: 刷新间隔上限（天）
+            slow_growth: 日均增长率低于该值视为"放缓"，间隔翻倍
+            max_observations: 每个视频保留的观测条数
+        """
+        self.history_file = history_file
+        self.settled_months = set(tuple(m) for m in (settled_months or []))
+        self.fresh_seconds = fresh_days * 86400
+        self.base_interval = base_interval_hours * 3600
+        self.max_interval = max_interval_days * 86400
+        self.slow_growth = slow_growth
+        self.max_observations = max_observations
+
+        # {row_id: {'observations': [[timestamp, views], ...], 'slow_streak': int, 'next_due': float}}
+        self.history = self._load_history()
+
+    def _load_history(self) -> Dict:
+        """加载历史记录"""
+        if self.history_file and os.path.exists(self.history_file):
+            try:
+                with open(self.history_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+
+    def save_history(self):
+        """保存历史记录"""
+        if not self.history_file:
+            return
+        directory = os.path.dirname(self.history_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.history_file, 'w', encoding='utf-8') as f:
+            json.dump(self.history, f, ensure_ascii=False)
+
+    def is_due(self, video: Dict, now: Optional[float] = None) -> Tuple[bool, str]:
+        """
+        判断视频本次是否需要刷新
+
+        Args:
+            video: 视频行 {'id': str, 'name': str, ...}
+            now: 当前时间戳（测试用）
+
+        Returns:
+            (是否需要刷新, 原因)
+        """
+        now = time.time() if now is None else now
+        video_date = cached_video_date(video.get('name', ''))
+
+        # 无法识别日期的视频无法判断，照常刷新
+        if video_date is None:
+            return True, 'no_date'
+
+        # 已结算且已经结束的月份冻结（当月的结算记录只是预览，不冻结）
+        if (video_date.year, video_date.month) in self.settled_months:
+            _, month_end = get_month_range(video_date.year, video_date.month)
+            if now > month_end.timestamp():
+                return False, 'settled'
+
+        if now - video_date.timestamp() < self.fresh_seconds:
+            return True, 'fresh'
+
+        entry = self.history.get(video['id'])
+        if entry is None:
+            return True, 'no_history'
+
+        if now >= entry.get('next_due', 0):
+            return True, 'due'
+        return False, 'not_due'
+
+    def record(self, video: Dict, views: int, now: Optional[float] = None):
+        """
+        记录一次刷新结果，并计算下次刷新时间
+
+        Args:
+            video: 视频行
+            views: 本次播放量
+            now: 当前时间戳（测试用）
+        """
+        now = time.time() if now is None else now
+        entry = self.history.setdefault(video['id'], {'observations': [], 'slow_streak': 0, 'next_due': 0})
+
+        observations = entry['observations']
+        if observations:
+            previous_time, previous_views = observations[-1]
+            # 按天折算增长率，避免间隔变长后增长被放大
+            elapsed_days = max((now - previous_time) / 86400, 1 / 24)
+            daily_growth = (views - previous_views) / max(previous_views, 1) / elapsed_days
+            entry['slow_streak'] = entry['slow_streak'] + 1 if daily_growth < self.slow_growth else 0
+
+        observations.append([now, views])
+        del observations[:-self.max_observations]
+
+        # 增长越久没有变化，间隔越长: base * 2^streak
+        interval = min(self.base_interval * (2 ** entry['slow_streak']), self.max_interval)
+        entry['next_due'] = now + interval
+
+    @staticmethod
+    def settled_months_from_records(records: Iterable[Dict]) -> set:
+        """
+        从结算记录列表中提取已结算月份
+
+        Args:
+            records: DataStorage.list_settlement_records() 的结果
+
+        Returns:
+            {(year, month), ...}
+        """
+        return {(record['year'], record['month']) for record in records}
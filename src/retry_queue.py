@@ -0,0 +1,120 @@
+"""
+失败重试队列模块
+所有链接都爬取失败（或被平台拦截）的视频行保存到队列中，记录尝试次数和下次重试时间；
+重试模式和每轮结束时的重试只处理队列中的行，不必重新爬取所有健康的链接
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+
+# 写入队列的视频行字段（重试时用来重新爬取和写回Notion）
+_VIDEO_FIELDS = ('id', 'name', 'links', 'views_field', 'creator_id')
+
+
+class RetryQueue:
+    """持久化的失败重试队列"""
+
+    def __init__(self, queue_file: Optional[str] = './data/retry_queue.json', base_delay_minutes: float = 30.0,
+                 max_delay_hours: float = 24.0, max_attempts: int = 6):
+        """
+        初始化重试队列
+
+        Args:
+            queue_file: 队列文件路径（None则只在内存中）
+            base_delay_minutes: 第一次失败后多久可以重试（分钟），之后每次翻倍
+            max_delay_hours: 重试间隔的上限（小时）
+            max_attempts: 最多尝试次数，超过后移出队列（下次完整更新时仍会按刷新策略处理）
+        """
+        self.queue_file = queue_file
+        self.base_delay = base_delay_minutes * 60
+        self.max_delay = max_delay_hours * 3600
+        self.max_attempts = max_attempts
+
+        # {page_id: {'video': Dict, 'attempts': int, 'next_attempt': float, 'failed_at': float,
+        #            'reasons': {url: reason}}}
+        self.entries = self._load()
+
+    def _load(self) -> Dict:
+        """加载队列"""
+        if self.queue_file and os.path.exists(self.queue_file):
+            try:
+                with open(self.queue_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+
+    def save(self):
+        """保存队列"""
+        if not self.queue_file:
+            return
+        directory = os.path.dirname(self.queue_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.queue_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, video: Dict, reasons: Dict[str, str], now: Optional[float] = None) -> bool:
+        """
+        记录一次失败
+
+        Args:
+            video: 视频行
+            reasons: {链接: 失败原因}
+            now: 当前时间戳（测试用）
+
+        Returns:
+            是否仍在队列中（超过最多尝试次数时移出并返回False）
+        """
+        now = time.time() if now is None else now
+        previous = self.entries.get(video['id'])
+        attempts = previous['attempts'] + 1 if previous else 1
+        if attempts >= self.max_attempts:
+            self.entries.pop(video['id'], None)
+            return False
+
+        self.entries[video['id']] = {
+            'video': {field: video.get(field) for field in _VIDEO_FIELDS},
+            'attempts': attempts,
+            'next_attempt': now + min(self.base_delay * (2 ** (attempts - 1)), self.max_delay),
+            'failed_at': now,
+            'reasons': reasons
+        }
+        return True
+
+    def remove(self, page_id: str):
+        """视频行已成功写回（或视频已不可用），移出队列"""
+        self.entries.pop(page_id, None)
+
+    def due(self, now: Optional[float] = None, force: bool = False) -> List[Dict]:
+        """
+        到了重试时间的视频行
+
+        Args:
+            now: 当前时间戳（测试用）
+            force: 忽略重试时间，返回队列中所有的行
+
+        Returns:
+            视频行列表（与 collect_creator_videos 的格式相同）
+        """
+        now = time.time() if now is None else now
+        return [dict(entry['video']) for entry in self.entries.values()
+                if force or entry['next_attempt'] <= now]
+
+    def failed_since(self, since: float) -> List[Dict]:
+        """
+        在某个时间之后失败的视频行（每轮结束时的重试只处理本轮失败的行）
+
+        Args:
+            since: 时间戳
+
+        Returns:
+            视频行列表
+        """
+        return [dict(entry['video']) for entry in self.entries.values() if entry['failed_at'] >= since]
@@ -0,0 +1,163 @@
+"""
+爬取结果缓存模块
+按规范化链接缓存播放量，支持有效期（TTL）和对已删除/私密视频的负缓存
+"""
+
+import json
+import os
+import time
+from typing import Dict, Optional
+
+
+# 这些失败原因说明视频本身不可用，重试也不会成功，需要负缓存
+DEAD_REASONS = ('not_found', 'private')
+
+
+class ScrapeCache:
+    """磁盘爬取结果缓存（JSONL追加写入，中途崩溃也不会丢失已爬取的结果）"""
+
+    def __init__(self, cache_file: str = './data/scrape_cache.jsonl', ttl_hours: float = 6.0,
+                 negative_ttl_hours: float = 72.0, max_negative_ttl_hours: float = 24.0 * 30):
+        """
+        初始化缓存
+
+        Args:
+            cache_file: 缓存文件路径，None表示只在内存中缓存
+            ttl_hours: 成功结果的有效期（小时）
+            negative_ttl_hours: 不可用视频第一次的跳过时长（小时），之后每次翻倍
+            max_negative_ttl_hours: 不可用视频跳过时长的上限（小时）
+        """
+        self.cache_file = cache_file
+        self.ttl = ttl_hours * 3600
+        self.negative_ttl = negative_ttl_hours * 3600
+        self.max_negative_ttl = max_negative_ttl_hours * 3600
+
+        # {canonical_key: {'status': 'ok'|'dead', 'views': int, 'method': str,
+        #                  'reason': str, 'strikes': int, 'scraped_at': float}}
+        self.entries = {}
+        self._log_lines = 0
+        self._load()
+
+    def _load(self):
+        """重放缓存文件，同一个链接以最后一条为准"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+
+        with open(self.cache_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self.entries[record.pop('key')] = record
+                    self._log_lines += 1
+                except:
+                    continue
+
+    def _append(self, key: str, entry: Dict):
+        """追加一条记录到缓存文件"""
+        if not self.cache_file:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.cache_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(entry, key=key), ensure_ascii=False) + '\n')
+        self._log_lines += 1
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Dict]:
+        """
+        获取仍在有效期内的缓存
+
+        Args:
+            key: 规范化链接键
+            now: 当前时间戳（测试用）
+
+        Returns:
+            缓存条目，过期或不存在返回None；
+            status为'ok'时可直接使用views，为'dead'时应跳过该链接
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        now = time.time() if now is None else now
+        age = now - entry['scraped_at']
+
+        if entry['status'] == 'ok':
+            return entry if age < self.ttl else None
+
+        backoff = min(self.negative_ttl * (2 ** (entry.get('strikes', 1) - 1)), self.max_negative_ttl)
+        return entry if age < backoff else None
+
+    def put(self, key: str, views: int, method: Optional[str] = None, now: Optional[float] = None):
+        """
+        记录一次成功的爬取
+
+        Args:
+            key: 规范化链接键
+            views: 播放量
+            method: 提取方法
+            now: 当前时间戳（测试用）
+        """
+        entry = {
+            'status': 'ok',
+            'views': views,
+            'method': method,
+            'scraped_at': time.time() if now is None else now
+        }
+        self.entries[key] = entry
+        self._append(key, entry)
+
+    def put_negative(self, key: str, reason: str, now: Optional[float] = None):
+        """
+        记录一个不可用的视频（已删除/私密），连续不可用时跳过时长翻倍
+
+        Args:
+            key: 规范化链接键
+            reason: 不可用原因
+            now: 当前时间戳（测试用）
+        """
+        previous = self.entries.get(key)
+        strikes = previous.get('strikes', 0) + 1 if previous and previous['status'] == 'dead' else 1
+
+        entry = {
+            'status': 'dead',
+            'reason': reason,
+            'strikes': strikes,
+            'scraped_at': time.time() if now is None else now
+        }
+        self.entries[key] = entry
+        self._append(key, entry)
+
+    def record(self, key: str, views: Optional[int], scraper, now: Optional[float] = None):
+        """
+        根据爬取器的结果更新缓存
+
+        Args:
+            key: 规范化链接键
+            views: 爬取结果（失败为None）
+            scraper: 爬取器实例（读取 last_method / last_failure）
+            now: 当前时间戳（测试用）
+        """
+        if views is not None:
+            self.put(key, views, getattr(scraper, 'last_method', None), now=now)
+            return
+
+        reason = getattr(scraper, 'last_failure', None)
+        if reason in DEAD_REASONS:
+            self.put_negative(key, reason, now=now)
+
+    def compact(self):
+        """重写缓存文件，只保留每个链接的最新一条记录"""
+        if not self.cache_file or self._log_lines <= len(self.entries):
+            return
+
+        directory = os.path.dirname(self.cache_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        temp_file = self.cache_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for key, entry in self.entries.items():
+                f.write(json.dumps(dict(entry, key=key), ensure_ascii=False) + '\n')
+        os.replace(temp_file, self.cache_file)
+        self._log_lines = len(self.entries)
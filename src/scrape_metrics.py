@@ -0,0 +1,206 @@
+"""
+爬取指标模块
+按平台和爬取层级（http/browser）记录耗时直方图、提取方法命中次数、失败原因分类和下载字节数，
+可以导出为JSON快照或Prometheus文本格式
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+# 耗时直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+
+class ScrapeMetrics:
+    """爬取指标收集器（线程安全）"""
+
+    def __init__(self, recent_size: int = 200):
+        """
+        初始化指标收集器
+
+        Args:
+            recent_size: 每个平台保留多少个最近的耗时样本（用于计算分位数）
+        """
+        self.recent_size = recent_size
+
+        # {'platform:tier': {'requests': int, 'success': int, 'bytes': int,
+        #                    'latency': {'buckets': [int], 'sum': float, 'count': int},
+        #                    'methods': {method: int}, 'failures': {reason: int}, 'status_codes': {code: int}}}
+        self.series: Dict[str, Dict] = {}
+        self._recent: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, platform: str, tier: str) -> Dict:
+        """获取（或创建）某个平台和层级的指标"""
+        key = f"{platform}:{tier}"
+        if key not in self.series:
+            self.series[key] = {
+                'requests': 0,
+                'success': 0,
+                'bytes': 0,
+                'latency': {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0},
+                'methods': {},
+                'failures': {},
+                'status_codes': {}
+            }
+            self._recent[key] = deque(maxlen=self.recent_size)
+        return self.series[key]
+
+    def record(self, platform: str, tier: str, seconds: float, views: Optional[int] = None,
+               method: Optional[str] = None, failure: Optional[str] = None, bytes_downloaded: int = 0,
+               status_code: Optional[int] = None):
+        """
+        记录一次爬取
+
+        Args:
+            platform: 平台名称
+            tier: 爬取层级（'http' 或 'browser'）
+            seconds: 耗时（秒）
+            views: 播放量（失败为None）
+            method: 成功时的提取方法
+            failure: 失败原因（timeout、http_error、login_wall、not_found 等）
+            bytes_downloaded: 本次下载的字节数
+            status_code: HTTP状态码（浏览器为None）
+        """
+        with self._lock:
+            entry = self._entry(platform, tier)
+            entry['requests'] += 1
+            entry['bytes'] += bytes_downloaded
+
+            latency = entry['latency']
+            latency['sum'] += seconds
+            latency['count'] += 1
+            for idx, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    latency['buckets'][idx] += 1
+                    break
+            self._recent[f"{platform}:{tier}"].append(seconds)
+
+            if views is not None:
+                entry['success'] += 1
+                method = method or 'unknown'
+                entry['methods'][method] = entry['methods'].get(method, 0) + 1
+            else:
+                failure = failure or 'unknown'
+                entry['failures'][failure] = entry['failures'].get(failure, 0) + 1
+
+            if status_code is not None:
+                code = str(status_code)
+                entry['status_codes'][code] = entry['status_codes'].get(code, 0) + 1
+
+    def sample_count(self, platform: str, tier: str) -> int:
+        """最近耗时样本的数量"""
+        with self._lock:
+            return len(self._recent.get(f"{platform}:{tier}", ()))
+
+    def percentile(self, platform: str, tier: str, q: float) -> Optional[float]:
+        """
+        最近样本的耗时分位数
+
+        Args:
+            platform: 平台名称
+            tier: 爬取层级
+            q: 分位数（0~1，例如0.95）
+
+        Returns:
+            秒数，没有样本时返回None
+        """
+        with self._lock:
+            samples = sorted(self._recent.get(f"{platform}:{tier}", ()))
+        if not samples:
+            return None
+        idx = min(len(samples) - 1, int(q * len(samples)))
+        return samples[idx]
+
+    def snapshot(self) -> Dict:
+        """
+        JSON快照
+
+        Returns:
+            {'platform:tier': {..., 'p50': float, 'p95': float}}
+        """
+        with self._lock:
+            series = json.loads(json.dumps(self.series))
+
+        for key, entry in series.items():
+            platform, tier = key.split(':', 1)
+            entry['p50'] = self.percentile(platform, tier, 0.5)
+            entry['p95'] = self.percentile(platform, tier, 0.95)
+        return series
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus文本格式
+
+        Returns:
+            指标文本
+        """
+        lines = [
+            '# TYPE scraper_requests_total counter',
+            '# TYPE scraper_latency_seconds histogram',
+            '# TYPE scraper_method_total counter',
+            '# TYPE scraper_failures_total counter',
+            '# TYPE scraper_status_codes_total counter',
+            '# TYPE scraper_bytes_downloaded_total counter',
+        ]
+
+        with self._lock:
+            for key, entry in sorted(self.series.items()):
+                platform, tier = key.split(':', 1)
+                labels = f'platform="{platform}",tier="{tier}"'
+
+                lines.append(f'scraper_requests_total{{{labels},outcome="success"}} {entry["success"]}')
+                lines.append(f'scraper_requests_total{{{labels},outcome="failure"}} '
+                             f'{entry["requests"] - entry["success"]}')
+
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, entry['latency']['buckets']):
+                    cumulative += count
+                    lines.append(f'scraper_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'scraper_latency_seconds_bucket{{{labels},le="+Inf"}} {entry["latency"]["count"]}')
+                lines.append(f'scraper_latency_seconds_sum{{{labels}}} {entry["latency"]["sum"]:.3f}')
+                lines.append(f'scraper_latency_seconds_count{{{labels}}} {entry["latency"]["count"]}')
+
+                for method, count in sorted(entry['methods'].items()):
+                    lines.append(f'scraper_method_total{{{labels},method="{method}"}} {count}')
+                for reason, count in sorted(entry['failures'].items()):
+                    lines.append(f'scraper_failures_total{{{labels},reason="{reason}"}} {count}')
+                for code, count in sorted(entry['status_codes'].items()):
+                    lines.append(f'scraper_status_codes_total{{{labels},code="{code}"}} {count}')
+                lines.append(f'scraper_bytes_downloaded_total{{{labels}}} {entry["bytes"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def save(self, json_file: str = './data/scrape_metrics.json', prom_file: Optional[str] = './data/scrape_metrics.prom'):
+        """
+        保存JSON快照和Prometheus文本（供外部采集）
+
+        Args:
+            json_file: JSON快照路径
+            prom_file: Prometheus文本路径（None则不保存）
+        """
+        directory = os.path.dirname(json_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+        if prom_file:
+            with open(prom_file, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+
+    @staticmethod
+    def load_snapshot(json_file: str = './data/scrape_metrics.json') -> Dict:
+        """读取上次保存的JSON快照（不存在返回空字典）"""
+        if not os.path.exists(json_file):
+            return {}
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            return {}
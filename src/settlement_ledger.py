@@ -0,0 +1,171 @@
+"""
+结算汇总模块
+按创作者、按月份持续维护视频数和总播放量：批量更新每写回一行新的播放量，就按与上次的差值更新所在月份的汇总；
+底薪和提成在需要时按费率表从汇总计算，结算页面可以直接显示本月截至目前的结算，不需要爬取或重新计算所有视频
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    from .utils import cached_video_date
+except ImportError:
+    from utils import cached_video_date
+
+
+class SettlementLedger:
+    """持久化的按月结算汇总"""
+
+    def __init__(self, ledger_file: Optional[str] = './data/settlement_ledger.json'):
+        """
+        初始化结算汇总
+
+        Args:
+            ledger_file: 汇总文件路径（None则只在内存中）
+        """
+        self.ledger_file = ledger_file
+        data = self._load()
+
+        # 每一行最后记录的播放量，用来计算差值 {page_id: {'creator_id': str, 'month': 'YYYY-MM', 'views': int}}
+        self.rows: Dict[str, Dict] = data.get('rows', {})
+        # {creator_id: {'name': str, 'label': str}}（按创作者列表的顺序）
+        self.creators: Dict[str, Dict] = data.get('creators', {})
+        # {'YYYY-MM': {creator_id: {'video_count': int, 'total_views': int}}}
+        self.months: Dict[str, Dict[str, Dict]] = data.get('months', {})
+        self.updated_at: Optional[str] = data.get('updated_at')
+
+    def _load(self) -> Dict:
+        """加载汇总"""
+        if self.ledger_file and os.path.exists(self.ledger_file):
+            try:
+                with open(self.ledger_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+
+    def save(self):
+        """保存汇总"""
+        if not self.ledger_file:
+            return
+        directory = os.path.dirname(self.ledger_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.ledger_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'rows': self.rows,
+                'creators': self.creators,
+                'months': self.months,
+                'updated_at': self.updated_at
+            }, f, indent=2, ensure_ascii=False)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def set_creators(self, creators: List[Dict]):
+        """
+        记录创作者名称和标签（标签决定底薪档位）
+
+        Args:
+            creators: 创作者列表（来自 get_all_creators）
+        """
+        for creator in creators:
+            self.creators[creator['id']] = {'name': creator['name'], 'label': creator.get('label', '')}
+
+    def _apply(self, creator_id: str, month: str, video_count: int, total_views: int):
+        """把差值加到一个创作者一个月的汇总上（视频数为0时删除）"""
+        totals = self.months.setdefault(month, {}).setdefault(creator_id, {'video_count': 0, 'total_views': 0})
+        totals['video_count'] += video_count
+        totals['total_views'] += total_views
+        if totals['video_count'] <= 0:
+            del self.months[month][creator_id]
+            if not self.months[month]:
+                del self.months[month]
+
+    def record(self, video: Dict, views: int) -> int:
+        """
+        记录一行的新播放量，按差值更新所在月份的汇总
+
+        新的行计入视频数；标题改了月份的行从原来的月份移到新月份；标题无法识别日期的行不计入汇总
+
+        Args:
+            video: 视频行（需要 'id'、'name'、'creator_id'）
+            views: 新的总播放量
+
+        Returns:
+            计入汇总的播放量差值
+        """
+        title = video.get('name')
+        video_date = cached_video_date(title) if isinstance(title, str) else None
+        month = f"{video_date.year}-{video_date.month:02d}" if video_date else None
+
+        previous = self.rows.get(video['id'])
+        if previous is not None and (previous['month'] != month or previous['creator_id'] != video['creator_id']):
+            self.remove(video['id'])
+            previous = None
+        if month is None:
+            return 0
+
+        self.updated_at = datetime.now().isoformat()
+        if previous is None:
+            self.rows[video['id']] = {'creator_id': video['creator_id'], 'month': month, 'views': views}
+            self._apply(video['creator_id'], month, 1, views)
+            return views
+
+        delta = views - previous['views']
+        if delta:
+            previous['views'] = views
+            self._apply(video['creator_id'], month, 0, delta)
+        return delta
+
+    def remove(self, page_id: str):
+        """视频行已从Notion中删除，从汇总中减去"""
+        previous = self.rows.pop(page_id, None)
+        if previous is not None:
+            self._apply(previous['creator_id'], previous['month'], -1, -previous['views'])
+            self.updated_at = datetime.now().isoformat()
+
+    def sync(self, videos: List[Dict], complete: bool = False):
+        """
+        按从Notion读取的当前播放量同步（第一次建立汇总，或在Notion中手动修改过播放量、新增了视频行）
+
+        Args:
+            videos: 视频行列表（来自 collect_creator_videos，包含 'current_views'）
+            complete: 是否读取了所有创作者的所有表格（是则删除这次没有读到的行）
+        """
+        for video in videos:
+            self.record(video, video.get('current_views', 0) or 0)
+        if complete:
+            seen = {video['id'] for video in videos}
+            for page_id in [page_id for page_id in self.rows if page_id not in seen]:
+                self.remove(page_id)
+
+    def month_frame(self, year: int, month: int) -> pd.DataFrame:
+        """
+        某个月每个创作者的汇总
+
+        Args:
+            year: 年份
+            month: 月份
+
+        Returns:
+            DataFrame（year、month、creator、label、video_count、total_views列，按创作者列表的顺序），
+            没有数据时为空DataFrame
+        """
+        totals = self.months.get(f"{year}-{month:02d}", {})
+        order = {creator_id: idx for idx, creator_id in enumerate(self.creators)}
+        creator_ids = sorted(totals, key=lambda creator_id: order.get(creator_id, len(order)))
+        return pd.DataFrame({
+            'year': pd.Series([year] * len(creator_ids), dtype='int64'),
+            'month': pd.Series([month] * len(creator_ids), dtype='int64'),
+            'creator': pd.Series([self.creators.get(creator_id, {}).get('name', 'Unknown')
+                                  for creator_id in creator_ids], dtype=object),
+            'label': pd.Series([self.creators.get(creator_id, {}).get('label', '')
+                                for creator_id in creator_ids], dtype=object),
+            'video_count': pd.Series([totals[creator_id]['video_count'] for creator_id in creator_ids], dtype='int64'),
+            'total_views': pd.Series([totals[creator_id]['total_views'] for creator_id in creator_ids], dtype='int64')
+        })
@@ -0,0 +1,395 @@
+"""
+分级爬取模块
+先用轻量的HTTP爬取器（ViewScraper），失败时才升级到浏览器（ViewScraperSelenium）
+并按平台和链接模式记住哪一级成功，已知难爬的链接直接走浏览器；
+HTTP被同意弹窗/登录墙拦住时，先把浏览器会话（cookie和User-Agent）交给HTTP爬取器重试
+"""
+
+import json
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    from .scrape_cache import DEAD_REASONS
+except ImportError:
+    from scrape_cache import DEAD_REASONS
+
+
+# 这些失败说明缺少浏览器会话（同意弹窗、登录、验证），导入浏览器cookie后值得用HTTP重试
+HANDOFF_FAILURES = ('consent_wall', 'login_wall', 'captcha')
+
+# 这些结果不升级到浏览器：没有发请求（unsupported/deferred/budget）、同一出口IP被限流（rate_limited），
+# 或HTTP已经确定视频已删除/私密（DEAD_REASONS，浏览器同样拿不到，结果交给负缓存）
+NO_ESCALATION = ('unsupported', 'deferred', 'budget', 'rate_limited') + DEAD_REASONS
+
+
+class TieredScraper:
+    """分级爬取器：HTTP优先，浏览器兜底"""
+
+    def __init__(self, fast_scraper, browser_scraper, state_file: str = './data/scrape_tiers.json',
+                 min_samples: int = 3, min_success_rate: float = 0.2, reprobe_interval: int = 20,
+                 rate_weight: float = 0.25, handoff: bool = True, handoff_cooldown: float = 600.0):
+        """
+        初始化分级爬取器
+
+        Args:
+            fast_scraper: HTTP爬取器（ViewScraper实例）
+            browser_scraper: 浏览器爬取器（ViewScraperSelenium实例）
+            state_file: 各级成功记录的保存路径
+            min_samples: 至少尝试多少次HTTP后才允许判定为"难爬"
+            min_success_rate: HTTP成功率低于该值时直接走浏览器
+            reprobe_interval: 直接走浏览器的链接每累计多少个，重新试一次HTTP
+            rate_weight: HTTP成功率按指数衰减计算，每次结果所占的权重（越大越快反映平台的变化）
+            handoff: HTTP被拦截时是否从浏览器导出会话给HTTP爬取器（两个爬取器都支持时生效）
+            handoff_cooldown: 同一平台两次导出会话的最短间隔（秒），期间HTTP仍失败的链接直接升级到浏览器
+        """
+        self.fast_scraper = fast_scraper
+        self.browser_scraper = browser_scraper
+        self.state_file = state_file
+        self.min_samples = min_samples
+        self.min_success_rate = min_success_rate
+        self.reprobe_interval = reprobe_interval
+        self.rate_weight = rate_weight
+        self.handoff = handoff
+        self.handoff_cooldown = handoff_cooldown
+
+        # {platform: 最近一次导出会话的时间}
+        self._handoff_at = {}
+        self.handoffs = 0
+
+        # {pattern_key: {'http_success': int, 'http_fail': int, 'http_rate': float,
+        #                'browser_success': int, 'browser_fail': int, 'skipped': int}}
+        self.tier_stats = self._load_state()
+
+        # 最近一次爬取的提取方法（带层级前缀，例如 'http:meta'）和失败原因
+        self.last_method = None
+        self.last_failure = None
+
+    def _load_state(self) -> Dict:
+        """加载历史分级记录"""
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+
+    def save_state(self):
+        """保存分级记录"""
+        if not self.state_file:
+            return
+        directory = os.path.dirname(self.state_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.tier_stats, f, indent=2, ensure_ascii=False)
+
+    def identify_platform(self, url: str) -> str:
+        """识别平台"""
+        return self.fast_scraper.identify_platform(url)
+
+    def pattern_key(self, url: str) -> str:
+        """
+        计算链接的模式键
+
+        Args:
+            url: 视频链接
+
+        Returns:
+            例如 'tiktok:t'、'tiktok:video'、'instagram:reel'
+        """
+        platform = self.identify_platform(url)
+        segments = [s for s in urlparse(url.strip()).path.split('/') if s]
+
+        # TikTok完整链接为 /@user/video/<id>，跳过用户名
+        if segments and segments[0].startswith('@'):
+            segments = segments[1:]
+
+        # 只有一段路径的是短链接，例如 vm.tiktok.com/<code>/
+        kind = segments[0].lower() if len(segments) > 1 else 'short'
+        return f"{platform}:{kind}"
+
+    def _entry(self, key: str) -> Dict:
+        """获取（或创建）某个模式的统计"""
+        if key not in self.tier_stats:
+            self.tier_stats[key] = {
+                'http_success': 0,
+                'http_fail': 0,
+                'browser_success': 0,
+                'browser_fail': 0,
+                'skipped': 0
+            }
+        return self.tier_stats[key]
+
+    def _record_http(self, entry: Dict, success: bool):
+        """
+        记录一次HTTP结果
+
+        成功率按指数衰减计算：累计次数不会衰减，平台恢复后几次重新试探成功就能回到HTTP
+
+        Args:
+            entry: 模式的统计
+            success: 是否拿到了播放量
+        """
+        attempts = entry['http_success'] + entry['http_fail']
+        rate = entry.get('http_rate', entry['http_success'] / attempts if attempts else float(success))
+        entry['http_rate'] = rate + self.rate_weight * (float(success) - rate)
+        entry['http_success' if success else 'http_fail'] += 1
+
+    def should_try_http(self, url: str) -> bool:
+        """
+        判断该链接是否值得先走HTTP
+
+        Args:
+            url: 视频链接
+
+        Returns:
+            True表示先走HTTP，False表示直接走浏览器
+        """
+        entry = self._entry(self.pattern_key(url))
+        attempts = entry['http_success'] + entry['http_fail']
+        if attempts < self.min_samples:
+            return True
+
+        if entry.get('http_rate', entry['http_success'] / attempts) >= self.min_success_rate:
+            return True
+
+        # 已知难爬，但定期重新试一次HTTP，以便平台变化后能恢复
+        return entry['skipped'] >= self.reprobe_interval
+
+    def _handoff(self, platform: str) -> bool:
+        """
+        从浏览器导出该平台的会话并导入HTTP爬取器
+
+        同一平台在 handoff_cooldown 内只导出一次，避免HTTP持续失败时反复打开浏览器
+
+        Args:
+            platform: 平台名称
+
+        Returns:
+            是否导入了新的会话
+        """
+        if not self.handoff or not hasattr(self.browser_scraper, 'export_session') \
+                or not hasattr(self.fast_scraper, 'import_session'):
+            return False
+        if time.time() - self._handoff_at.get(platform, 0) < self.handoff_cooldown:
+            return False
+
+        self._handoff_at[platform] = time.time()
+        browser_session = self.browser_scraper.export_session(platform)
+        if not browser_session:
+            return False
+        self.fast_scraper.import_session(platform, browser_session)
+        self.handoffs += 1
+        return True
+
+    def scrape_views(self, url: str) -> Optional[int]:
+        """
+        分级爬取播放量
+
+        Args:
+            url: 视频链接
+
+        Returns:
+            播放量（整数），失败返回None
+        """
+        self.last_method = None
+        self.last_failure = None
+
+        if not url:
+            return None
+
+        if self.identify_platform(url) == 'unknown':
+            views = self.fast_scraper.scrape_views(url)
+            self.last_failure = self.fast_scraper.last_failure
+            return views
+
+        entry = self._entry(self.pattern_key(url))
+
+        if self.should_try_http(url):
+            views = self.fast_scraper.scrape_views(url)
+            if self.fast_scraper.last_failure == 'budget':
+                # 本轮时间预算已用完，没有发请求
+                self.last_failure = 'budget'
+                return None
+            entry['skipped'] = 0
+            if views is not None:
+                self._record_http(entry, True)
+                self.last_method = f"http:{self.fast_scraper.last_method}"
+                return views
+            if self.fast_scraper.last_failure in DEAD_REASONS:
+                # 视频已删除/私密：不计入HTTP的成功率，也不再用浏览器渲染
+                self.last_failure = self.fast_scraper.last_failure
+                return None
+            self._record_http(entry, False)
+            if self.fast_scraper.last_failure == 'rate_limited':
+                # 同一出口IP被限流时浏览器同样会被拦，不再升级到浏览器
+                self.last_failure = 'rate_limited'
+                return None
+            if self.fast_scraper.last_failure in HANDOFF_FAILURES and self._handoff(self.identify_platform(url)):
+                # 带着浏览器会话重试HTTP
+                views = self.fast_scraper.scrape_views(url)
+                if views is not None:
+                    self._record_http(entry, True)
+                    self.last_method = f"http:{self.fast_scraper.last_method}"
+                    return views
+                self._record_http(entry, False)
+        else:
+            entry['skipped'] += 1
+
+        return self._scrape_browser(url, entry)
+
+    def _scrape_browser(self, url: str, entry: Dict) -> Optional[int]:
+        """用浏览器爬取并记录结果"""
+        views = self.browser_scraper.scrape_views(url)
+        if self.browser_scraper.last_failure == 'budget':
+            self.last_failure = 'budget'
+            return None
+        if views is not None:
+            entry['browser_success'] += 1
+            self.last_method = f"browser:{self.browser_scraper.last_method}"
+        else:
+            entry['browser_fail'] += 1
+            self.last_failure = self.browser_scraper.last_failure
+        return views
+
+    def scrape_many(self, urls: List[str], fetch_workers: int = 4, parse_workers: Optional[int] = None,
+                    allow: Optional[Callable[[str], bool]] = None) -> Iterator[Tuple[str, Optional[int]]]:
+        """
+        并发分级爬取：值得走HTTP的链接交给 fast_scraper.scrape_many 并发下载和解析，
+        HTTP失败的链接和已知难爬的链接最后一起交给浏览器（支持多标签页时并发）；
+        被同意弹窗/登录墙拦住的链接先导入浏览器会话用HTTP重试一次
+
+        Args:
+            urls: 视频链接列表
+            fetch_workers: HTTP下载线程数
+            parse_workers: 解析进程数（见 ViewScraper.scrape_many）
+            allow: 请求前的放行检查（例如熔断器）
+
+        Yields:
+            (url, views) - 产出前设置 last_method / last_failure
+        """
+        http_urls = []
+        browser_urls = []
+        for url in urls:
+            if self.identify_platform(url) == 'unknown' or self.should_try_http(url):
+                http_urls.append(url)
+            else:
+                browser_urls.append(url)
+
+        escalated = []
+        walled = []
+        for url, views in self._http_many(http_urls, fetch_workers, parse_workers, allow):
+            if self.last_failure in HANDOFF_FAILURES:
+                walled.append(url)
+            elif views is None and self.last_failure not in NO_ESCALATION:
+                escalated.append(url)
+            else:
+                yield url, views
+
+        # 被同意弹窗/登录墙拦住的平台导入浏览器会话后，用HTTP再试一次，仍失败才升级到浏览器
+        handed_off = {platform for platform in {self.identify_platform(url) for url in walled}
+                      if self._handoff(platform)}
+        retry = [url for url in walled if self.identify_platform(url) in handed_off]
+        escalated.extend(url for url in walled if url not in retry)
+        for url, views in self._http_many(retry, fetch_workers, parse_workers, None):
+            if views is None and self.last_failure not in NO_ESCALATION:
+                escalated.append(url)
+            else:
+                yield url, views
+
+        for url in browser_urls:
+            self._entry(self.pattern_key(url))['skipped'] += 1
+
+        # HTTP已经放行过的链接不再重复检查
+        escalated_set = set(escalated)
+        browser_allow = None
+        if allow is not None:
+            browser_allow = lambda url: url in escalated_set or allow(url)
+
+        for url, views in self._browser_many(escalated + browser_urls, browser_allow):
+            self.last_method = None
+            self.last_failure = self.browser_scraper.last_failure
+            if self.last_failure in ('deferred', 'budget'):
+                yield url, None
+                continue
+
+            entry = self._entry(self.pattern_key(url))
+            if views is not None:
+                entry['browser_success'] += 1
+                self.last_method = f"browser:{self.browser_scraper.last_method}"
+            else:
+                entry['browser_fail'] += 1
+            yield url, views
+
+    def _http_many(self, urls: List[str], fetch_workers: int, parse_workers: Optional[int],
+                   allow: Optional[Callable[[str], bool]]) -> Iterator[Tuple[str, Optional[int]]]:
+        """HTTP并发爬取一批链接并记录分级结果，产出前设置 last_method / last_failure"""
+        if not urls:
+            return
+        for url, views in self.fast_scraper.scrape_many(urls, fetch_workers, parse_workers, allow):
+            self.last_method = None
+            self.last_failure = self.fast_scraper.last_failure
+            if self.last_failure in ('unsupported', 'deferred', 'budget'):
+                yield url, None
+                continue
+
+            entry = self._entry(self.pattern_key(url))
+            entry['skipped'] = 0
+            if views is not None:
+                self._record_http(entry, True)
+                self.last_method = f"http:{self.fast_scraper.last_method}"
+            elif self.last_failure in DEAD_REASONS:
+                # 视频已删除/私密：不计入HTTP的成功率，调用方不升级到浏览器
+                pass
+            else:
+                # 限流时同一出口IP的浏览器同样会被拦，调用方不再升级到浏览器
+                self._record_http(entry, False)
+            yield url, views
+
+    def _browser_many(self, urls: List[str], allow: Optional[Callable[[str], bool]]):
+        """浏览器爬取一批链接（浏览器不支持 scrape_many 时逐个爬取）"""
+        if not urls:
+            return
+        if hasattr(self.browser_scraper, 'scrape_many'):
+            yield from self.browser_scraper.scrape_many(urls, allow=allow)
+            return
+
+        for url in urls:
+            if allow is not None and not allow(url):
+                self.browser_scraper.last_failure = 'deferred'
+                yield url, None
+                continue
+            yield url, self.browser_scraper.scrape_views(url)
+
+    def set_deadline(self, deadline: Optional[float]):
+        """设置本轮爬取的截止时间（同时设置到两个层级的爬取器）"""
+        for scraper in (self.fast_scraper, self.browser_scraper):
+            if hasattr(scraper, 'set_deadline'):
+                scraper.set_deadline(deadline)
+
+    def prelaunch(self):
+        """
+        后台预启动浏览器（与读取Notion并行）
+
+        历史记录显示所有链接都能通过HTTP爬取时不启动，浏览器在真正需要时再按需启动
+        """
+        needs_browser = not self.tier_stats or any(
+            entry['browser_success'] + entry['browser_fail'] > 0 for entry in self.tier_stats.values()
+        )
+        if needs_browser and hasattr(self.browser_scraper, 'prelaunch'):
+            self.browser_scraper.prelaunch()
+
+    def close(self):
+        """保存分级记录，关闭HTTP爬取器的线程池和浏览器"""
+        try:
+            self.save_state()
+        finally:
+            try:
+                if hasattr(self.fast_scraper, 'close'):
+                    self.fast_scraper.close()
+            finally:
+                self.browser_scraper.close()
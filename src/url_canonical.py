@@ -0,0 +1,198 @@
+"""
+链接规范化模块
+提取平台视频ID、去除跟踪参数、解析短链接（结果缓存到磁盘），用于整批链接去重
+"""
+
+import json
+import os
+import re
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+
+# Instagram: /reel/<code>/、/reels/<code>/、/p/<code>/、/tv/<code>/ 都指向同一个帖子
+_INSTAGRAM_PATTERN = re.compile(r'/(?:reels?|p|tv)/([A-Za-z0-9_-]+)')
+
+# TikTok完整链接: /@user/video/<id>
+_TIKTOK_VIDEO_PATTERN = re.compile(r'/@([^/?#]+)/(?:video|photo)/(\d+)')
+
+# TikTok短链接: tiktok.com/t/<code>、vm.tiktok.com/<code>、vt.tiktok.com/<code>
+_TIKTOK_SHORT_PATTERN = re.compile(
+    r'^(?:(?:www\.)?tiktok\.com/t/|(?:vm|vt)\.tiktok\.com/)([A-Za-z0-9]+)',
+    re.IGNORECASE
+)
+
+def video_id_from_url(url: str) -> Optional[str]:
+    """
+    直接从链接中提取视频ID（不解析短链接）
+
+    Args:
+        url: 视频链接
+
+    Returns:
+        Instagram短码或TikTok数字ID，无法识别（例如短链接）返回None
+    """
+    parsed = urlparse((url or '').strip())
+    host = parsed.netloc.lower()
+    if 'instagram.com' in host or 'instagr.am' in host:
+        match = _INSTAGRAM_PATTERN.search(parsed.path)
+    elif 'tiktok.com' in host:
+        match = _TIKTOK_VIDEO_PATTERN.search(parsed.path)
+    else:
+        return None
+    return match.group(match.lastindex) if match else None
+
+
+_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class URLCanonicalizer:
+    """视频链接规范化器"""
+
+    def __init__(self, cache_file: str = './data/short_links.json',
+                 resolver: Optional[Callable[[str], Optional[str]]] = None):
+        """
+        初始化规范化器
+
+        Args:
+            cache_file: 短链接解析结果的缓存文件，None表示不落盘
+            resolver: 短链接解析函数（输入短链接，返回跳转后的链接），默认跟随HTTP跳转
+        """
+        self.cache_file = cache_file
+        self.resolver = resolver or self._follow_redirects
+        self.short_links = self._load_cache()
+        self._dirty = False
+
+    def _load_cache(self) -> Dict[str, str]:
+        """加载短链接缓存"""
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+
+    def save_cache(self):
+        """保存短链接缓存（仅在有新解析结果时写盘）"""
+        if not self.cache_file or not self._dirty:
+            return
+        directory = os.path.dirname(self.cache_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+            json.dump(self.short_links, f, indent=2, ensure_ascii=False)
+        self._dirty = False
+
+    def _follow_redirects(self, url: str) -> Optional[str]:
+        """跟随HTTP跳转，返回最终链接（不下载正文）"""
+        try:
+            response = requests.get(url, headers={'User-Agent': _USER_AGENT},
+                                    allow_redirects=True, timeout=10, stream=True)
+            final_url = response.url
+            response.close()
+            return final_url
+        except requests.RequestException:
+            return None
+
+    def resolve_short_link(self, url: str) -> Optional[str]:
+        """
+        解析短链接（每个短链接只解析一次）
+
+        Args:
+            url: 短链接
+
+        Returns:
+            跳转后的完整链接，解析失败返回None
+        """
+        code = self._short_code(url)
+        if code is None:
+            return None
+
+        if code in self.short_links:
+            return self.short_links[code]
+
+        resolved = self.resolver(url)
+        # 只缓存能识别出视频ID的结果，跳转到登录页等情况下次重试
+        if resolved and _TIKTOK_VIDEO_PATTERN.search(urlparse(resolved).path):
+            self.short_links[code] = resolved
+            self._dirty = True
+            return resolved
+        return None
+
+    def _short_code(self, url: str) -> Optional[str]:
+        """提取TikTok短链接的短码"""
+        parsed = urlparse(url.strip())
+        match = _TIKTOK_SHORT_PATTERN.match(parsed.netloc + parsed.path)
+        return match.group(1) if match else None
+
+    def canonicalize(self, url: str) -> Dict:
+        """
+        规范化视频链接
+
+        Args:
+            url: 原始链接（可能带跟踪参数、短链接等）
+
+        Returns:
+            {'key': str, 'platform': str, 'video_id': Optional[str], 'url': str}
+            key 在同一个视频的不同链接形式之间相同，可用于去重
+        """
+        url = (url or '').strip()
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+
+        if 'instagram.com' in host or 'instagr.am' in host:
+            match = _INSTAGRAM_PATTERN.search(parsed.path)
+            if match:
+                video_id = match.group(1)
+                return {
+                    'key': f"instagram:{video_id}",
+                    'platform': 'instagram',
+                    'video_id': video_id,
+                    'url': f"https://www.instagram.com/p/{video_id}/"
+                }
+            return self._fallback('instagram', parsed)
+
+        if 'tiktok.com' in host:
+            short_code = self._short_code(url)
+            if short_code is not None:
+                resolved = self.resolve_short_link(url)
+                if resolved is None:
+                    # 解析失败时仍按短码去重，爬取时让爬取器自己跟随跳转
+                    return {
+                        'key': f"tiktok-short:{short_code}",
+                        'platform': 'tiktok',
+                        'video_id': None,
+                        'url': f"https://{host}{parsed.path}"
+                    }
+                parsed = urlparse(resolved)
+
+            match = _TIKTOK_VIDEO_PATTERN.search(parsed.path)
+            if match:
+                username, video_id = match.group(1), match.group(2)
+                return {
+                    'key': f"tiktok:{video_id}",
+                    'platform': 'tiktok',
+                    'video_id': video_id,
+                    'url': f"https://www.tiktok.com/@{username}/video/{video_id}"
+                }
+            return self._fallback('tiktok', parsed)
+
+        return {
+            'key': url,
+            'platform': 'unknown',
+            'video_id': None,
+            'url': url
+        }
+
+    def _fallback(self, platform: str, parsed) -> Dict:
+        """无法识别视频ID时，去掉查询参数和锚点后原样使用"""
+        url = f"{parsed.scheme or 'https'}://{parsed.netloc}{parsed.path}"
+        return {
+            'key': url.lower().rstrip('/'),
+            'platform': platform,
+            'video_id': None,
+            'url': url
+        }
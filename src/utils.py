@@ -5,119 +5,374 @@
 
 import json
 import os
+import re
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
 
+try:
+    from .rate_tables import RateSchedule, RateTable, price_scenarios
+except ImportError:
+    from rate_tables import RateSchedule, RateTable, price_scenarios
+
+
+# 结算明细的列顺序
+SETTLEMENT_COLUMNS = ['creator', 'label', 'ugc_type', 'video_count', 'total_views',
+                      'base_pay', 'commission', 'total', 'year', 'month']
+
 
 class SettlementCalculator:
     """结算计算器"""
 
-    def __init__(self):
-        """初始化结算计算器"""
-        self.base_pay_large = 20  # 大UGC底薪（$/条）
-        self.base_pay_small = 10  # 小UGC底薪（$/条）
-        self.commission_rate = 1  # 每1000 views = $1
+    def __init__(self, rates: Optional[RateSchedule] = None):
+        """
+        初始化结算计算器
+
+        Args:
+            rates: 费率表，默认从 ./data/rate_tables.json 加载（没有配置文件时为默认费率:
+                   Core UGC $20/条，其他 $10/条，每1000 views $1，向下取整）
+        """
+        self.rates = rates if rates is not None else RateSchedule.load()
 
-    def calculate_commission(self, total_views: int) -> float:
+    def rate_table(self, year: Optional[int] = None, month: Optional[int] = None) -> RateTable:
+        """某个月适用的费率表（不指定时为当月）"""
+        if year is None or month is None:
+            today = datetime.now()
+            year, month = today.year, today.month
+        return self.rates.table_for(year, month)
+
+    def calculate_commission(self, total_views: int, year: Optional[int] = None, month: Optional[int] = None) -> float:
         """
-        计算提成 - 按1000为最小单位，向下取整
+        计算提成 - 默认按1000为最小单位，向下取整（单位和取整方式见费率表）
 
         Args:
             total_views: 总播放量
+            year: 结算年份（选择费率表，不指定时为当月）
+            month: 结算月份
 
         Returns:
             提成金额（$）
         """
         # 向下取整到1000，例如: 2800 views -> 2000 views -> $2
-        thousands = int(total_views / 1000)
-        return thousands * self.commission_rate
+        return self.rate_table(year, month).commission(np.array([total_views]))[0].item()
 
-    def calculate_settlement(self, video_count: int, total_views: int, label: str = '') -> Dict:
+    def calculate_settlement(self, video_count: int, total_views: int, label: str = '',
+                             year: Optional[int] = None, month: Optional[int] = None) -> Dict:
         """
         计算结算金额
 
         Args:
             video_count: 视频数量
             total_views: 总播放量
-            label: 创作者标签（CoreUGC或DiscordUGC）
+            label: 创作者标签（CoreUGC或DiscordUGC），按费率表的档位匹配底薪
+            year: 结算年份（选择费率表，不指定时为当月）
+            month: 结算月份
 
         Returns:
             结算详情 {'base_pay': float, 'commission': float, 'total': float}
         """
-        # 根据label判断是否为大UGC
-        # Core UGC = 大UGC ($20/条)
-        # discord ugc = 小UGC ($10/条)
+        # 默认费率: Core UGC = 大UGC ($20/条)，discord ugc = 小UGC ($10/条)
         # 移除空格后进行比较，因为Notion中的label可能是 "Core UGC" (带空格)
-        label_lower = label.lower().replace(' ', '')
-        is_large_ugc = 'coreugc' in label_lower
-
-        base_pay = video_count * (self.base_pay_large if is_large_ugc else self.base_pay_small)
-        commission = self.calculate_commission(total_views)
-        total = base_pay + commission
+        priced = self.rate_table(year, month).price(np.array([video_count]), np.array([total_views]), [label])
 
         return {
             'video_count': video_count,
             'total_views': total_views,
-            'base_pay': base_pay,
-            'commission': commission,
-            'total': total,
-            'ugc_type': 'Core UGC ($20/video)' if is_large_ugc else 'Discord UGC ($10/video)',
+            'base_pay': priced['base_pay'][0].item(),
+            'commission': priced['commission'][0].item(),
+            'total': priced['total'][0].item(),
+            'ugc_type': priced['ugc_type'][0],
             'label': label
         }
 
-    def calculate_monthly_settlement(self, creators_data: List[Dict], year: int, month: int) -> pd.DataFrame:
+    def videos_frame(self, creators_data: List[Dict]) -> pd.DataFrame:
         """
-        计算月度结算
+        把所有创作者的视频合并成一个DataFrame（见 VideoIndex.frame）
 
         Args:
             creators_data: 创作者数据列表
                 [{'name': str, 'videos': List[Dict], 'label': str}, ...]
                 videos: [{'date': str, 'views': int}, ...]
+
+        Returns:
+            DataFrame，每行一个日期有效的视频
+        """
+        return VideoIndex.from_creators_data(creators_data).frame
+
+    def settle_videos(self, videos: pd.DataFrame) -> pd.DataFrame:
+        """
+        按月份和创作者分组计算结算（视频数、总播放量、底薪、提成一次性批量计算）
+
+        Args:
+            videos: VideoIndex 中的视频行（creator_key、creator、label、views、year、month列，可以跨多个月）
+
+        Returns:
+            结算数据DataFrame（列见 SETTLEMENT_COLUMNS，按月份、再按创作者在列表中的顺序），没有视频时返回空DataFrame
+        """
+        if videos.empty:
+            return pd.DataFrame()
+
+        keys = ['year', 'month', 'creator_key']
+
+        # 每个创作者的名字和标签取第一行（同一创作者的行都相同）
+        grouped = videos.drop_duplicates(keys).set_index(keys)[['creator', 'label']].sort_index()
+        totals = videos.groupby(keys)['views'].agg(['size', 'sum'])
+        grouped['video_count'] = totals['size']
+        grouped['total_views'] = totals['sum']
+
+        return self.settle_aggregates(grouped.reset_index())
+
+    def settle_aggregates(self, aggregates: pd.DataFrame) -> pd.DataFrame:
+        """
+        按已汇总的视频数和总播放量计算底薪、提成和总额（每个月按其生效的费率表）
+
+        Args:
+            aggregates: 每行一个创作者一个月（year、month、creator、label、video_count、total_views列）
+
+        Returns:
+            结算数据DataFrame（列见 SETTLEMENT_COLUMNS，行顺序与输入相同），没有行时返回空DataFrame
+        """
+        if aggregates.empty:
+            return pd.DataFrame()
+
+        video_count = aggregates['video_count'].to_numpy(dtype='int64')
+        total_views = aggregates['total_views'].to_numpy()
+        years = aggregates['year'].to_numpy()
+        months = aggregates['month'].to_numpy()
+
+        # 每个月按其生效的费率表计算（通常整个范围只有一个费率表，一次算完）
+        labels = aggregates['label'].to_numpy()
+        month_codes, unique_months = pd.factorize(years * 12 + months - 1)
+        month_tables = [self.rates.table_for(int(code // 12), int(code % 12 + 1)) for code in unique_months]
+        positions, parts = [], []
+        for table in {id(table): table for table in month_tables}.values():
+            rows = np.flatnonzero(np.isin(month_codes, [code for code, item in enumerate(month_tables)
+                                                         if item is table]))
+            positions.append(rows)
+            parts.append(table.price(video_count[rows], total_views[rows], labels[rows]))
+        order = np.argsort(np.concatenate(positions), kind='stable')
+        priced = {column: np.concatenate([part[column] for part in parts])[order] for column in parts[0]}
+
+        settlement = pd.DataFrame({
+            'creator': aggregates['creator'].to_numpy(),
+            'label': aggregates['label'].to_numpy(),
+            'ugc_type': priced['ugc_type'],
+            'video_count': video_count,
+            'total_views': total_views,
+            'base_pay': priced['base_pay'],
+            'commission': priced['commission'],
+            'total': priced['total'],
+            'year': years,
+            'month': months
+        })
+        return settlement[SETTLEMENT_COLUMNS]
+
+    def calculate_live_settlement(self, ledger: 'SettlementLedger', year: int, month: int) -> pd.DataFrame:
+        """
+        按持续更新的汇总计算某个月截至目前的结算（不读取Notion，不逐个视频重新计算）
+
+        Args:
+            ledger: SettlementLedger（批量更新写回播放量时按差值更新）
+            year: 年份
+            month: 月份
+
+        Returns:
+            结算数据DataFrame（格式同 calculate_monthly_settlement），没有数据时返回空DataFrame
+        """
+        return self.settle_aggregates(ledger.month_frame(year, month))
+
+    def calculate_monthly_settlement(self, creators_data: Union[List[Dict], 'VideoIndex'], year: int,
+                                     month: int) -> pd.DataFrame:
+        """
+        计算月度结算
+
+        Args:
+            creators_data: 创作者数据列表（或已建立的 VideoIndex，直接查表）
+                [{'name': str, 'videos': List[Dict], 'label': str}, ...]
+                videos: [{'date': str, 'views': int}, ...]
             year: 年份
             month: 月份
 
         Returns:
             结算数据DataFrame
         """
-        settlements = []
+        index = VideoIndex.ensure(creators_data)
+        return self.settle_videos(index.month_frame(year, month))
 
-        for creator in creators_data:
-            name = creator.get('name', 'Unknown')
-            label = creator.get('label', '')
-            videos = creator.get('videos', [])
+    def calculate_range_settlement(self, creators_data: Union[List[Dict], 'VideoIndex'], start_year: int,
+                                   start_month: int, end_year: int,
+                                   end_month: int) -> Dict[Tuple[int, int], pd.DataFrame]:
+        """
+        一次计算一段时间内每个月的结算（季度、年度结算只需读取一次数据）
 
-            # 筛选指定月份的视频
-            monthly_videos = []
-            for video in videos:
-                try:
-                    video_date = parse_video_date(video.get('date', ''))
-                    if video_date and video_date.year == year and video_date.month == month:
-                        monthly_videos.append(video)
-                except:
-                    continue
+        Args:
+            creators_data: 创作者数据列表（格式见 calculate_monthly_settlement，或已建立的 VideoIndex）
+            start_year: 起始年份
+            start_month: 起始月份
+            end_year: 结束年份（包含）
+            end_month: 结束月份（包含）
 
-            # 计算总播放量
-            total_views = sum(v.get('views', 0) for v in monthly_videos)
-            video_count = len(monthly_videos)
-
-            if video_count > 0:
-                # 计算结算，传入label而不是is_large_ugc
-                settlement = self.calculate_settlement(video_count, total_views, label)
-                settlement['creator'] = name
-                settlement['year'] = year
-                settlement['month'] = month
-                settlements.append(settlement)
-
-        # 转换为DataFrame
-        if settlements:
-            df = pd.DataFrame(settlements)
-            df = df[['creator', 'label', 'ugc_type', 'video_count', 'total_views',
-                     'base_pay', 'commission', 'total', 'year', 'month']]
-            return df
-        else:
+        Returns:
+            {(年份, 月份): 结算数据DataFrame}，包含范围内的每个月，没有视频的月份为空DataFrame
+        """
+        months = month_sequence(start_year, start_month, end_year, end_month)
+        if not months:
+            return {}
+
+        index = VideoIndex.ensure(creators_data)
+        settlement = self.settle_videos(index.months_frame(months))
+
+        results = {month: pd.DataFrame() for month in months}
+        if not settlement.empty:
+            for (year, month), rows in settlement.groupby(['year', 'month'], sort=True):
+                results[(int(year), int(month))] = rows.reset_index(drop=True)
+        return results
+
+    def compare_rate_tables(self, settlement_df: pd.DataFrame,
+                            scenarios: Optional[Dict[str, RateTable]] = None) -> pd.DataFrame:
+        """
+        按候选费率表重新计算已有的结算（假设分析，不需要重新读取Notion）
+
+        底薪和提成只取决于每个创作者的视频数、总播放量和标签，结算记录中都有，
+        所有候选费率表在一次矩阵运算中算完
+
+        Args:
+            settlement_df: 结算数据（calculate_monthly_settlement 的结果或保存的结算记录）
+            scenarios: {方案名称: 费率表}，默认使用费率配置中的 scenarios
+
+        Returns:
+            DataFrame: creator、label、video_count、total_views、total（当前费率），以及每个方案一列总额
+        """
+        scenarios = self.rates.scenarios if scenarios is None else scenarios
+        if settlement_df is None or settlement_df.empty:
             return pd.DataFrame()
 
+        comparison = settlement_df[['creator', 'label', 'video_count', 'total_views', 'total']].reset_index(drop=True)
+        totals = price_scenarios(comparison['video_count'].to_numpy(), comparison['total_views'].to_numpy(),
+                                 comparison['label'].to_numpy(), scenarios)
+        return pd.concat([comparison, totals], axis=1)
+
+
+class VideoIndex:
+    """
+    按(年, 月)索引的视频行
+
+    从Notion读取视频行时建立一次：每个标题只解析一次日期，记录每个月有哪些行；
+    之后任意月份（或多个月）的结算直接按月份取行，不再逐行解析和扫描所有视频
+    """
+
+    def __init__(self):
+        """初始化空索引"""
+        # 日期有效的视频行，按列保存
+        self._columns = {'creator_key': [], 'creator': [], 'label': [], 'date': [], 'views': [],
+                         'year': [], 'month': []}
+        # {(年, 月): [行号, ...]}
+        self._months: Dict[Tuple[int, int], List[int]] = {}
+        self._frame: Optional[pd.DataFrame] = None
+        self.creator_count = 0
+
+        # 无法识别日期的标题 {标题: 创作者名称}，每个标题只报告一次
+        self.unparsed: Dict[str, str] = {}
+
+    @classmethod
+    def from_creators_data(cls, creators_data: List[Dict]) -> 'VideoIndex':
+        """
+        从创作者数据列表建立索引
+
+        Args:
+            creators_data: [{'name': str, 'videos': [{'date': str, 'views': int}, ...], 'label': str}, ...]
+
+        Returns:
+            VideoIndex
+        """
+        index = cls()
+        for creator in creators_data:
+            index.add_creator(creator.get('name', 'Unknown'), creator.get('label', ''), creator.get('videos', []))
+        return index
+
+    @classmethod
+    def ensure(cls, creators_data: Union[List[Dict], 'VideoIndex']) -> 'VideoIndex':
+        """已经是索引时直接返回，否则从创作者数据列表建立"""
+        if isinstance(creators_data, cls):
+            return creators_data
+        return cls.from_creators_data(creators_data)
+
+    def add_creator(self, name: str, label: str, videos: List[Dict]) -> List[str]:
+        """
+        加入一个创作者的视频行
+
+        Args:
+            name: 创作者名称
+            label: 创作者标签
+            videos: [{'date': str, 'views': int}, ...]
+
+        Returns:
+            本次新出现的无法识别日期的标题
+        """
+        key = self.creator_count
+        self.creator_count += 1
+        self._frame = None
+
+        new_unparsed = []
+        columns = self._columns
+        for video in videos:
+            title = video.get('date', '')
+            video_date = cached_video_date(title) if isinstance(title, str) else None
+            if video_date is None:
+                if isinstance(title, str) and title not in self.unparsed:
+                    self.unparsed[title] = name
+                    new_unparsed.append(title)
+                continue
+
+            self._months.setdefault((video_date.year, video_date.month), []).append(len(columns['views']))
+            columns['creator_key'].append(key)
+            columns['creator'].append(name)
+            columns['label'].append(label)
+            columns['date'].append(title)
+            columns['views'].append(video.get('views', 0))
+            columns['year'].append(video_date.year)
+            columns['month'].append(video_date.month)
+        return new_unparsed
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """所有日期有效的视频行（第一次访问时建立DataFrame）"""
+        if self._frame is None:
+            columns = self._columns
+            self._frame = pd.DataFrame({
+                'creator_key': pd.Series(columns['creator_key'], dtype='int64'),
+                'creator': pd.Series(columns['creator'], dtype=object),
+                'label': pd.Series(columns['label'], dtype=object),
+                'date': pd.Series(columns['date'], dtype=object),
+                'views': pd.Series(columns['views']) if columns['views'] else pd.Series([], dtype='int64'),
+                'year': pd.Series(columns['year'], dtype='int64'),
+                'month': pd.Series(columns['month'], dtype='int64')
+            })
+        return self._frame
+
+    def months(self) -> List[Tuple[int, int]]:
+        """有视频的月份（从早到晚）"""
+        return sorted(self._months)
+
+    def month_frame(self, year: int, month: int) -> pd.DataFrame:
+        """某个月的视频行"""
+        return self.months_frame([(year, month)])
+
+    def months_frame(self, months: List[Tuple[int, int]]) -> pd.DataFrame:
+        """
+        多个月的视频行
+
+        Args:
+            months: [(年, 月), ...]
+
+        Returns:
+            DataFrame（列同 frame），没有视频时为空DataFrame
+        """
+        rows = [row for month in months for row in self._months.get(month, [])]
+        return self.frame.take(sorted(rows))
+
 
 class DataStorage:
     """数据存储管理器"""
@@ -296,6 +551,13 @@ def format_number(number: float, decimals: int = 0) -> str:
         return f"{int(number):,}"
 
 
+# 以8位数字（YYYYMMDD）开头的标题，后面可以跟序号（-1、_01、a等）
+_DATE_PREFIX = re.compile(r'^(\d{8})')
+
+# 8位数字之外的日期格式
+_DATE_FORMATS = ['%Y%m%d', '%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d']
+
+
 def parse_video_date(date_str: str) -> Optional[datetime]:
     """
     解析视频日期字符串
@@ -311,26 +573,17 @@ def parse_video_date(date_str: str) -> Optional[datetime]:
     Returns:
         datetime对象，解析失败返回None
     """
-    import re
-
     # 如果包含序号后缀，先提取日期部分
     # 匹配模式: 日期后面跟着 -/_ 或字母
     # 例如: 20251114-1, 20251114_01, 20251114a
     date_part = date_str
 
     # 尝试提取前8位数字（YYYYMMDD格式）
-    match = re.match(r'^(\d{8})', date_str)
+    match = _DATE_PREFIX.match(date_str)
     if match:
         date_part = match.group(1)
 
-    formats = [
-        '%Y%m%d',
-        '%Y-%m-%d',
-        '%Y/%m/%d',
-        '%Y.%m.%d'
-    ]
-
-    for fmt in formats:
+    for fmt in _DATE_FORMATS:
         try:
             return datetime.strptime(date_part, fmt)
         except:
@@ -339,6 +592,50 @@ def parse_video_date(date_str: str) -> Optional[datetime]:
     return None
 
 
+@lru_cache(maxsize=65536)
+def cached_video_date(title: str) -> Optional[datetime]:
+    """
+    解析视频标题中的日期（结果与 parse_video_date 相同，按标题缓存）
+
+    YYYYMMDD[-n] 形式的标题（绝大多数）直接按位取年月日，不经过 strptime；其它格式交给 parse_video_date
+
+    Args:
+        title: 视频标题
+
+    Returns:
+        datetime对象，解析失败返回None
+    """
+    prefix = title[:8]
+    if len(prefix) == 8 and prefix.isascii() and prefix.isdigit():
+        # 8位数字只能按 4+2+2 拆分，无效的年月日与 strptime 一样解析失败
+        try:
+            return datetime(int(prefix[:4]), int(prefix[4:6]), int(prefix[6:8]))
+        except ValueError:
+            return None
+    return parse_video_date(title)
+
+
+def month_sequence(start_year: int, start_month: int, end_year: int, end_month: int) -> List[Tuple[int, int]]:
+    """
+    两个月份之间（包含两端）的所有月份
+
+    Args:
+        start_year: 起始年份
+        start_month: 起始月份
+        end_year: 结束年份
+        end_month: 结束月份
+
+    Returns:
+        [(年份, 月份), ...]，结束早于起始时返回空列表
+    """
+    months = []
+    index = start_year * 12 + start_month - 1
+    while index <= end_year * 12 + end_month - 1:
+        months.append((index // 12, index % 12 + 1))
+        index += 1
+    return months
+
+
 def get_month_range(year: int, month: int) -> tuple:
     """
     获取月份的日期范围
@@ -3,26 +3,145 @@
 支持从Instagram和TikTok爬取视频播放量
 """
 
-import requests
-from bs4 import BeautifulSoup
-import re
 import json
+import multiprocessing
+import requests
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import traceback
 
+try:
+    from .extractors import (EXTRACTORS, ExtractorPipeline, find_embedded_view_count, find_view_count,
+                             parse_views_number)
+    from .html_extract import detect_wall
+    from .scrape_metrics import ScrapeMetrics
+    from .endpoints import EndpointStrategy
+    from .rate_controller import RateController
+    from .url_canonical import video_id_from_url
+except ImportError:
+    from extractors import (EXTRACTORS, ExtractorPipeline, find_embedded_view_count, find_view_count,
+                            parse_views_number)
+    from html_extract import detect_wall
+    from scrape_metrics import ScrapeMetrics
+    from endpoints import EndpointStrategy
+    from rate_controller import RateController
+    from url_canonical import video_id_from_url
+
+
+# 视频已删除/不存在/私密时页面中出现的标志文本
+UNAVAILABLE_MARKERS = {
+    'not_found': (
+        "Sorry, this page isn't available",
+        'Video currently unavailable',
+        "Couldn't find this account",
+        '"statusCode":10204',
+    ),
+    'private': (
+        'This account is private',
+        'This video is private',
+        '"statusCode":10222',
+    ),
+}
+
+
+def detect_unavailable(page) -> Optional[str]:
+    """
+    检测页面是否表示视频不可用
+
+    Args:
+        page: 页面HTML（str或原始bytes）
+
+    Returns:
+        'not_found' 或 'private'，正常页面返回None
+    """
+    is_bytes = isinstance(page, bytes)
+    for reason, markers in UNAVAILABLE_MARKERS.items():
+        for marker in markers:
+            if (marker.encode() if is_bytes else marker) in page:
+                return reason
+    return None
+
+
+
+# 解析进程内的提取流水线（每个进程各自按命中率排序）
+_WORKER_PIPELINES: Dict[str, ExtractorPipeline] = {}
+
+
+def extract_from_body(platform: str, body: bytes) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+    """
+    从页面原始字节中提取播放量（模块级函数，可以在解析进程池中执行）
+
+    Args:
+        platform: 平台名称
+        body: 页面原始字节（直接以bytes传给子进程，不解码为str）
+
+    Returns:
+        (播放量, 提取方法, 失败原因)
+    """
+    pipeline = _WORKER_PIPELINES.get(platform)
+    if pipeline is None:
+        pipeline = _WORKER_PIPELINES[platform] = ExtractorPipeline(platform)
+
+    views, method = pipeline.run(body)
+    if views is not None:
+        return views, method, None
+
+    # 没有播放量时再判断是否为已删除/私密视频或拦截页面
+    return None, None, detect_unavailable(body) or detect_wall(body) or 'no_data'
+
 
 class ViewScraper:
     """视频播放量爬取器"""
 
-    def __init__(self, delay: float = 2.0):
+    def __init__(self, delay: float = 2.0, stream: bool = True, max_body_bytes: int = 4 * 1024 * 1024,
+                 chunk_size: int = 64 * 1024, metrics: Optional[ScrapeMetrics] = None,
+                 timeout: float = 15.0, min_timeout: float = 3.0, timeout_factor: float = 2.0,
+                 min_timeout_samples: int = 20, hedge: bool = False,
+                 endpoints: Optional[EndpointStrategy] = None, rate_controller: Optional[RateController] = None):
         """
         初始化爬取器
 
         Args:
             delay: 每次请求之间的延迟（秒），避免被封禁
+            stream: 是否流式下载（找到播放量后提前停止读取）
+            max_body_bytes: 单个页面最多读取的字节数
+            chunk_size: 流式下载的分块大小
+            metrics: 爬取指标收集器（可选），记录耗时、提取方法、失败原因和下载字节数
+            timeout: 单个请求的最长耗时（秒，包括读取正文）
+            min_timeout: 自适应超时的下限（秒）
+            timeout_factor: 自适应超时 = 该平台最近耗时的p95 × timeout_factor（不超过timeout）
+            min_timeout_samples: 样本数达到多少之后才启用自适应超时和备份请求
+            hedge: 请求超过该平台p95仍未完成时，是否再发一个相同的备份请求，取先完成的结果
+            endpoints: 轻量端点策略（可选），先试嵌入页/JSON接口，都没有结果时才下载完整页面
+            rate_controller: 按平台的自适应限速（可选），设置后请求间隔和并发数由它决定，delay 不再使用
         """
         self.delay = delay
+        self.stream = stream
+        self.max_body_bytes = max_body_bytes
+        self.chunk_size = chunk_size
+        self.metrics = metrics
+        self.timeout = timeout
+        self.min_timeout = min_timeout
+        self.timeout_factor = timeout_factor
+        self.min_timeout_samples = min_timeout_samples
+        self.hedge = hedge
+        self.endpoints = endpoints
+        self.rate_controller = rate_controller
+        self.bytes_downloaded = 0
+
+        # 本轮爬取的截止时间（time.time()），超过后不再发新请求，见 set_deadline
+        self.deadline = None
+
+        # 备份请求统计：发出次数 / 备份请求先完成的次数
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self._hedge_pool = None
+
+        # 每个下载线程最近一次请求的字节数和状态码（并发下载时各线程分开记录）
+        self._fetch_state = threading.local()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -35,6 +154,27 @@ class ViewScraper:
         self.session = requests.Session()
         self.session.headers.update(self.headers)
 
+        # 最近一次爬取的结果说明，供缓存和统计使用
+        # last_method: 成功时使用的提取方法; last_failure: 失败原因
+        # ('not_found', 'private', 'login_wall', 'captcha', 'consent_wall', 'rate_limited',
+        #  'timeout', 'http_error', 'no_data', 'error'; 超出本轮时间预算的为 'budget';
+        #  scrape_many 中被拒绝的为 'deferred')
+        self.last_method = None
+        self.last_failure = None
+
+        # 每个平台一条提取流水线，按命中率和耗时自动排序
+        self.pipelines = {
+            'instagram': ExtractorPipeline('instagram'),
+            'tiktok': ExtractorPipeline('tiktok')
+        }
+
+        # 轻量端点（嵌入页等）的正文结构与完整页面不同，使用单独的流水线，不影响完整页面的命中率排序；
+        # 嵌入页中可能有其他视频的数字，不执行兜底策略（改为按视频ID在内嵌JSON中查找）
+        self.endpoint_pipelines = {
+            platform: ExtractorPipeline(platform, [e for e in EXTRACTORS[platform] if not e.fallback])
+            for platform in self.pipelines
+        }
+
     def identify_platform(self, url: str) -> str:
         """
         识别链接所属的平台
@@ -53,181 +193,448 @@ class ViewScraper:
         else:
             return 'unknown'
 
-    def scrape_instagram_views(self, url: str) -> Optional[int]:
+    def _fetch(self, url: str, platform: str, extract: bool = True, timeout: Optional[float] = None,
+               pipeline: Optional[ExtractorPipeline] = None) -> Tuple[int, bytes, Optional[int], Optional[str]]:
         """
-        从Instagram爬取播放量
+        下载页面
+
+        流式模式下边下载边扫描：目标片段一到达就尝试提取，找到播放量或遇到登录墙/验证页就停止读取，
+        正文超过 max_body_bytes 时截断；从发出请求到读完正文的总耗时超过 timeout 时抛出 requests.Timeout
 
         Args:
-            url: Instagram视频链接
+            url: 视频链接
+            platform: 平台名称
+            extract: 是否在下载过程中提取（交给解析进程池时为False，下载线程只做拦截检测）
+            timeout: 本次请求的最长耗时（秒），None为 self.timeout
+            pipeline: 下载过程中使用的提取流水线，None为该平台完整页面的流水线
 
         Returns:
-            播放量（整数），失败返回None
+            (HTTP状态码, 已下载的正文, 提前找到的播放量, 提取方法或拦截原因)
+            提前找到播放量时正文返回空字节
         """
+        self._fetch_state.bytes = 0
+        self._fetch_state.status_code = None
+        timeout = timeout or self.timeout
+        started = time.perf_counter()
+
+        if not self.stream:
+            response = self.session.get(url, timeout=timeout)
+            self._fetch_state.status_code = response.status_code
+            self._count_bytes(len(response.content))
+            if response.status_code < 400:
+                wall = self._wall_from_url(response.url)
+                if wall:
+                    return response.status_code, b'', None, wall
+                return response.status_code, response.content, None, detect_wall(response.content)
+            return response.status_code, response.content, None, None
+
+        pipeline = pipeline or self.pipelines[platform]
+        # 每个精确策略的扫描位置，每收到一块只扫描新到达的字节
+        scan = {}
+        buffer = bytearray()
+        wall = None
+
+        # requests 的 timeout 只限制连接和两次读取之间的间隔，慢速滴流的页面另外检查总耗时
+        response = self.session.get(url, timeout=timeout, stream=True)
+        self._fetch_state.status_code = response.status_code
         try:
-            print(f"[Instagram] 开始爬取: {url}")
-
-            # 发送请求
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-
-            # 解析HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # 方法1: 从meta标签提取
-            meta_description = soup.find('meta', {'property': 'og:description'})
-            if meta_description:
-                content = meta_description.get('content', '')
-                # 匹配 "X views" 或 "X,XXX views" 或 "X万 views"
-                matches = re.findall(r'([\d,]+(?:\.\d+)?[万千百]?)\s*(?:views?|次播放)', content, re.IGNORECASE)
-                if matches:
-                    views_str = matches[0]
-                    views = self._parse_views_number(views_str)
-                    if views is not None:
-                        print(f"[Instagram] ✓ 从meta标签获取: {views} views")
-                        return views
-
-            # 方法2: 从页面JSON数据提取
-            scripts = soup.find_all('script', {'type': 'application/ld+json'})
-            for script in scripts:
-                try:
-                    data = json.loads(script.string)
-                    if isinstance(data, dict):
-                        # 查找interactionStatistic
-                        if 'interactionStatistic' in data:
-                            for stat in data['interactionStatistic']:
-                                if stat.get('interactionType') == 'http://schema.org/WatchAction':
-                                    views = int(stat.get('userInteractionCount', 0))
-                                    print(f"[Instagram] ✓ 从JSON-LD获取: {views} views")
-                                    return views
-                except:
-                    continue
-
-            # 方法3: 从页面文本搜索
-            page_text = soup.get_text()
-            matches = re.findall(r'([\d,]+(?:\.\d+)?[万千百]?)\s*(?:views?|次播放)', page_text, re.IGNORECASE)
-            if matches:
-                views_str = matches[0]
-                views = self._parse_views_number(views_str)
+            if response.status_code >= 400:
+                return response.status_code, b'', None, None
+
+            wall = self._wall_from_url(response.url)
+            if wall:
+                return response.status_code, b'', None, wall
+
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                scanned = len(buffer)
+                buffer.extend(chunk)
+
+                views, method = pipeline.run_ready(buffer, scan) if extract else (None, None)
                 if views is not None:
-                    print(f"[Instagram] ✓ 从页面文本获取: {views} views")
-                    return views
+                    self._count_bytes(len(buffer))
+                    return response.status_code, b'', views, method
+
+                wall = detect_wall(buffer, scanned)
+                if wall:
+                    break
 
-            print(f"[Instagram] ✗ 未找到播放量数据")
+                if len(buffer) >= self.max_body_bytes:
+                    print(f"[{platform}] 正文超过 {self.max_body_bytes} 字节，截断")
+                    break
+
+                if time.perf_counter() - started > timeout:
+                    self._count_bytes(len(buffer))
+                    raise requests.Timeout(f"读取正文超过 {timeout:.1f} 秒")
+
+            self._count_bytes(len(buffer))
+            return response.status_code, bytes(buffer), None, wall
+        finally:
+            response.close()
+
+    def _count_bytes(self, count: int):
+        """累计下载字节数，并记录本线程这次请求的字节数"""
+        self.bytes_downloaded += count
+        self._fetch_state.bytes = count
+
+    def import_session(self, platform: str, browser_session: Dict):
+        """
+        导入浏览器会话的cookie和User-Agent（见 ViewScraperSelenium.export_session），
+        之后的HTTP请求带着浏览器通过同意弹窗/登录后得到的cookie
+
+        Args:
+            platform: 平台名称
+            browser_session: {'cookies': [{'name', 'value', 'domain', 'path'}], 'user_agent': str}
+        """
+        for cookie in browser_session.get('cookies', []):
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+        if browser_session.get('user_agent'):
+            self.session.headers['User-Agent'] = browser_session['user_agent']
+        print(f"[{platform}] 已导入浏览器会话: {len(browser_session.get('cookies', []))} 个cookie")
+
+    def set_deadline(self, deadline: Optional[float]):
+        """
+        设置本轮爬取的截止时间
+
+        Args:
+            deadline: time.time() 形式的截止时间，None表示不限制
+        """
+        self.deadline = deadline
+
+    def _p95(self, platform: str) -> Optional[float]:
+        """该平台HTTP请求最近耗时的p95，样本不足时返回None"""
+        if self.metrics is None or self.metrics.sample_count(platform, 'http') < self.min_timeout_samples:
             return None
+        return self.metrics.percentile(platform, 'http', 0.95)
+
+    def _timeout_for(self, platform: str) -> float:
+        """
+        本次请求的超时时间
+
+        样本足够时按该平台p95自适应（不低于 min_timeout，不超过 timeout），并且不超过距截止时间的剩余秒数
+
+        Args:
+            platform: 平台名称
+
+        Returns:
+            秒数，小于等于0表示本轮时间预算已用完
+        """
+        timeout = self.timeout
+        p95 = self._p95(platform)
+        if p95 is not None:
+            timeout = min(self.timeout, max(self.min_timeout, p95 * self.timeout_factor))
+        if self.deadline is not None:
+            timeout = min(timeout, self.deadline - time.time())
+        return timeout
+
+    def _timed_fetch(self, url: str, platform: str, timeout: float) -> Tuple[Tuple, Dict]:
+        """
+        执行一次下载，并带回下载线程里记录的字节数和状态码
+
+        Returns:
+            (_fetch 的返回值, {'bytes': int, 'status_code': int 或 None})
+        """
+        result = self._fetch(url, platform, timeout=timeout)
+        return result, {
+            'bytes': self._fetch_state.bytes,
+            'status_code': self._fetch_state.status_code
+        }
+
+    def _hedged_fetch(self, url: str, platform: str, timeout: float, hedge_after: float) -> Tuple[Tuple, Dict]:
+        """
+        带备份请求的下载：第一个请求超过 hedge_after 秒仍未完成时再发一个相同的请求，取先成功的结果
+
+        另一个请求不会被中断，由它自己的超时结束；备份请求的超时不超过距截止时间的剩余秒数，已经没有剩余时间时不发备份请求
+
+        Args:
+            url: 视频链接
+            platform: 平台名称
+            timeout: 第一个请求的超时时间（秒）
+            hedge_after: 多久之后发出备份请求（秒，一般为该平台的p95）
+
+        Returns:
+            同 _timed_fetch；两个请求都失败时抛出后完成的那个异常
+        """
+        if self._hedge_pool is None:
+            self._hedge_pool = ThreadPoolExecutor(max_workers=4)
+
+        first = self._hedge_pool.submit(self._timed_fetch, url, platform, timeout)
+        done, _ = wait([first], timeout=hedge_after)
+        if done:
+            return first.result()
+
+        hedge_timeout = max(self.min_timeout, timeout - hedge_after)
+        if self.deadline is not None:
+            hedge_timeout = min(hedge_timeout, self.deadline - time.time())
+        if hedge_timeout <= 0:
+            return first.result()
+
+        self.hedges_fired += 1
+        print(f"[{platform}] 超过p95 ({hedge_after:.1f}s) 仍未完成，发出备份请求")
+        second = self._hedge_pool.submit(self._timed_fetch, url, platform, hedge_timeout)
+
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self.hedges_won += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def close(self):
+        """关闭备份请求的线程池（不等待仍在下载的请求，下次发备份请求时重新创建）"""
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False, cancel_futures=True)
+            self._hedge_pool = None
+
+    def _fetch_endpoint(self, endpoint_url: str, platform: str, kind: str, video_id: str,
+                        timeout: float) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+        """
+        下载一个轻量端点并提取播放量（不修改 last_method / last_failure，可以在下载线程中执行）
 
+        Args:
+            endpoint_url: 端点链接
+            platform: 平台名称
+            kind: 'html' 或 'json'
+            video_id: 视频ID（JSON中按ID查找，避免取到其他视频的数字）
+            timeout: 超时时间（秒）
+
+        Returns:
+            (播放量, 提取方法, 失败原因)
+        """
+        try:
+            status_code, body, views, note = self._fetch(endpoint_url, platform, extract=(kind == 'html'),
+                                                         timeout=timeout, pipeline=self.endpoint_pipelines[platform])
         except requests.Timeout:
-            print(f"[Instagram] ✗ 请求超时")
-            return None
-        except requests.RequestException as e:
-            print(f"[Instagram] ✗ 请求失败: {str(e)}")
-            return None
-        except Exception as e:
-            print(f"[Instagram] ✗ 爬取失败: {str(e)}")
-            print(traceback.format_exc())
-            return None
+            return None, None, 'timeout'
+        except requests.RequestException:
+            return None, None, 'http_error'
+
+        failure = self._status_failure(status_code)
+        if failure:
+            return None, None, failure
+        if views is not None:
+            return views, note, None
+        if note:
+            return None, None, note
+
+        if kind == 'json':
+            try:
+                views = find_view_count(json.loads(body), video_id)
+            except ValueError:
+                views = None
+            return (views, 'api', None) if views is not None else (None, None, 'no_data')
+
+        views, method = self.endpoint_pipelines[platform].run(body)
+        if views is not None:
+            return views, method, None
+        views = find_embedded_view_count(body, video_id)
+        if views is not None:
+            return views, 'embedded_json', None
+        return None, None, detect_unavailable(body) or detect_wall(body) or 'no_data'
+
+    def _try_endpoints(self, url: str, platform: str) -> Tuple[Optional[int], Optional[str], Optional[str], int]:
+        """
+        按端点策略依次尝试轻量端点
 
-    def scrape_tiktok_views(self, url: str) -> Optional[int]:
+        某个端点返回 not_found 等失败时继续尝试下一个（嵌入页可能被作者关闭），最终以完整页面为准；
+        限流或超出时间预算时停止
+
+        Args:
+            url: 视频链接
+            platform: 平台名称
+
+        Returns:
+            (播放量, 带端点前缀的提取方法（例如 'embed:raw_json'）, 最后的失败原因, 下载的字节数)
         """
-        从TikTok爬取播放量
+        if self.endpoints is None:
+            return None, None, None, 0
+
+        video_id = video_id_from_url(url)
+        failure = None
+        total_bytes = 0
+        for name, endpoint_url, kind in self.endpoints.candidates(url, platform):
+            timeout = self._timeout_for(platform)
+            if timeout <= 0:
+                return None, None, 'budget', total_bytes
+
+            views, method, failure = self._fetch_endpoint(endpoint_url, platform, kind, video_id, timeout)
+            total_bytes += self._fetch_state.bytes
+            self.endpoints.record(platform, name, views is not None)
+            if views is not None:
+                return views, f"{name}:{method}", None, total_bytes
+            if failure == 'rate_limited':
+                break
+        return None, None, failure, total_bytes
+
+    def _delay_for(self, platform: str) -> float:
+        """该平台两次请求之间的间隔（秒）"""
+        if self.rate_controller is not None:
+            return self.rate_controller.delay(platform)
+        return self.delay
+
+    def _record_rate(self, platform: str, views: Optional[int], failure: Optional[str]):
+        """把一次爬取结果交给自适应限速（没有发请求的结果不计）"""
+        if self.rate_controller is not None and failure not in ('deferred', 'budget', 'unsupported'):
+            self.rate_controller.record(platform, views is not None, failure)
+
+    def _record_metrics(self, platform: str, started: float, views: Optional[int]):
+        """把一次爬取的结果记录到指标收集器（超出时间预算、没有发请求的不记录）"""
+        if self.metrics is None or self.last_failure == 'budget':
+            return
+        self.metrics.record(
+            platform, 'http', time.perf_counter() - started, views,
+            method=self.last_method, failure=self.last_failure,
+            bytes_downloaded=getattr(self._fetch_state, 'bytes', 0),
+            status_code=getattr(self._fetch_state, 'status_code', None)
+        )
+
+    @staticmethod
+    def _status_failure(status_code: int) -> Optional[str]:
+        """HTTP状态码对应的失败原因，正常返回None"""
+        if status_code in (404, 410):
+            return 'not_found'
+        if status_code == 429:
+            return 'rate_limited'
+        if status_code >= 400:
+            return 'http_error'
+        return None
+
+    @staticmethod
+    def _wall_from_url(final_url: str) -> Optional[str]:
+        """跳转到登录页时直接判定为登录墙"""
+        final_url = (final_url or '').lower()
+        if '/accounts/login' in final_url or '/login?' in final_url:
+            return 'login_wall'
+        return None
+
+    def _scrape_http(self, url: str, platform: str, label: str) -> Optional[int]:
+        """
+        下载页面并用该平台的提取流水线解析
 
         Args:
-            url: TikTok视频链接
+            url: 视频链接
+            platform: 平台名称
+            label: 日志中显示的平台名
 
         Returns:
             播放量（整数），失败返回None
         """
         try:
-            print(f"[TikTok] 开始爬取: {url}")
-
-            # 发送请求
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-
-            # 解析HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # 方法1: 从meta标签提取
-            meta_description = soup.find('meta', {'property': 'og:description'})
-            if meta_description:
-                content = meta_description.get('content', '')
-                # 匹配 "X views" 或 "X,XXX views" 或 "X.XM views"
-                matches = re.findall(r'([\d.]+[KMB]?)\s*(?:views?)', content, re.IGNORECASE)
-                if matches:
-                    views_str = matches[0]
-                    views = self._parse_views_number(views_str)
-                    if views is not None:
-                        print(f"[TikTok] ✓ 从meta标签获取: {views} views")
-                        return views
-
-            # 方法2: 从script标签中的JSON数据提取
-            scripts = soup.find_all('script', {'id': '__UNIVERSAL_DATA_FOR_REHYDRATION__'})
-            for script in scripts:
-                try:
-                    data = json.loads(script.string)
-                    # TikTok的数据结构: __DEFAULT_SCOPE__.__SIGI_STATE__.ItemModule
-                    if '__DEFAULT_SCOPE__' in data:
-                        scope = data['__DEFAULT_SCOPE__']
-                        if 'webapp.video-detail' in scope:
-                            video_detail = scope['webapp.video-detail']
-                            if 'itemInfo' in video_detail and 'itemStruct' in video_detail['itemInfo']:
-                                stats = video_detail['itemInfo']['itemStruct'].get('stats', {})
-                                views = int(stats.get('playCount', 0))
-                                if views > 0:
-                                    print(f"[TikTok] ✓ 从JSON数据获取: {views} views")
-                                    return views
-                except:
-                    continue
-
-            # 方法3: 从SIGI_STATE提取
-            scripts = soup.find_all('script', {'id': 'SIGI_STATE'})
-            for script in scripts:
-                try:
-                    data = json.loads(script.string)
-                    # 查找ItemModule
-                    if 'ItemModule' in data:
-                        for item_id, item_data in data['ItemModule'].items():
-                            if 'stats' in item_data:
-                                views = int(item_data['stats'].get('playCount', 0))
-                                if views > 0:
-                                    print(f"[TikTok] ✓ 从SIGI_STATE获取: {views} views")
-                                    return views
-                except:
-                    continue
-
-            # 方法4: 从页面文本搜索
-            page_text = soup.get_text()
-            matches = re.findall(r'([\d.]+[KMB]?)\s*(?:views?)', page_text, re.IGNORECASE)
-            if matches:
-                views_str = matches[0]
-                views = self._parse_views_number(views_str)
-                if views is not None:
-                    print(f"[TikTok] ✓ 从页面文本获取: {views} views")
-                    return views
+            timeout = self._timeout_for(platform)
+            if timeout <= 0:
+                print(f"[{label}] ✗ 超出本轮时间预算，跳过: {url}")
+                self.last_failure = 'budget'
+                return None
+
+            print(f"[{label}] 开始爬取: {url}")
+
+            views, method, failure, endpoint_bytes = self._try_endpoints(url, platform)
+            if views is not None:
+                print(f"[{label}] ✓ 通过轻量端点{method}获取: {views} views")
+                self._fetch_state.bytes = endpoint_bytes
+                self.last_method = method
+                return views
+            if failure in ('rate_limited', 'budget'):
+                print(f"[{label}] ✗ 轻量端点失败: {failure}")
+                self._fetch_state.bytes = endpoint_bytes
+                self.last_failure = failure
+                return None
+            if self.endpoints is not None:
+                timeout = self._timeout_for(platform)
+                if timeout <= 0:
+                    self.last_failure = 'budget'
+                    return None
+
+            hedge_after = self._p95(platform) if self.hedge else None
+            if hedge_after is not None and hedge_after < timeout:
+                (status_code, body, views, note), state = self._hedged_fetch(url, platform, timeout, hedge_after)
+            else:
+                (status_code, body, views, note), state = self._timed_fetch(url, platform, timeout)
+
+            # 备份请求在其他线程中完成时，把它的字节数和状态码带回当前线程供指标记录
+            self._fetch_state.bytes = state['bytes'] + endpoint_bytes
+            self._fetch_state.status_code = state['status_code']
+
+            failure = self._status_failure(status_code)
+            if failure:
+                print(f"[{label}] ✗ 请求失败: HTTP {status_code} ({failure})")
+                self.last_failure = failure
+                return None
+
+            if views is not None:
+                print(f"[{label}] ✓ 通过{note}获取（提前停止下载）: {views} views")
+                self.last_method = note
+                return views
 
-            print(f"[TikTok] ✗ 未找到播放量数据")
+            if note:
+                print(f"[{label}] ✗ 遇到拦截页面: {note}")
+                self.last_failure = note
+                return None
+
+            # 在完整正文上执行所有策略（流式下载时在部分内容上没有命中的策略，完整正文中可能有）
+            views, method = self.pipelines[platform].run(body)
+            if views is not None:
+                print(f"[{label}] ✓ 通过{method}获取: {views} views")
+                self.last_method = method
+                return views
+
+            # 没有播放量时再判断是否为已删除/私密视频，避免正常页面被误判
+            unavailable = detect_unavailable(body)
+            if unavailable:
+                print(f"[{label}] ✗ 视频不可用: {unavailable}")
+                self.last_failure = unavailable
+                return None
+
+            print(f"[{label}] ✗ 未找到播放量数据")
+            self.last_failure = 'no_data'
             return None
 
         except requests.Timeout:
-            print(f"[TikTok] ✗ 请求超时")
+            print(f"[{label}] ✗ 请求超时")
+            self.last_failure = 'timeout'
             return None
         except requests.RequestException as e:
-            print(f"[TikTok] ✗ 请求失败: {str(e)}")
+            print(f"[{label}] ✗ 请求失败: {str(e)}")
+            self.last_failure = 'http_error'
             return None
         except Exception as e:
-            print(f"[TikTok] ✗ 爬取失败: {str(e)}")
+            print(f"[{label}] ✗ 爬取失败: {str(e)}")
             print(traceback.format_exc())
+            self.last_failure = 'error'
             return None
 
-    def _parse_views_number(self, views_str: str) -> Optional[int]:
+    def scrape_instagram_views(self, url: str) -> Optional[int]:
+        """
+        从Instagram爬取播放量
+
+        Args:
+            url: Instagram视频链接
+
+        Returns:
+            播放量（整数），失败返回None
+        """
+        return self._scrape_http(url, 'instagram', 'Instagram')
+
+    def scrape_tiktok_views(self, url: str) -> Optional[int]:
+        """
+        从TikTok爬取播放量
+
+        Args:
+            url: TikTok视频链接
+
+        Returns:
+            播放量（整数），失败返回None
         """
-        解析播放量字符串为整数
+        return self._scrape_http(url, 'tiktok', 'TikTok')
 
-        支持格式:
-        - "1,234,567" → 1234567
-        - "1.2M" → 1200000
-        - "1.2K" → 1200
-        - "1.2B" → 1200000000
-        - "1.2万" → 12000
+    def _parse_views_number(self, views_str: str) -> Optional[int]:
+        """
+        解析播放量字符串为整数（见 extractors.parse_views_number）
 
         Args:
             views_str: 播放量字符串
@@ -235,31 +642,7 @@ class ViewScraper:
         Returns:
             播放量整数，解析失败返回None
         """
-        try:
-            views_str = views_str.strip().replace(',', '')
-
-            # 处理K/M/B后缀
-            multipliers = {
-                'K': 1000,
-                'M': 1000000,
-                'B': 1000000000,
-                '千': 1000,
-                '万': 10000,
-                '百万': 1000000,
-                '亿': 100000000
-            }
-
-            for suffix, multiplier in multipliers.items():
-                if views_str.upper().endswith(suffix.upper()):
-                    number_str = views_str[:-len(suffix)].strip()
-                    number = float(number_str)
-                    return int(number * multiplier)
-
-            # 直接转换为整数
-            return int(float(views_str))
-
-        except:
-            return None
+        return parse_views_number(views_str)
 
     def scrape_views(self, url: str) -> Optional[int]:
         """
@@ -271,10 +654,16 @@ class ViewScraper:
         Returns:
             播放量（整数），失败返回None
         """
+        self.last_method = None
+        self.last_failure = None
+
         if not url:
             return None
 
         platform = self.identify_platform(url)
+        started = time.perf_counter()
+        self._fetch_state.bytes = 0
+        self._fetch_state.status_code = None
 
         views = None
         if platform == 'instagram':
@@ -283,13 +672,182 @@ class ViewScraper:
             views = self.scrape_tiktok_views(url)
         else:
             print(f"[Unknown] 不支持的平台: {url}")
+            self.last_failure = 'unsupported'
             return None
 
+        self._record_metrics(platform, started, views)
+        self._record_rate(platform, views, self.last_failure)
+
         # 延迟，避免请求过快
-        time.sleep(self.delay)
+        if self.last_failure != 'budget':
+            time.sleep(self._delay_for(platform))
 
         return views
 
+    def _fetch_for_pool(self, url: str, allow: Optional[Callable[[str], bool]] = None) -> Dict:
+        """
+        在下载线程中执行：只下载和检测拦截，不做提取
+
+        设置了端点策略时先在下载线程中试轻量端点（页面小，直接提取），都没有结果时才下载完整页面交给解析进程
+
+        Args:
+            url: 视频链接
+            allow: 请求前的放行检查（例如熔断器），返回False时不发请求
+
+        Returns:
+            {'platform': str, 'body': bytes 或 None, 'failure': str 或 None,
+             'started': float, 'seconds': float, 'bytes': int, 'status_code': int 或 None}
+            轻量端点成功时另有 'views' 和 'method'
+        """
+        platform = self.identify_platform(url)
+        if platform == 'unknown':
+            return {'platform': platform, 'body': None, 'failure': 'unsupported'}
+        if allow is not None and not allow(url):
+            return {'platform': platform, 'body': None, 'failure': 'deferred'}
+        timeout = self._timeout_for(platform)
+        if timeout <= 0:
+            return {'platform': platform, 'body': None, 'failure': 'budget'}
+
+        # 自适应限速：该平台的并发名额用完时在这里等待，名额保持到请求间隔结束
+        if self.rate_controller is not None:
+            self.rate_controller.acquire(platform)
+
+        fetched = {'platform': platform, 'body': None, 'failure': None, 'started': time.perf_counter()}
+        self._fetch_state.bytes = 0
+        self._fetch_state.status_code = None
+        endpoint_bytes = 0
+        try:
+            views, method, failure, endpoint_bytes = self._try_endpoints(url, platform)
+            self._fetch_state.bytes = 0
+            if views is not None:
+                fetched['views'], fetched['method'] = views, method
+                return fetched
+            if failure in ('rate_limited', 'budget'):
+                fetched['failure'] = failure
+                return fetched
+            if self.endpoints is not None:
+                timeout = self._timeout_for(platform)
+                if timeout <= 0:
+                    fetched['failure'] = 'budget'
+                    return fetched
+
+            status_code, body, _, wall = self._fetch(url, platform, extract=False, timeout=timeout)
+            fetched['failure'] = self._status_failure(status_code) or wall
+            if not fetched['failure']:
+                fetched['body'] = body
+        except requests.Timeout:
+            fetched['failure'] = 'timeout'
+        except requests.RequestException:
+            fetched['failure'] = 'http_error'
+        except Exception:
+            fetched['failure'] = 'error'
+        finally:
+            fetched['seconds'] = time.perf_counter() - fetched['started']
+            fetched['bytes'] = self._fetch_state.bytes + endpoint_bytes
+            fetched['status_code'] = self._fetch_state.status_code
+            # 每个下载线程在两次请求之间同样保持延迟
+            if fetched['failure'] != 'budget':
+                time.sleep(self._delay_for(platform))
+            if self.rate_controller is not None:
+                self.rate_controller.release(platform)
+        return fetched
+
+    def scrape_many(self, urls: List[str], fetch_workers: int = 4, parse_workers: Optional[int] = None,
+                    allow: Optional[Callable[[str], bool]] = None) -> Iterator[Tuple[str, Optional[int]]]:
+        """
+        并发爬取多个链接：下载线程只负责网络I/O，页面字节交给解析进程池提取，结果完成一个返回一个
+
+        每次产出结果前设置 last_method / last_failure，调用方可以像 scrape_views 之后一样读取
+
+        Args:
+            urls: 视频链接列表
+            fetch_workers: 下载线程数（设置了自适应限速时为并发上限，每个平台的实际并发由限速器决定）
+            parse_workers: 解析进程数，None为CPU核数，0表示在下载线程中直接解析
+            allow: 请求前的放行检查（例如熔断器），被拒绝的链接 last_failure 为 'deferred'
+
+        下载同样使用自适应超时和截止时间（超出预算的链接 last_failure 为 'budget'），
+        但不发备份请求：并发下载本身已经占满了下载线程
+
+        Yields:
+            (url, views) - 失败时views为None
+        """
+        fetch_pool = ThreadPoolExecutor(max_workers=max(1, fetch_workers))
+        parse_pool = None
+        if parse_workers != 0:
+            try:
+                # 下载线程已经在运行时 fork 的子进程可能继承被其他线程持有的锁，使用 spawn 启动
+                parse_pool = ProcessPoolExecutor(max_workers=parse_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            except (OSError, NotImplementedError, ValueError) as e:
+                # 不支持多进程的环境退回到线程内解析
+                print(f"[并发爬取] 无法创建解析进程池，改为线程内解析: {str(e)}")
+
+        fetching = {fetch_pool.submit(self._fetch_for_pool, url, allow): url for url in urls}
+        parsing = {}
+        pending = set(fetching)
+
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetching:
+                        url = fetching.pop(future)
+                        fetched = future.result()
+                        parse_started = time.perf_counter()
+                        if fetched.get('views') is not None:
+                            views, method, failure = fetched['views'], fetched['method'], None
+                        elif fetched['failure'] is None:
+                            if parse_pool is not None:
+                                try:
+                                    parse_future = parse_pool.submit(extract_from_body, fetched['platform'], fetched['body'])
+                                    parsing[parse_future] = (url, fetched, parse_started)
+                                    pending.add(parse_future)
+                                    continue
+                                except BrokenProcessPool:
+                                    self._close_broken_pool(parse_pool)
+                                    parse_pool = None
+                            views, method, failure = extract_from_body(fetched['platform'], fetched['body'])
+                        else:
+                            views, method, failure = None, None, fetched['failure']
+                    else:
+                        url, fetched, parse_started = parsing.pop(future)
+                        try:
+                            views, method, failure = future.result()
+                        except BrokenProcessPool:
+                            # 解析进程被终止（例如内存不足），这一页和之后的页面都在线程内解析
+                            if parse_pool is not None:
+                                self._close_broken_pool(parse_pool)
+                                parse_pool = None
+                            views, method, failure = extract_from_body(fetched['platform'], fetched['body'])
+                        except Exception as e:
+                            print(f"[并发爬取] 解析失败: {url} - {str(e)}")
+                            views, method, failure = None, None, 'error'
+
+                    self.last_method = method
+                    self.last_failure = failure
+                    self._record_rate(fetched['platform'], views, failure)
+                    if self.metrics is not None and fetched['platform'] != 'unknown' and failure not in ('deferred', 'budget'):
+                        # 耗时 = 下载耗时（不含线程间延迟）+ 解析耗时
+                        self.metrics.record(
+                            fetched['platform'], 'http',
+                            fetched['seconds'] + time.perf_counter() - parse_started, views,
+                            method=method, failure=failure,
+                            bytes_downloaded=fetched['bytes'], status_code=fetched['status_code']
+                        )
+                    print(f"[并发爬取] {'✓' if views is not None else '✗'} {url}: {views if views is not None else failure}")
+                    yield url, views
+        finally:
+            # 调用方提前停止时不再等待剩余的下载
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            if parse_pool is not None:
+                parse_pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _close_broken_pool(parse_pool: ProcessPoolExecutor):
+        """解析进程池已损坏（解析进程被终止），关闭后改为线程内解析"""
+        print("[并发爬取] 解析进程异常退出，改为线程内解析")
+        parse_pool.shutdown(wait=False, cancel_futures=True)
+
     def test_scraper(self, test_urls: list):
         """
         测试爬取器
@@ -9,27 +9,168 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
+import base64
+import json
+import os
+import threading
 import time
-import re
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .view_scraper import ViewScraper, detect_unavailable
+    from .html_extract import detect_wall
+    from .extractors import ExtractorPipeline, find_view_count, parse_views_number
+    from .url_canonical import video_id_from_url
+    from .scrape_metrics import ScrapeMetrics
+    from .rate_controller import RateController
+except ImportError:
+    from view_scraper import ViewScraper, detect_unavailable
+    from html_extract import detect_wall
+    from extractors import ExtractorPipeline, find_view_count, parse_views_number
+    from url_canonical import video_id_from_url
+    from scrape_metrics import ScrapeMetrics
+    from rate_controller import RateController
+
+
+def resolve_driver_path(cache_file: Optional[str] = './data/chromedriver.json', offline: bool = False,
+                        max_age_days: float = 7.0) -> Optional[str]:
+    """
+    获取chromedriver路径，结果缓存在本地，避免每次启动都检查版本或下载
+
+    Args:
+        cache_file: 缓存文件路径（None则不缓存）
+        offline: 离线模式，只使用缓存的路径，不访问网络
+        max_age_days: 缓存超过多少天后重新检查版本
+
+    Returns:
+        chromedriver路径；无法获取时返回None（交给Selenium自带的驱动管理查找）
+    """
+    cached = None
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except:
+            cached = None
+
+    cached_path = cached.get('path') if cached else None
+    if cached_path and not os.path.exists(cached_path):
+        cached_path = None
+
+    if cached_path and (offline or time.time() - cached.get('resolved_at', 0) < max_age_days * 86400):
+        return cached_path
+    if offline:
+        return None
 
+    try:
+        path = ChromeDriverManager().install()
+    except Exception as e:
+        # 网络不可用时退回到过期的缓存
+        print(f"[Selenium] 获取chromedriver失败，使用缓存: {str(e)}")
+        return cached_path
+
+    if cache_file:
+        directory = os.path.dirname(cache_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f, indent=2)
+    return path
+
+
+
+def adaptive_network_timeout(metrics: Optional[ScrapeMetrics], platform: str, network_timeout: float,
+                             deadline: Optional[float]) -> float:
+    """
+    等待网络响应的超时时间
+
+    样本足够（至少20个）时按该平台浏览器耗时的p95自适应：p95的2倍，不低于5秒，不超过 network_timeout；
+    并且不超过距截止时间的剩余秒数
+
+    Args:
+        metrics: 爬取指标收集器（None则使用固定超时）
+        platform: 平台名称
+        network_timeout: 超时上限（秒）
+        deadline: 本轮截止时间（time.time()，None表示不限制）
+
+    Returns:
+        秒数
+    """
+    timeout = network_timeout
+    if metrics is not None and metrics.sample_count(platform, 'browser') >= 20:
+        p95 = metrics.percentile(platform, 'browser', 0.95)
+        timeout = min(network_timeout, max(5.0, p95 * 2))
+    if deadline is not None:
+        timeout = max(0.0, min(timeout, deadline - time.time()))
+    return timeout
+
+
+# 导出浏览器会话时打开的平台首页
+PLATFORM_HOMES = {
+    'instagram': 'https://www.instagram.com/',
+    'tiktok': 'https://www.tiktok.com/'
+}
 
 class ViewScraperSelenium:
     """使用Selenium的播放量爬取器"""
 
-    def __init__(self, delay: float = 2.0, headless: bool = True):
+    def __init__(self, delay: float = 2.0, headless: bool = True,
+                 profile_dir: Optional[str] = './data/chrome_profile',
+                 driver_cache_file: Optional[str] = './data/chromedriver.json', offline: bool = False,
+                 capture_network: bool = True, network_timeout: float = 15.0, tabs: int = 1,
+                 metrics: Optional[ScrapeMetrics] = None, rate_controller: Optional[RateController] = None):
         """
         初始化爬取器
 
         Args:
             delay: 每次请求之间的延迟（秒）
             headless: 是否使用无头模式
+            profile_dir: 持久化的Chrome用户目录（保留磁盘缓存和同意弹窗的cookie），None则每次使用临时目录
+            driver_cache_file: chromedriver路径的缓存文件
+            offline: 离线模式，只使用缓存的chromedriver，不检查版本
+            capture_network: 通过DevTools网络事件直接读取页面文档和接口响应，拿到播放量后立即停止加载
+            network_timeout: 等待网络响应中出现播放量的最长时间（秒），超时后退回到读取页面源码
+            tabs: scrape_many 在同一个浏览器中同时打开的标签页数
+            metrics: 爬取指标收集器（可选）
+            rate_controller: 按平台的自适应限速（可选，可与HTTP爬取器共用），决定请求间隔和每个平台同时加载的标签页数
         """
         self.delay = delay
         self.headless = headless
+        self.profile_dir = profile_dir
+        self.driver_cache_file = driver_cache_file
+        self.offline = offline
+        self.capture_network = capture_network
+        self.network_timeout = network_timeout
+        self.tabs = tabs
+        self.metrics = metrics
+        self.rate_controller = rate_controller
+
+        # 本轮爬取的截止时间（time.time()），见 set_deadline
+        self.deadline = None
+
+        # 最近一次爬取读取的响应和页面源码字节数
+        self._page_bytes = 0
         self.driver = None
 
+        # 浏览器崩溃后重新启动的次数
+        self.driver_restarts = 0
+
+        # 后台预启动浏览器（见 prelaunch）
+        self._driver_lock = threading.Lock()
+        self._prelaunch_thread = None
+
+        # 最近一次爬取的提取方法和失败原因（与ViewScraper一致）
+        self.last_method = None
+        self.last_failure = None
+
+        # 与ViewScraper共用提取策略，按命中率和耗时自动排序
+        self.pipelines = {
+            'instagram': ExtractorPipeline('instagram'),
+            'tiktok': ExtractorPipeline('tiktok')
+        }
+
     def _safe_print(self, message: str):
         """安全的 print 函数（避免 Broken pipe 错误）"""
         try:
@@ -38,29 +179,123 @@ class ViewScraperSelenium:
             # 忽略 print 错误（Streamlit 环境下可能发生）
             pass
 
+    def _build_options(self, profile_dir: Optional[str]) -> Options:
+        """构建Chrome启动参数"""
+        chrome_options = Options()
+
+        if self.headless:
+            chrome_options.add_argument('--headless=new')
+
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+        chrome_options.add_argument('user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+        if profile_dir:
+            chrome_options.add_argument(f'--user-data-dir={os.path.abspath(profile_dir)}')
+
+        if self.capture_network:
+            # 记录网络事件；driver.get 不等待页面加载完成，由网络事件决定何时停止
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+            chrome_options.page_load_strategy = 'none'
+
+        return chrome_options
+
     def _init_driver(self):
-        """初始化Chrome驱动"""
-        if self.driver is None:
-            chrome_options = Options()
+        """初始化Chrome驱动（与后台预启动互斥，已启动时直接返回）"""
+        with self._driver_lock:
+            if self.driver is not None:
+                return
 
-            if self.headless:
-                chrome_options.add_argument('--headless=new')
+            driver_path = resolve_driver_path(self.driver_cache_file, self.offline)
+            service = Service(driver_path) if driver_path else Service()
 
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            chrome_options.add_argument('user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+            try:
+                self.driver = webdriver.Chrome(service=service, options=self._build_options(self.profile_dir))
+            except WebDriverException as e:
+                if not self.profile_dir:
+                    raise
+                # 用户目录被另一个Chrome占用等情况，改用临时目录
+                self._safe_print(f"[Selenium] 无法使用持久化用户目录，改用临时目录: {str(e).splitlines()[0]}")
+                service = Service(driver_path) if driver_path else Service()
+                self.driver = webdriver.Chrome(service=service, options=self._build_options(None))
 
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
             self.driver.set_page_load_timeout(30)
 
+    def prelaunch(self):
+        """
+        在后台线程中启动浏览器，让浏览器启动与读取Notion等准备工作并行
+
+        第一次爬取时如果浏览器还在启动，会等待启动完成；后台启动失败时第一次爬取会重新尝试
+        """
+        if self.driver is not None or self._prelaunch_thread is not None:
+            return
+
+        def launch():
+            try:
+                self._init_driver()
+                self._safe_print("[Selenium] 浏览器已在后台启动")
+            except Exception as e:
+                self._safe_print(f"[Selenium] 后台启动浏览器失败: {str(e)}")
+
+        self._prelaunch_thread = threading.Thread(target=launch, daemon=True)
+        self._prelaunch_thread.start()
+
     def close(self):
         """关闭浏览器"""
+        if self._prelaunch_thread is not None:
+            self._prelaunch_thread.join()
+            self._prelaunch_thread = None
         if self.driver:
             self.driver.quit()
             self.driver = None
 
+    def _driver_alive(self) -> bool:
+        """浏览器和chromedriver是否还能响应命令"""
+        if self.driver is None:
+            return False
+        try:
+            self.driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def _reset_driver(self):
+        """浏览器或chromedriver已崩溃：丢弃当前驱动（不再是一个不能用的对象），下次爬取时重新启动"""
+        driver, self.driver = self.driver, None
+        self.driver_restarts += 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def export_session(self, platform: str) -> Optional[Dict]:
+        """
+        在浏览器中打开平台首页（通过同意弹窗等由浏览器处理的页面），导出cookie和User-Agent，
+        交给HTTP爬取器使用（见 ViewScraper.import_session）
+
+        Args:
+            platform: 平台名称
+
+        Returns:
+            {'cookies': [{'name', 'value', 'domain', 'path', ...}], 'user_agent': str}，失败返回None
+        """
+        home = PLATFORM_HOMES.get(platform)
+        if home is None:
+            return None
+        try:
+            self._init_driver()
+            self.driver.get(home)
+            self._wait_ready()
+            cookies = self.driver.get_cookies()
+            # 无头模式的User-Agent带有 HeadlessChrome 标记，HTTP请求中去掉
+            user_agent = self.driver.execute_script('return navigator.userAgent').replace('HeadlessChrome', 'Chrome')
+            self._safe_print(f"[Selenium] 已导出 {platform} 的浏览器会话 ({len(cookies)} 个cookie)")
+            return {'cookies': cookies, 'user_agent': user_agent}
+        except Exception as e:
+            self._safe_print(f"[Selenium] 导出 {platform} 浏览器会话失败: {str(e)}")
+            return None
+
     def identify_platform(self, url: str) -> str:
         """识别平台"""
         url_lower = url.lower()
@@ -71,123 +306,306 @@ class ViewScraperSelenium:
         else:
             return 'unknown'
 
-    def scrape_instagram_views(self, url: str) -> Optional[int]:
-        """从Instagram爬取播放量"""
+    def _scrape_page(self, url: str, platform: str, label: str, retry: bool = True) -> Optional[int]:
+        """
+        打开页面并用该平台的提取流水线解析渲染后的源码
+
+        浏览器或chromedriver崩溃时重新启动浏览器，并重试一次当前链接（retry=False时不再重试）
+        """
         try:
-            self._safe_print(f"[Instagram] 开始爬取: {url}")
+            self._safe_print(f"[{label}] 开始爬取: {url}")
 
             self._init_driver()
-            self.driver.get(url)
 
-            # 等待页面加载
-            time.sleep(3)
+            if self.capture_network:
+                # 清空上一个页面残留的网络事件
+                self.driver.get_log('performance')
+                self.driver.get(url)
+
+                views, method, failure = self._wait_network_views(url, platform)
+                if views is not None or failure:
+                    self._stop_loading()
+                    if views is not None:
+                        self._safe_print(f"[{label}] ✓ 通过{method}获取: {views:,} views")
+                        self.last_method = method
+                        return views
+                    self._safe_print(f"[{label}] ✗ 页面不可用或被拦截: {failure}")
+                    self.last_failure = failure
+                    return None
+
+                # 网络响应中没有找到时，等页面加载完再读取源码
+                self._wait_ready()
+            else:
+                self.driver.get(url)
+
+                # 等待页面加载
+                time.sleep(3)
 
-            # 方法1: 查找包含"views"文本的元素
             try:
-                # Instagram Reels的播放量通常在特定的span或div中
-                page_source = self.driver.page_source
-
-                # 匹配各种可能的播放量格式
-                patterns = [
-                    r'(\d{1,3}(?:,\d{3})*(?:\.\d+)?[KMB]?)\s*(?:views?|次播放)',
-                    r'videoViewCount["\']?\s*:\s*["\']?(\d+)',
-                    r'"viewCount"\s*:\s*(\d+)',
-                ]
-
-                for pattern in patterns:
-                    matches = re.findall(pattern, page_source, re.IGNORECASE)
-                    if matches:
-                        views_str = matches[0]
-                        views = self._parse_views_number(views_str)
-                        if views and views > 0:
-                            self._safe_print(f"[Instagram] ✓ 成功: {views:,} views")
-                            return views
+                # 渲染后的源码只编码一次，所有提取策略共享同一份字节
+                page = self.driver.page_source.encode('utf-8', errors='replace')
+                self._page_bytes += len(page)
+                return self._extract_page(page, platform, label)
 
             except Exception as e:
-                self._safe_print(f"[Instagram] 查找失败: {str(e)}")
+                self._safe_print(f"[{label}] 查找失败: {str(e)}")
 
-            self._safe_print(f"[Instagram] ✗ 未找到播放量数据")
+            self._safe_print(f"[{label}] ✗ 未找到播放量数据")
+            self.last_failure = 'no_data'
             return None
 
+        except TimeoutException:
+            self._safe_print(f"[{label}] ✗ 页面加载超时")
+            self.last_failure = 'timeout'
+            return None
         except Exception as e:
-            self._safe_print(f"[Instagram] ✗ 错误: {str(e)}")
+            if self.driver is not None and not self._driver_alive():
+                self._safe_print(f"[{label}] ✗ 浏览器已崩溃，重新启动: {type(e).__name__}")
+                self._reset_driver()
+                if retry:
+                    return self._scrape_page(url, platform, label, retry=False)
+            self._safe_print(f"[{label}] ✗ 错误: {str(e)}")
+            self.last_failure = 'error'
             return None
 
-    def scrape_tiktok_views(self, url: str) -> Optional[int]:
-        """从TikTok爬取播放量"""
+    def _read_network_events(self) -> List[Tuple[Optional[str], str, Dict]]:
+        """
+        读取并清空DevTools网络事件
+
+        Returns:
+            [(标签页ID, 事件名, 参数), ...]
+        """
+        events = []
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            inner = message.get('message', {})
+            if inner.get('method', '').startswith('Network.'):
+                events.append((message.get('webview'), inner['method'], inner.get('params', {})))
+        return events
+
+    def _response_body(self, request_id: str) -> Optional[bytes]:
+        """通过DevTools读取一个已完成请求的响应正文"""
         try:
-            self._safe_print(f"[TikTok] 开始爬取: {url}")
+            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            return None
+        body = result.get('body', '')
+        if result.get('base64Encoded'):
+            return base64.b64decode(body)
+        return body.encode('utf-8', errors='replace')
 
-            self._init_driver()
-            self.driver.get(url)
+    def _extract_response(self, platform: str, video_id: Optional[str], resource_type: str,
+                          response_url: str, body: bytes) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+        """
+        从一个网络响应中提取播放量
 
-            # 等待页面加载
-            time.sleep(3)
+        Args:
+            platform: 平台名称
+            video_id: 目标视频ID（只接受该视频的计数）
+            resource_type: DevTools资源类型（'Document'、'XHR'、'Fetch'）
+            response_url: 响应的URL
+            body: 响应正文
+
+        Returns:
+            (播放量, 提取方法, 失败原因)，都没有时返回 (None, None, None)
+        """
+        if resource_type == 'Document':
+            wall = ViewScraper._wall_from_url(response_url)
+            if wall:
+                return None, None, wall
 
-            # 方法1: 从页面源码中提取
-            try:
-                page_source = self.driver.page_source
-
-                # TikTok的播放量可能在JSON数据中
-                patterns = [
-                    r'"playCount["\']?\s*:\s*["\']?(\d+)',
-                    r'"viewCount["\']?\s*:\s*["\']?(\d+)',
-                    r'(\d+(?:\.\d+)?[KMB]?)\s*views?',
-                ]
-
-                for pattern in patterns:
-                    matches = re.findall(pattern, page_source, re.IGNORECASE)
-                    if matches:
-                        views_str = matches[0]
-                        views = self._parse_views_number(views_str)
-                        if views and views > 0:
-                            self._safe_print(f"[TikTok] ✓ 成功: {views:,} views")
-                            return views
+            # 文档中内嵌的数据（TikTok的rehydration/SIGI_STATE、meta等）只用精确策略
+            views, method = self.pipelines[platform].run_ready(body, {})
+            if views is not None:
+                return views, f"network:{method}", None
+            return None, None, detect_unavailable(body) or detect_wall(body)
 
-            except Exception as e:
-                self._safe_print(f"[TikTok] 查找失败: {str(e)}")
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None, None, None
+        views = find_view_count(data, video_id)
+        if views is not None:
+            return views, 'network:api', None
+        return None, None, None
+
+    def set_deadline(self, deadline: Optional[float]):
+        """设置本轮爬取的截止时间（None表示不限制），超过后不再打开新页面"""
+        self.deadline = deadline
+
+    def _delay_for(self, platform: str) -> float:
+        """该平台两次请求之间的间隔（秒）"""
+        if self.rate_controller is not None:
+            return self.rate_controller.delay(platform)
+        return self.delay
+
+    def _record_rate(self, platform: str, views: Optional[int]):
+        """把一次爬取结果交给自适应限速"""
+        if self.rate_controller is not None and self.last_failure not in ('deferred', 'budget', 'unsupported'):
+            self.rate_controller.record(platform, views is not None, self.last_failure)
+
+    def _budget_exhausted(self) -> bool:
+        """本轮时间预算是否已用完"""
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def _network_timeout_for(self, platform: str) -> float:
+        """等待网络响应的超时时间（见 adaptive_network_timeout）"""
+        return adaptive_network_timeout(self.metrics, platform, self.network_timeout, self.deadline)
+
+    def _new_tab_state(self, url: str, platform: str, handle: Optional[str] = None) -> Dict:
+        """一个标签页正在加载的链接的状态"""
+        return {
+            'url': url,
+            'platform': platform,
+            'video_id': video_id_from_url(url),
+            'handle': handle,
+            'responses': {},
+            'deadline': time.time() + self._network_timeout_for(platform),
+            'started': time.perf_counter(),
+            'bytes': 0
+        }
+
+    def _process_network_event(self, tab: Dict, method: str,
+                               params: Dict) -> Optional[Tuple[Optional[int], Optional[str], Optional[str]]]:
+        """
+        处理一个标签页的网络事件
+
+        Returns:
+            找到播放量或确认页面不可用时返回 (播放量, 提取方法, 失败原因)，否则返回None
+        """
+        if method == 'Network.responseReceived':
+            response = params.get('response', {})
+            resource_type = params.get('type')
+            if resource_type == 'Document' or 'json' in response.get('mimeType', ''):
+                tab['responses'][params.get('requestId')] = (resource_type, response.get('url', ''))
+            return None
 
-            self._safe_print(f"[TikTok] ✗ 未找到播放量数据")
+        if method != 'Network.loadingFinished' or params.get('requestId') not in tab['responses']:
             return None
 
-        except Exception as e:
-            self._safe_print(f"[TikTok] ✗ 错误: {str(e)}")
+        resource_type, response_url = tab['responses'].pop(params['requestId'])
+        # 响应正文只能在所属标签页中读取
+        if tab['handle'] is not None and self.driver.current_window_handle != tab['handle']:
+            self.driver.switch_to.window(tab['handle'])
+        body = self._response_body(params['requestId'])
+        if not body:
             return None
+        tab['bytes'] += len(body)
+
+        # 短链接跳转后才知道视频ID
+        if tab['video_id'] is None:
+            tab['video_id'] = video_id_from_url(response_url)
+
+        result = self._extract_response(tab['platform'], tab['video_id'], resource_type, response_url, body)
+        if result[0] is not None or result[2]:
+            return result
+        return None
+
+    def _wait_network_views(self, url: str, platform: str) -> Tuple[Optional[int], Optional[str], Optional[str]]:
+        """
+        监听页面文档和JSON接口响应，直到找到目标视频的播放量或确认页面不可用
+
+        Returns:
+            (播放量, 提取方法, 失败原因)，超时返回 (None, None, None)
+        """
+        tab = self._new_tab_state(url, platform)
 
-    def _parse_views_number(self, views_str: str) -> Optional[int]:
-        """解析播放量字符串为整数"""
         try:
-            views_str = str(views_str).strip().replace(',', '')
-
-            # 处理K/M/B后缀
-            multipliers = {
-                'K': 1000,
-                'M': 1000000,
-                'B': 1000000000,
-                '千': 1000,
-                '万': 10000,
-                '百万': 1000000,
-                '亿': 100000000
-            }
-
-            for suffix, multiplier in multipliers.items():
-                if views_str.upper().endswith(suffix.upper()):
-                    number_str = views_str[:-len(suffix)].strip()
-                    number = float(number_str)
-                    return int(number * multiplier)
-
-            # 直接转换为整数
-            return int(float(views_str))
+            while time.time() < tab['deadline']:
+                for _, method, params in self._read_network_events():
+                    result = self._process_network_event(tab, method, params)
+                    if result is not None:
+                        return result
 
-        except:
+                time.sleep(0.1)
+
+            return None, None, None
+        finally:
+            self._page_bytes += tab['bytes']
+
+    def _stop_loading(self):
+        """已经拿到结果，停止加载页面剩余的资源"""
+        try:
+            self.driver.execute_script('window.stop();')
+        except Exception:
+            pass
+
+    def _wait_ready(self, timeout: float = 10.0):
+        """等待页面加载完成（页面加载策略为 none 时使用）"""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda driver: driver.execute_script('return document.readyState') == 'complete'
+            )
+        except TimeoutException:
+            pass
+
+    def _extract_page(self, page: bytes, platform: str, label: str) -> Optional[int]:
+        """
+        从渲染后的页面源码中提取播放量（不依赖浏览器，离线样本回放也走这里）
+
+        Args:
+            page: 页面源码的UTF-8字节
+            platform: 平台名称
+            label: 日志中显示的平台名
+
+        Returns:
+            播放量（整数），失败返回None并设置 last_failure
+        """
+        views, method = self.pipelines[platform].run(page)
+        if views and views > 0:
+            self._safe_print(f"[{label}] ✓ 通过{method}获取: {views:,} views")
+            self.last_method = method
+            return views
+
+        # 没有播放量时判断是否为已删除/私密视频
+        unavailable = detect_unavailable(page)
+        if unavailable:
+            self._safe_print(f"[{label}] ✗ 视频不可用: {unavailable}")
+            self.last_failure = unavailable
+            return None
+
+        # 登录墙/验证页/限流页单独记录，供熔断器判断平台是否在拦截
+        wall = detect_wall(page)
+        if wall:
+            self._safe_print(f"[{label}] ✗ 遇到拦截页面: {wall}")
+            self.last_failure = wall
             return None
 
+        self._safe_print(f"[{label}] ✗ 未找到播放量数据")
+        self.last_failure = 'no_data'
+        return None
+
+    def scrape_instagram_views(self, url: str) -> Optional[int]:
+        """从Instagram爬取播放量"""
+        return self._scrape_page(url, 'instagram', 'Instagram')
+
+    def scrape_tiktok_views(self, url: str) -> Optional[int]:
+        """从TikTok爬取播放量"""
+        return self._scrape_page(url, 'tiktok', 'TikTok')
+
+    def _parse_views_number(self, views_str: str) -> Optional[int]:
+        """解析播放量字符串为整数（见 extractors.parse_views_number）"""
+        return parse_views_number(views_str)
+
     def scrape_views(self, url: str) -> Optional[int]:
         """自动识别平台并爬取播放量"""
+        self.last_method = None
+        self.last_failure = None
+
         if not url:
             return None
 
         platform = self.identify_platform(url)
+        started = time.perf_counter()
+        self._page_bytes = 0
+
+        if platform != 'unknown' and self._budget_exhausted():
+            self._safe_print(f"[Selenium] ✗ 超出本轮时间预算，跳过: {url}")
+            self.last_failure = 'budget'
+            return None
 
         views = None
         if platform == 'instagram':
@@ -196,13 +614,188 @@ class ViewScraperSelenium:
             views = self.scrape_tiktok_views(url)
         else:
             self._safe_print(f"[Unknown] 不支持的平台: {url}")
+            self.last_failure = 'unsupported'
             return None
 
+        if self.metrics is not None:
+            self.metrics.record(platform, 'browser', time.perf_counter() - started, views,
+                                method=self.last_method, failure=self.last_failure,
+                                bytes_downloaded=self._page_bytes)
+        self._record_rate(platform, views)
+
         # 延迟
-        time.sleep(self.delay)
+        if self.last_failure != 'budget':
+            time.sleep(self._delay_for(platform))
 
         return views
 
+    def _current_target_id(self) -> str:
+        """当前标签页的DevTools目标ID（网络事件中的 webview 字段）"""
+        try:
+            return self.driver.execute_cdp_cmd('Target.getTargetInfo', {})['targetInfo']['targetId']
+        except Exception:
+            return self.driver.current_window_handle.replace('CDwindow-', '')
+
+    def _open_tabs(self, count: int) -> Tuple[List[str], Dict[str, str]]:
+        """
+        启动浏览器（如未启动）并打开标签页
+
+        Args:
+            count: 标签页数
+
+        Returns:
+            (窗口句柄列表, {DevTools目标ID: 窗口句柄})
+        """
+        self._init_driver()
+        handles = [self.driver.current_window_handle]
+        for _ in range(max(1, count) - 1):
+            self.driver.switch_to.new_window('tab')
+            handles.append(self.driver.current_window_handle)
+        targets = {}
+        for handle in handles:
+            self.driver.switch_to.window(handle)
+            targets[self._current_target_id()] = handle
+        self.driver.get_log('performance')
+        return handles, targets
+
+    def scrape_many(self, urls: List[str], tabs: Optional[int] = None, allow=None, **kwargs):
+        """
+        在同一个浏览器的多个标签页中并发爬取，结果完成一个返回一个
+
+        每个标签页异步导航（页面加载策略为 none），按标签页分发网络事件，
+        某个标签页拿到结果或超时后立即加载下一个链接；每次产出结果前设置 last_method / last_failure。
+        浏览器崩溃时重新启动，正在加载的链接重新爬取（同一批中崩溃超过两次时抛出异常）
+
+        Args:
+            urls: 视频链接列表
+            tabs: 标签页数，默认使用初始化时的 tabs
+            allow: 请求前的放行检查（例如熔断器），被拒绝的链接 last_failure 为 'deferred'
+            **kwargs: 与 ViewScraper.scrape_many 兼容的其它参数（忽略）
+
+        Yields:
+            (url, views) - 失败时views为None
+        """
+        tabs = max(1, tabs or self.tabs)
+        if tabs == 1 or not self.capture_network:
+            # 不监听网络事件时 driver.get 会阻塞到页面加载完成，无法并发
+            for url in urls:
+                if (allow is not None and self.identify_platform(url) != 'unknown'
+                        and not self._budget_exhausted() and not allow(url)):
+                    self.last_method, self.last_failure = None, 'deferred'
+                    yield url, None
+                    continue
+                views = self.scrape_views(url)
+                yield url, views
+            return
+
+        queue = list(urls)
+        handles, targets = self._open_tabs(min(tabs, len(queue)))
+
+        active = {}  # {target_id: tab_state}
+        ready_at = {target_id: 0.0 for target_id in targets}
+        crashes = 0
+
+        try:
+            while queue or active:
+                try:
+                    # 空闲的标签页加载下一个链接
+                    for target_id, handle in targets.items():
+                        if target_id in active or not queue or time.time() < ready_at[target_id]:
+                            continue
+                        if self.rate_controller is not None:
+                            # 同一平台同时加载的标签页数不超过限速器允许的并发数
+                            platform = self.identify_platform(queue[0])
+                            loading = sum(1 for tab in active.values() if tab['platform'] == platform)
+                            if platform != 'unknown' and loading >= self.rate_controller.concurrency(platform):
+                                continue
+                        url = queue.pop(0)
+                        platform = self.identify_platform(url)
+                        if platform == 'unknown' or self._budget_exhausted() or (allow is not None and not allow(url)):
+                            self.last_method = None
+                            if platform == 'unknown':
+                                self.last_failure = 'unsupported'
+                            elif self._budget_exhausted():
+                                self.last_failure = 'budget'
+                            else:
+                                self.last_failure = 'deferred'
+                            yield url, None
+                            continue
+                        self.driver.switch_to.window(handle)
+                        self.driver.get(url)
+                        active[target_id] = self._new_tab_state(url, platform, handle)
+                        self._safe_print(f"[Selenium] 标签页 {handles.index(handle) + 1} 开始爬取: {url}")
+
+                    # {target_id: 结果}，结果为None表示超时
+                    finished = {}
+                    for target_id, method, params in self._read_network_events():
+                        tab = active.get(target_id)
+                        if tab is None or target_id in finished:
+                            continue
+                        result = self._process_network_event(tab, method, params)
+                        if result is not None:
+                            finished[target_id] = result
+
+                    # 超时的标签页退回到读取页面源码
+                    for target_id, tab in active.items():
+                        if time.time() >= tab['deadline'] and target_id not in finished:
+                            finished[target_id] = None
+
+                    for target_id, result in finished.items():
+                        tab = active.pop(target_id)
+                        ready_at[target_id] = time.time() + self._delay_for(tab['platform'])
+                        self.last_method = None
+                        self.last_failure = None
+                        self.driver.switch_to.window(tab['handle'])
+                        label = 'Instagram' if tab['platform'] == 'instagram' else 'TikTok'
+
+                        if result is None:
+                            try:
+                                page = self.driver.page_source.encode('utf-8', errors='replace')
+                                tab['bytes'] += len(page)
+                                views = self._extract_page(page, tab['platform'], label)
+                            except Exception as e:
+                                self._safe_print(f"[{label}] ✗ 错误: {str(e)}")
+                                views, self.last_failure = None, 'error'
+                        else:
+                            views, method, failure = result
+                            if views is not None:
+                                self._safe_print(f"[{label}] ✓ 通过{method}获取: {views:,} views")
+                            else:
+                                self._safe_print(f"[{label}] ✗ 页面不可用或被拦截: {failure}")
+                            self.last_method, self.last_failure = method, failure
+
+                        self._stop_loading()
+                        if self.metrics is not None:
+                            self.metrics.record(tab['platform'], 'browser', time.perf_counter() - tab['started'], views,
+                                                method=self.last_method, failure=self.last_failure,
+                                                bytes_downloaded=tab['bytes'])
+                        self._record_rate(tab['platform'], views)
+                        self._page_bytes = tab['bytes']
+                        yield tab['url'], views
+
+                    if not finished:
+                        time.sleep(0.1)
+                except WebDriverException:
+                    if self._driver_alive() or crashes >= 2:
+                        raise
+                    # 浏览器崩溃：重新启动并打开标签页，正在加载的链接放回队列开头重新爬取
+                    crashes += 1
+                    self._safe_print(f"[Selenium] ✗ 浏览器已崩溃，重新启动并重新爬取 {len(active)} 个链接")
+                    queue[:0] = [tab['url'] for tab in active.values()]
+                    active = {}
+                    self._reset_driver()
+                    handles, targets = self._open_tabs(min(tabs, len(queue)))
+                    ready_at = {target_id: 0.0 for target_id in targets}
+        finally:
+            # 关闭多余的标签页，保留第一个供逐个爬取使用
+            try:
+                for handle in handles[1:]:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                self.driver.switch_to.window(handles[0])
+            except Exception:
+                pass
+
 
 # 测试代码
 if __name__ == "__main__":
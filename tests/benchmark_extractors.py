@@ -0,0 +1,148 @@
+"""
+提取策略基准测试
+在离线页面样本上运行 ViewScraper（流式/整页下载）和 ViewScraperSelenium 的解析路径，
+以及每个单独的提取策略，报告准确率、每页CPU时间和内存分配峰值
+
+用法:
+    PYTHONPATH=src python tests/benchmark_extractors.py [--repeat 50] [--json 结果文件]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from extractors import EXTRACTORS
+from view_scraper import ViewScraper
+from view_scraper_selenium import ViewScraperSelenium
+from test_fixture_corpus import load_corpus, replay_http, replay_browser, _check
+
+
+def measure(func, repeat: int):
+    """
+    测量一个调用的CPU时间和内存分配峰值
+
+    Args:
+        func: 无参数的调用
+        repeat: CPU计时的重复次数
+
+    Returns:
+        (最后一次的返回值, 每次CPU毫秒, 分配峰值KB)
+    """
+    # 内存单独测一次，避免 tracemalloc 拖慢计时
+    tracemalloc.start()
+    result = func()
+    peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    started = time.process_time()
+    for _ in range(repeat):
+        result = func()
+    cpu_ms = (time.process_time() - started) * 1000 / repeat
+
+    return result, cpu_ms, peak_kb
+
+
+def benchmark_paths(corpus, repeat: int):
+    """
+    按爬取路径汇总
+
+    Returns:
+        {path: {'correct': int, 'pages': int, 'cpu_ms': float, 'peak_kb': float, 'pages_detail': [...]}}
+    """
+    paths = {
+        'http_stream': (ViewScraper(delay=0, stream=True, chunk_size=16 * 1024), replay_http),
+        'http_full': (ViewScraper(delay=0, stream=False), replay_http),
+        'browser': (ViewScraperSelenium(delay=0), replay_browser),
+    }
+
+    report = {}
+    for path, (scraper, replay) in paths.items():
+        summary = {'correct': 0, 'pages': 0, 'cpu_ms': 0.0, 'peak_kb': 0.0, 'pages_detail': []}
+        for entry in corpus:
+            (views, note), cpu_ms, peak_kb = measure(lambda: replay(scraper, entry), repeat)
+            correct = _check(entry, views, note)
+            summary['pages'] += 1
+            summary['correct'] += int(correct)
+            summary['cpu_ms'] += cpu_ms
+            summary['peak_kb'] = max(summary['peak_kb'], peak_kb)
+            summary['pages_detail'].append({
+                'file': entry['file'], 'result': note, 'correct': correct,
+                'cpu_ms': round(cpu_ms, 4), 'peak_kb': round(peak_kb, 1)
+            })
+        summary['cpu_ms'] /= max(summary['pages'], 1)
+        report[path] = summary
+    return report
+
+
+def benchmark_extractors(corpus, repeat: int):
+    """
+    逐个提取策略在本平台所有样本上运行
+
+    Returns:
+        {'platform:name': {'hits': int, 'correct': int, 'wrong': int, 'pages': int, 'cpu_ms': float, 'peak_kb': float}}
+    """
+    report = {}
+    for platform, extractors in EXTRACTORS.items():
+        pages = [entry for entry in corpus if entry['platform'] == platform]
+        for extractor in extractors:
+            summary = {'hits': 0, 'correct': 0, 'wrong': 0, 'pages': len(pages), 'cpu_ms': 0.0, 'peak_kb': 0.0}
+            for entry in pages:
+                views, cpu_ms, peak_kb = measure(lambda: extractor.func(entry['body']), repeat)
+                summary['cpu_ms'] += cpu_ms
+                summary['peak_kb'] = max(summary['peak_kb'], peak_kb)
+                if views is not None:
+                    summary['hits'] += 1
+                    # 命中了不该有播放量的页面，或数字不对，都算错
+                    if views == entry['views']:
+                        summary['correct'] += 1
+                    else:
+                        summary['wrong'] += 1
+            summary['cpu_ms'] /= max(len(pages), 1)
+            report[f"{platform}:{extractor.name}"] = summary
+    return report
+
+
+def print_report(paths, extractors, corpus):
+    """打印结果表格"""
+    total_bytes = sum(len(entry['body']) for entry in corpus)
+    print("=" * 72)
+    print(f"样本: {len(corpus)} 个页面, 共 {total_bytes / 1024:.0f} KB")
+    print("=" * 72)
+
+    print(f"\n{'路径':<14}{'准确率':>10}{'CPU ms/页':>14}{'峰值KB':>12}")
+    for path, summary in paths.items():
+        accuracy = f"{summary['correct']}/{summary['pages']}"
+        print(f"{path:<14}{accuracy:>10}{summary['cpu_ms']:>14.3f}{summary['peak_kb']:>12.1f}")
+        for page in summary['pages_detail']:
+            if not page['correct']:
+                print(f"  ✗ {page['file']}: {page['result']}")
+
+    print(f"\n{'提取策略':<24}{'命中':>6}{'正确':>6}{'错误':>6}{'CPU ms/页':>14}{'峰值KB':>12}")
+    for name, summary in extractors.items():
+        print(f"{name:<24}{summary['hits']:>6}{summary['correct']:>6}{summary['wrong']:>6}"
+              f"{summary['cpu_ms']:>14.3f}{summary['peak_kb']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提取策略基准测试")
+    parser.add_argument('--repeat', type=int, default=50, help="每个页面CPU计时的重复次数")
+    parser.add_argument('--json', dest='json_file', help="把结果另存为JSON（用于比较两次运行）")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    paths = benchmark_paths(corpus, args.repeat)
+    extractors = benchmark_extractors(corpus, args.repeat)
+    print_report(paths, extractors, corpus)
+
+    if args.json_file:
+        with open(args.json_file, 'w', encoding='utf-8') as f:
+            json.dump({'paths': paths, 'extractors': extractors}, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {args.json_file}")
+
+    # 任何路径出现错误结果时以非零状态退出，便于在CI中使用
+    return 0 if all(summary['correct'] == summary['pages'] for summary in paths.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
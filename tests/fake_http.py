@@ -0,0 +1,46 @@
+"""
+测试用的假HTTP会话
+代替 requests.Session 按链接返回固定的页面，响应支持流式读取（iter_content），
+ViewScraper 的流式提前停止、轻量端点和并发下载都可以离线测试
+"""
+
+import threading
+
+
+class FakeResponse:
+    """把页面字节伪装成 requests 的流式响应"""
+
+    def __init__(self, url, status_code, body):
+        self.url = url
+        self.status_code = status_code
+        self.content = body
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """按链接返回固定页面的会话，记录请求过的链接和超时（线程安全）"""
+
+    def __init__(self, pages=None, default=(404, b'')):
+        """
+        Args:
+            pages: {url: (状态码, 页面字节)}
+            default: 不在 pages 中的链接返回的 (状态码, 页面字节)
+        """
+        self.pages = pages or {}
+        self.default = default
+        self.requested = []
+        self.timeouts = []
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None, **kwargs):
+        with self._lock:
+            self.requested.append(url)
+            self.timeouts.append(timeout)
+        status_code, body = self.pages.get(url, self.default)
+        return FakeResponse(url, status_code, body)
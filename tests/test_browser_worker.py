@@ -0,0 +1,121 @@
+"""
+测试受监督的浏览器子进程
+验证浏览器打开的页面数超过阈值时主动重启，子进程崩溃或卡住时重启并重新爬取正在爬取的链接
+"""
+
+import os
+import tempfile
+import time
+
+from browser_worker import SupervisedBrowser
+
+
+class FakeBrowser:
+    """在子进程中运行的假浏览器：播放量返回子进程的PID，链接中带 crash/hang 时第一次崩溃或卡住"""
+
+    def __init__(self, marker_dir=None, tabs=1, **kwargs):
+        self.marker_dir = marker_dir
+        self.tabs = tabs
+        self.network_timeout = None
+        self.last_method = None
+        self.last_failure = None
+        self._page_bytes = 0
+
+    def set_deadline(self, deadline):
+        pass
+
+    def prelaunch(self):
+        pass
+
+    def close(self):
+        pass
+
+    def export_session(self, platform):
+        return {'cookies': [], 'user_agent': 'Chrome'}
+
+    def scrape_views(self, url):
+        for action in ('crash', 'hang'):
+            marker = os.path.join(self.marker_dir, action)
+            if action in url and not os.path.exists(marker):
+                open(marker, 'w').close()
+                if action == 'crash':
+                    os._exit(1)
+                time.sleep(60)
+        self.last_method = 'meta'
+        self.last_failure = None
+        self._page_bytes = 100
+        return os.getpid()
+
+    def scrape_many(self, urls):
+        # 记录收到的批次大小和标签页数
+        open(os.path.join(self.marker_dir, f"batch_{len(urls)}_tabs_{self.tabs}"), 'w').close()
+        for url in urls:
+            yield url, self.scrape_views(url)
+
+
+def test_supervised_restarts():
+    """测试按页面数主动重启、崩溃和卡住后重新分发"""
+
+    print("=" * 60)
+    print("测试受监督的浏览器子进程")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        browser = SupervisedBrowser(workers=1, delay=0, profile_dir=None, max_pages=2, task_timeout=3,
+                                    scraper_factory=FakeBrowser, marker_dir=tmp)
+        try:
+            urls = [f"https://www.tiktok.com/@a/video/{idx}" for idx in range(3)]
+            pids = dict(browser.scrape_many(urls))
+            assert pids[urls[0]] == pids[urls[1]] != pids[urls[2]]
+            assert browser.restarts['pages'] == 1
+            print("✅ 打开的页面数达到阈值后主动重启浏览器")
+
+            assert browser.scrape_views("https://www.tiktok.com/@a/video/crash") is not None
+            assert browser.restarts['crash'] == 1 and browser.last_failure is None
+            print("✅ 子进程崩溃后重启，正在爬取的链接重新爬取成功")
+
+            assert browser.scrape_views("https://www.tiktok.com/@a/video/hang") is not None
+            assert browser.restarts['hang'] == 1
+            print("✅ 子进程卡住超过 task_timeout 后重启并重新爬取")
+
+            assert browser.scrape_views("https://example.com/x") is None
+            assert browser.last_failure == 'unsupported'
+        finally:
+            browser.close()
+
+
+
+def test_multi_tab_workers():
+    """测试子进程保留标签页数，每次分发一批链接（每个标签页一个）"""
+
+    browser = SupervisedBrowser(workers=2, tabs=3, profile_dir='./data/chrome_profile')
+    assert browser._worker_kwargs(0)['tabs'] == 3
+    assert browser._worker_kwargs(1)['tabs'] == 3
+    assert browser._worker_kwargs(1)['profile_dir'] == './data/chrome_profile_1'
+    print("✅ 子进程的爬取器参数保留标签页数")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        browser = SupervisedBrowser(workers=1, tabs=2, delay=0, profile_dir=None, max_pages=4, task_timeout=5,
+                                    scraper_factory=FakeBrowser, marker_dir=tmp)
+        try:
+            urls = [f"https://www.tiktok.com/@a/video/{idx}" for idx in range(5)]
+            pids = dict(browser.scrape_many(urls))
+            assert sorted(pids) == sorted(urls)
+            assert os.path.exists(os.path.join(tmp, 'batch_2_tabs_2'))
+            assert pids[urls[0]] == pids[urls[1]] == pids[urls[2]] == pids[urls[3]] != pids[urls[4]]
+            assert browser.restarts['pages'] == 1
+            print("✅ 每个子进程一次爬取一批链接（多个标签页），页面数达到阈值后在两批之间重启")
+
+            # 崩溃时这一批中还没有结果的链接都重新爬取
+            pids = dict(browser.scrape_many(["https://www.tiktok.com/@a/video/crash",
+                                             "https://www.tiktok.com/@a/video/9"]))
+            assert all(views is not None for views in pids.values()) and len(pids) == 2
+            assert browser.restarts['crash'] == 1
+            print("✅ 子进程崩溃后整批未完成的链接重新爬取")
+        finally:
+            browser.close()
+
+
+if __name__ == "__main__":
+    test_supervised_restarts()
+    test_multi_tab_workers()
@@ -0,0 +1,98 @@
+"""
+测试按平台熔断
+验证连续拦截后熔断、冷却后半开探测，以及被熔断平台的链接推迟到最后
+"""
+
+from circuit_breaker import CircuitBreaker
+from url_canonical import URLCanonicalizer
+from notion_integration import NotionIntegration
+
+
+def test_breaker_states():
+    """测试熔断、半开探测和恢复"""
+
+    print("=" * 60)
+    print("测试熔断器状态")
+    print("=" * 60)
+
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=60, max_cooldown_seconds=100)
+
+    # 视频级失败不计入
+    for _ in range(5):
+        breaker.record('instagram', False, 'not_found', now=0)
+    assert breaker.allow('instagram', now=0)
+
+    for _ in range(3):
+        breaker.record('instagram', False, 'login_wall', now=0)
+    assert not breaker.allow('instagram', now=30)
+    assert breaker.allow('tiktok', now=30)
+    assert breaker.retry_after('instagram', now=30) == 30
+    print("✅ 连续3次登录墙后熔断，其它平台不受影响")
+
+    # 冷却结束只放行一个探测请求
+    assert breaker.allow('instagram', now=60)
+    assert not breaker.allow('instagram', now=60)
+
+    # 探测失败，冷却翻倍（不超过上限）
+    breaker.record('instagram', False, 'rate_limited', now=60)
+    assert breaker.retry_after('instagram', now=60) == 100
+    print("✅ 探测失败后继续熔断并延长冷却")
+
+    assert breaker.allow('instagram', now=160)
+    breaker.record('instagram', True, now=160)
+    assert breaker.allow('instagram', now=160)
+    assert breaker.snapshot()['instagram']['trips'] == 2
+    print("✅ 探测成功后恢复")
+
+
+class BlockedScraper:
+    """Instagram一直返回登录墙，TikTok正常的假爬取器"""
+
+    def __init__(self):
+        self.calls = []
+        self.last_failure = None
+
+    def scrape_views(self, url):
+        self.calls.append(url)
+        if 'instagram' in url:
+            self.last_failure = 'login_wall'
+            return None
+        self.last_failure = None
+        return 100
+
+
+def test_deferred_links():
+    """测试被熔断平台的链接被推迟，含有这些链接的行不写回"""
+
+    print("=" * 60)
+    print("测试推迟被拦截的平台")
+    print("=" * 60)
+
+    notion = NotionIntegration("test-token")
+    written = {}
+    notion.update_page_views = lambda page_id, field, views: written.__setitem__(page_id, views)
+
+    videos = [
+        {'id': f'ig{i}', 'name': f'ig{i}', 'creator_id': 'c1', 'views_field': 'Views',
+         'links': [f"https://www.instagram.com/p/CODE{i}/"]}
+        for i in range(5)
+    ]
+    videos.append({'id': 'mixed', 'name': 'mixed', 'creator_id': 'c1', 'views_field': 'Views',
+                   'links': ["https://www.instagram.com/p/CODE4/", "https://www.tiktok.com/@a/video/1"]})
+    videos.append({'id': 'tt', 'name': 'tt', 'creator_id': 'c1', 'views_field': 'Views',
+                   'links': ["https://www.tiktok.com/@a/video/2"]})
+
+    scraper = BlockedScraper()
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=3600)
+    results = notion.update_videos(videos, scraper, URLCanonicalizer(cache_file=None), breaker=breaker)
+
+    instagram_calls = [url for url in scraper.calls if 'instagram' in url]
+    assert len(instagram_calls) == 2
+    assert written == {'tt': 100}
+    assert sum('平台拦截' in error for error in results['c1']['errors']) == 4
+    print(f"✅ Instagram只请求 {len(instagram_calls)} 次，TikTok正常写回，部分被拦截的行不写入偏小的总数")
+
+
+if __name__ == "__main__":
+    test_breaker_states()
+    test_deferred_links()
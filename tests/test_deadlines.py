@@ -0,0 +1,157 @@
+"""
+测试爬取的尾延迟控制
+验证按p95自适应的超时、慢请求的备份请求，以及时间预算用完后剩余链接留到下次运行
+"""
+
+import time
+
+from notion_integration import NotionIntegration
+from scrape_metrics import ScrapeMetrics
+from url_canonical import URLCanonicalizer
+from view_scraper import ViewScraper
+
+try:
+    from .fake_http import FakeSession
+except ImportError:
+    from fake_http import FakeSession
+
+
+PAGE = b'<meta property="og:description" content="1,234 views, 5 likes">'
+
+
+class SlowFirstSession(FakeSession):
+    """第一次请求很慢，之后的请求很快"""
+
+    def __init__(self, slow_seconds):
+        super().__init__(default=(200, PAGE))
+        self.slow_seconds = slow_seconds
+        self._slowed = False
+
+    @property
+    def calls(self):
+        return len(self.requested)
+
+    def get(self, url, timeout=None, **kwargs):
+        with self._lock:
+            first, self._slowed = not self._slowed, True
+        response = super().get(url, timeout=timeout, **kwargs)
+        if first:
+            time.sleep(self.slow_seconds)
+        return response
+
+
+def _warm_metrics(seconds, count=20):
+    metrics = ScrapeMetrics()
+    for _ in range(count):
+        metrics.record('instagram', 'http', seconds, 1, method='meta')
+    return metrics
+
+
+def test_adaptive_timeout():
+    """测试超时按p95自适应，并受截止时间限制"""
+
+    print("=" * 60)
+    print("测试自适应超时")
+    print("=" * 60)
+
+    scraper = ViewScraper(delay=0, metrics=ScrapeMetrics(), timeout=15.0, min_timeout=3.0)
+    assert scraper._timeout_for('instagram') == 15.0
+    print("✅ 样本不足时使用默认超时")
+
+    scraper.metrics = _warm_metrics(2.5)
+    assert scraper._timeout_for('instagram') == 5.0
+    scraper.metrics = _warm_metrics(0.2)
+    assert scraper._timeout_for('instagram') == 3.0
+    scraper.metrics = _warm_metrics(30.0)
+    assert scraper._timeout_for('instagram') == 15.0
+    print("✅ p95 × 2，限制在 [min_timeout, timeout] 之间")
+
+    scraper.set_deadline(time.time() + 1.0)
+    assert 0 < scraper._timeout_for('instagram') <= 1.0
+
+    scraper.set_deadline(time.time() - 1.0)
+    scraper.session = SlowFirstSession(0)
+    assert scraper.scrape_views("https://www.instagram.com/p/A/") is None
+    assert scraper.last_failure == 'budget' and scraper.session.calls == 0
+    print("✅ 截止时间之后不再发请求")
+
+
+def test_hedged_request():
+    """测试第一个请求超过p95时发出备份请求，并使用先完成的结果"""
+
+    print("=" * 60)
+    print("测试备份请求")
+    print("=" * 60)
+
+    scraper = ViewScraper(delay=0, metrics=_warm_metrics(0.05), min_timeout=0.5, hedge=True)
+    scraper.session = SlowFirstSession(1.0)
+
+    started = time.perf_counter()
+    assert scraper.scrape_views("https://www.instagram.com/p/A/") == 1234
+    assert time.perf_counter() - started < 0.8
+    assert scraper.last_method == 'meta'
+    assert scraper.hedges_fired == 1 and scraper.hedges_won == 1
+    print("✅ 备份请求先完成，不必等待慢请求")
+
+    assert scraper.scrape_views("https://www.instagram.com/p/A/") == 1234
+    assert scraper.hedges_fired == 1
+    print("✅ 正常速度的请求不发备份")
+
+    # 备份请求的超时不超过距截止时间的剩余秒数
+    scraper.session = SlowFirstSession(1.0)
+    scraper.set_deadline(time.time() + 0.3)
+    assert scraper.scrape_views("https://www.instagram.com/p/A/") == 1234
+    assert scraper.hedges_fired == 2 and scraper.session.timeouts[1] <= 0.3
+    scraper.set_deadline(None)
+    print("✅ 备份请求不超过截止时间")
+
+    pool = scraper._hedge_pool
+    scraper.close()
+    assert scraper._hedge_pool is None and pool._shutdown
+    print("✅ close() 关闭备份请求的线程池")
+
+
+class SlowScraper:
+    """每次爬取耗时固定的假爬取器"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = []
+        self.last_failure = None
+
+    def scrape_views(self, url):
+        self.calls.append(url)
+        time.sleep(self.seconds)
+        return 100
+
+
+def test_run_budget():
+    """测试时间预算用完后剩余的行不写回"""
+
+    print("=" * 60)
+    print("测试时间预算")
+    print("=" * 60)
+
+    notion = NotionIntegration("test-token")
+    written = {}
+    notion.update_page_views = lambda page_id, field, views: written.__setitem__(page_id, views)
+
+    videos = [
+        {'id': f'tt{i}', 'name': f'tt{i}', 'creator_id': 'c1', 'views_field': 'Views',
+         'links': [f"https://www.tiktok.com/@a/video/{i}"]}
+        for i in range(5)
+    ]
+
+    scraper = SlowScraper(0.3)
+    results = notion.update_videos(videos, scraper, URLCanonicalizer(cache_file=None), run_budget=0.45)
+
+    assert len(scraper.calls) == 2
+    assert written == {'tt0': 100, 'tt1': 100}
+    assert sum('超出时间预算' in error for error in results['c1']['errors']) == 3
+    print("✅ 预算内的链接写回，剩余的留到下次运行")
+
+
+if __name__ == "__main__":
+    test_adaptive_timeout()
+    test_hedged_request()
+    test_run_budget()
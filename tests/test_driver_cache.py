@@ -0,0 +1,45 @@
+"""
+测试chromedriver路径缓存
+验证有效期内和离线模式下直接使用缓存，不访问网络
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from view_scraper_selenium import resolve_driver_path
+
+
+def test_resolve_driver_path():
+    """测试缓存命中、离线模式和缓存路径失效"""
+
+    print("=" * 60)
+    print("测试chromedriver路径缓存")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, 'chromedriver.json')
+        driver = os.path.join(tmp, 'chromedriver')
+        open(driver, 'w').close()
+
+        # 没有缓存的离线模式交给Selenium自己查找
+        assert resolve_driver_path(cache_file, offline=True) is None
+
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'path': driver, 'resolved_at': time.time()}, f)
+        assert resolve_driver_path(cache_file) == driver
+        print("✅ 有效期内直接使用缓存")
+
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'path': driver, 'resolved_at': 0}, f)
+        assert resolve_driver_path(cache_file, offline=True) == driver
+        print("✅ 离线模式使用过期的缓存")
+
+        os.remove(driver)
+        assert resolve_driver_path(cache_file, offline=True) is None
+        print("✅ 缓存的驱动已被删除时不再使用")
+
+
+if __name__ == "__main__":
+    test_resolve_driver_path()
@@ -0,0 +1,104 @@
+"""
+测试轻量端点
+验证先试嵌入页/JSON接口，没有结果时才下载完整页面，并且持续失败的端点会被暂停
+"""
+
+import json
+
+from endpoints import EndpointStrategy
+from view_scraper import ViewScraper
+
+try:
+    from .fake_http import FakeSession
+except ImportError:
+    from fake_http import FakeSession
+
+
+PAGE_URL = "https://www.tiktok.com/@a/video/7301"
+EMBED_URL = "https://www.tiktok.com/embed/v2/7301"
+DETAIL_URL = "https://www.tiktok.com/api/item/detail/?itemId=7301"
+
+EMBED = b'<script>{"itemInfos":{"id":"7301","playCount":555}}</script>'
+DETAIL = json.dumps({'itemInfo': {'itemStruct': {'id': '7301', 'stats': {'playCount': 666}}}}).encode()
+PAGE = b'<script id="SIGI_STATE">' + json.dumps(
+    {'ItemModule': {'7301': {'stats': {'playCount': 777}}}}).encode() + b'</script>' + b' ' * 50000
+
+
+def test_endpoints():
+    """测试轻量端点优先、回退到完整页面以及暂停持续失败的端点"""
+
+    print("=" * 60)
+    print("测试轻量端点")
+    print("=" * 60)
+
+    strategy = EndpointStrategy(state_file=None, min_samples=2, min_success_rate=0.3,
+                                reprobe_interval=3)
+    scraper = ViewScraper(delay=0, endpoints=strategy)
+
+    scraper.session = FakeSession({EMBED_URL: (200, EMBED), PAGE_URL: (200, PAGE)})
+    assert scraper.scrape_views(PAGE_URL) == 555
+    assert scraper.last_method.startswith('embed:')
+    assert scraper.session.requested == [EMBED_URL]
+    print("✅ 嵌入页有结果时不下载完整页面")
+
+    # 嵌入页失败时试JSON接口，仍失败才下载完整页面
+    scraper.session = FakeSession({DETAIL_URL: (200, DETAIL), PAGE_URL: (200, PAGE)})
+    assert scraper.scrape_views(PAGE_URL) == 666
+    assert scraper.last_method == 'detail_json:api'
+    scraper.session = FakeSession({PAGE_URL: (200, PAGE)})
+    assert scraper.scrape_views(PAGE_URL) == 777
+    # 上一次JSON接口成功、嵌入页失败，这次JSON接口排在前面
+    assert scraper.session.requested == [DETAIL_URL, EMBED_URL, PAGE_URL]
+    print("✅ 依次回退到JSON接口和完整页面")
+
+    # 嵌入页成功1次失败2次，JSON接口成功1次失败1次：JSON接口排在前面
+    assert [name for name, _, _ in strategy.candidates(PAGE_URL, 'tiktok')] == ['detail_json', 'embed']
+
+    # 失败次数足够后暂停，跳过 reprobe_interval 次后重新试探
+    strategy.record('tiktok', 'embed', False)
+    strategy.record('tiktok', 'detail_json', False)
+    strategy.record('tiktok', 'detail_json', False)
+    assert strategy.candidates(PAGE_URL, 'tiktok') == []
+    assert strategy.candidates(PAGE_URL, 'tiktok') == []
+    assert len(strategy.candidates(PAGE_URL, 'tiktok')) == 2
+    print("✅ 按成功率排序，持续失败的端点暂停并定期重新试探")
+
+    # 没有视频ID的短链接直接下载页面
+    assert strategy.candidates("https://vm.tiktok.com/ZMabc/", 'tiktok') == []
+
+    # 短暂故障后恢复：累计失败很多，重新试探成功一次就恢复使用
+    strategy = EndpointStrategy(state_file=None, reprobe_interval=3)
+    strategy.stats['tiktok:embed'] = {'success': 0, 'fail': 500, 'skipped': 0}
+    assert [name for name, _, _ in strategy.candidates(PAGE_URL, 'tiktok')] == ['detail_json']
+    assert [name for name, _, _ in strategy.candidates(PAGE_URL, 'tiktok')] == ['detail_json']
+    assert 'embed' in [name for name, _, _ in strategy.candidates(PAGE_URL, 'tiktok')]
+    strategy.record('tiktok', 'embed', True)
+    assert 'embed' in [name for name, _, _ in strategy.candidates(PAGE_URL, 'tiktok')]
+    print("✅ 成功率按最近的结果计算，端点恢复后重新试探成功即恢复使用")
+
+
+
+def test_endpoint_pipeline():
+    """测试端点正文使用单独的流水线：不影响完整页面的命中率统计，也不执行兜底策略"""
+
+    scraper = ViewScraper(delay=0, endpoints=EndpointStrategy(state_file=None))
+
+    # 嵌入页只有推荐视频的计数：兜底策略会取到 999，应该回退到完整页面
+    related = b'<div>{"related":{"id":"9999","playCount":999}}</div>'
+    scraper.session = FakeSession({EMBED_URL: (200, related), PAGE_URL: (200, PAGE)})
+    assert scraper.scrape_views(PAGE_URL) == 777
+    assert scraper.last_method == 'sigi_state'
+    print("✅ 嵌入页中其他视频的数字不会被兜底策略取到")
+
+    scraper.session = FakeSession({EMBED_URL: (200, EMBED)})
+    assert scraper.scrape_views(PAGE_URL) == 555 and scraper.last_method == 'embed:embedded_json'
+    assert all(stat['attempts'] == 0 for name, stat in scraper.pipelines['tiktok'].stats.items()
+               if name != 'sigi_state')
+    assert scraper.pipelines['tiktok'].stats['sigi_state']['attempts'] >= 1
+    assert all(not extractor.fallback for extractor in scraper.endpoint_pipelines['tiktok'].extractors)
+    print("✅ 端点命中不计入完整页面流水线的命中率")
+
+
+if __name__ == "__main__":
+    test_endpoints()
+    test_endpoint_pipeline()
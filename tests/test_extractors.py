@@ -0,0 +1,69 @@
+"""
+测试提取策略流水线
+验证共享的数字解析，以及流水线按命中率重新排序
+"""
+
+from extractors import Extractor, ExtractorPipeline, parse_views_number
+
+
+def test_parse_views_number():
+    """测试播放量数字解析"""
+
+    cases = {
+        "1,234,567": 1234567,
+        "1.2M": 1200000,
+        "1.2k": 1200,
+        "1.2B": 1200000000,
+        "1.2万": 12000,
+        "3百万": 3000000,
+        "2亿": 200000000,
+        "abc": None,
+        "": None,
+    }
+    for text, expected in cases.items():
+        assert parse_views_number(text) == expected, f"{text} -> {parse_views_number(text)}"
+    print("✅ 数字解析")
+
+
+def test_pipeline_reorders_by_hit_rate():
+    """测试流水线按命中率重新排序，兜底策略始终最后"""
+
+    calls = []
+
+    def never(body):
+        calls.append('never')
+        return None
+
+    def always(body):
+        calls.append('always')
+        return 42
+
+    def fallback(body):
+        calls.append('fallback')
+        return 1
+
+    pipeline = ExtractorPipeline('test', [
+        Extractor('never', never, cost=1),
+        Extractor('always', always, cost=2),
+        Extractor('fallback', fallback, cost=0.1, fallback=True),
+    ])
+
+    # 一开始按预估成本，便宜的先执行
+    assert [e.name for e in pipeline.ordered()] == ['never', 'always', 'fallback']
+
+    for _ in range(5):
+        assert pipeline.run(b'') == (42, 'always')
+
+    # 总是失败的策略被排到后面，兜底策略仍在最后
+    assert [e.name for e in pipeline.ordered()] == ['always', 'never', 'fallback']
+    assert 'fallback' not in calls
+
+    calls.clear()
+    pipeline.run(b'')
+    assert calls == ['always']
+    print("✅ 命中率高的策略先执行，兜底策略只在需要时执行")
+
+
+if __name__ == "__main__":
+    test_parse_views_number()
+    test_pipeline_reorders_by_hit_rate()
@@ -0,0 +1,131 @@
+"""
+离线页面样本回归测试
+用 tests/fixtures/pages 中保存的各种页面结构回放HTTP和浏览器两条爬取路径，
+不访问真实网站也能发现提取策略的回归
+"""
+
+import contextlib
+import io
+import json
+import os
+
+from view_scraper import ViewScraper
+from view_scraper_selenium import ViewScraperSelenium
+
+try:
+    from .fake_http import FakeSession
+except ImportError:
+    from fake_http import FakeSession
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+
+URLS = {
+    'instagram': "https://www.instagram.com/reel/FIXTURE/",
+    'tiktok': "https://www.tiktok.com/@creator/video/1",
+}
+
+LABELS = {'instagram': 'Instagram', 'tiktok': 'TikTok'}
+
+
+def load_corpus():
+    """
+    读取样本清单和页面字节
+
+    Returns:
+        [{'file', 'platform', 'layout', 'views', 'failure', 'body': bytes}, ...]
+    """
+    with open(os.path.join(FIXTURE_DIR, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    for entry in manifest:
+        with open(os.path.join(FIXTURE_DIR, entry['file']), 'rb') as f:
+            entry['body'] = f.read()
+    return manifest
+
+
+def replay_http(scraper: ViewScraper, entry):
+    """
+    用样本页面回放 ViewScraper 的HTTP路径（包括流式提前停止）
+
+    Returns:
+        (播放量, 提取方法或失败原因)
+    """
+    # 每次请求都返回同一份样本页面
+    scraper.session = FakeSession(default=(200, entry['body']))
+    scraper.last_method = None
+    scraper.last_failure = None
+    platform = entry['platform']
+    with contextlib.redirect_stdout(io.StringIO()):
+        views = scraper._scrape_http(URLS[platform], platform, LABELS[platform])
+    return views, scraper.last_method if views is not None else scraper.last_failure
+
+
+def replay_browser(scraper: ViewScraperSelenium, entry):
+    """
+    用样本页面回放 ViewScraperSelenium 的源码解析路径（不启动浏览器）
+
+    Returns:
+        (播放量, 提取方法或失败原因)
+    """
+    scraper.last_method = None
+    scraper.last_failure = None
+    platform = entry['platform']
+    with contextlib.redirect_stdout(io.StringIO()):
+        views = scraper._extract_page(entry['body'], platform, LABELS[platform])
+    return views, scraper.last_method if views is not None else scraper.last_failure
+
+
+def _check(entry, views, note):
+    """结果与样本清单一致"""
+    if entry['views'] is not None:
+        return views == entry['views']
+    return views is None and note == entry['failure']
+
+
+def test_fixture_corpus():
+    """测试所有样本在两条路径上都得到预期的播放量或失败原因"""
+
+    print("=" * 60)
+    print("测试离线页面样本")
+    print("=" * 60)
+
+    corpus = load_corpus()
+    http_scraper = ViewScraper(delay=0, chunk_size=8 * 1024)
+    full_scraper = ViewScraper(delay=0, stream=False)
+    browser_scraper = ViewScraperSelenium(delay=0)
+
+    for entry in corpus:
+        http_result = replay_http(http_scraper, entry)
+        full_result = replay_http(full_scraper, entry)
+        browser_result = replay_browser(browser_scraper, entry)
+        assert _check(entry, *http_result), f"HTTP {entry['file']}: {http_result}"
+        assert _check(entry, *full_result), f"HTTP整页 {entry['file']}: {full_result}"
+        assert _check(entry, *browser_result), f"浏览器 {entry['file']}: {browser_result}"
+        print(f"✅ {entry['file']}: HTTP={http_result} 浏览器={browser_result}")
+
+
+
+def test_streaming_later_fragment():
+    """测试流式下载：前面的片段没有命中时，后面到达的同类片段仍然会被提取，结果与整页下载相同"""
+
+    unrelated = b'<script type="application/ld+json">{"@type": "Organization", "name": "x"}</script>'
+    watch = (b'<script type="application/ld+json">{"@type": "VideoObject", "interactionStatistic": '
+             b'[{"@type": "InteractionCounter", "interactionType": "http://schema.org/WatchAction", '
+             b'"userInteractionCount": 98765}]}</script>')
+    entry = {'platform': 'instagram',
+             'body': b'<html><head>' + unrelated + b' ' * 20000 + watch + b'</head><body></body></html>'}
+
+    for scraper in (ViewScraper(delay=0, chunk_size=1024), ViewScraper(delay=0, stream=False)):
+        assert replay_http(scraper, entry) == (98765, 'json_ld'), replay_http(scraper, entry)
+    print("✅ 第一个 ld+json 块无关时，后面块中的 WatchAction 仍然被提取")
+
+    # 拦截标志被分在两块之间
+    wall = {'platform': 'instagram', 'body': b' ' * 1020 + b'<title>Login \xe2\x80\xa2 Instagram</title>'}
+    assert replay_http(ViewScraper(delay=0, chunk_size=1024), wall) == (None, 'login_wall')
+    print("✅ 流式扫描拦截标志只扫描新到达的字节，跨块的标志也能识别")
+
+
+if __name__ == "__main__":
+    test_fixture_corpus()
+    test_streaming_later_fragment()
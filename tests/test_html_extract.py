@@ -0,0 +1,53 @@
+"""
+测试HTML片段定位
+验证不构建整棵HTML树也能取到meta、ld+json和TikTok脚本数据
+"""
+
+import json
+
+from html_extract import find_meta_content, find_ld_json, find_script_json, visible_text
+
+
+def test_html_extract():
+    """测试片段定位函数"""
+
+    print("=" * 60)
+    print("测试HTML片段定位")
+    print("=" * 60)
+
+    rehydration = {'__DEFAULT_SCOPE__': {'webapp.video-detail': {
+        'itemInfo': {'itemStruct': {'stats': {'playCount': 12345}}}}}}
+    page = (
+        '<html><head>'
+        '<meta content="1,234 likes &amp; 5.6K views" property="og:description">'
+        '<meta name="description" content="other">'
+        '<script type="application/ld+json">{"interactionStatistic": []}</script>'
+        '<script type="application/ld+json">not json</script>'
+        '<script nonce="x" id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+        + json.dumps(rehydration) +
+        '</script>'
+        '<style>.a{}</style>'
+        '</head><body><div>987 views</div><script>var a = "1 views";</script></body></html>'
+    ).encode('utf-8')
+
+    assert find_meta_content(page, 'og:description') == "1,234 likes & 5.6K views"
+    assert find_meta_content(page, 'description') == "other"
+    assert find_meta_content(page, 'og:title') is None
+    print("✅ meta标签（属性顺序不限，自动反转义）")
+
+    assert find_ld_json(page) == [{'interactionStatistic': []}]
+    print("✅ ld+json（跳过无法解析的脚本）")
+
+    data = find_script_json(page, '__UNIVERSAL_DATA_FOR_REHYDRATION__')
+    assert data['__DEFAULT_SCOPE__']['webapp.video-detail']['itemInfo']['itemStruct']['stats']['playCount'] == 12345
+    assert find_script_json(page, 'SIGI_STATE') is None
+    print("✅ rehydration/SIGI_STATE脚本")
+
+    text = visible_text(page)
+    assert '987 views' in text
+    assert '1 views' not in text and '.a{}' not in text
+    print("✅ 可见文本不含脚本和样式")
+
+
+if __name__ == "__main__":
+    test_html_extract()
@@ -0,0 +1,63 @@
+"""
+测试从网络响应中读取播放量
+验证只接受目标视频的计数，推荐列表中其他视频的数字不会被误用
+"""
+
+import json
+
+from extractors import find_view_count
+from url_canonical import video_id_from_url
+from view_scraper_selenium import ViewScraperSelenium
+
+
+def test_find_view_count():
+    """测试在接口JSON中按视频ID查找播放量"""
+
+    print("=" * 60)
+    print("测试接口JSON播放量查找")
+    print("=" * 60)
+
+    tiktok = {'itemList': [
+        {'id': '111', 'stats': {'playCount': 999999}},
+        {'id': '7301', 'stats': {'playCount': 0}, 'statsV2': {'playCount': '4321'}},
+    ]}
+    assert find_view_count(tiktok, '7301') == 4321
+    assert find_view_count(tiktok, '222') is None
+    assert find_view_count(tiktok, None) is None
+    print("✅ TikTok: 只取目标视频（支持字符串形式的statsV2）")
+
+    instagram = {'data': {'xdt_shortcode_media': {'shortcode': 'C3xYz', 'video_view_count': 31415,
+                                                  'edge_related': [{'shortcode': 'ZZZ', 'video_view_count': 5}]}}}
+    assert find_view_count(instagram, 'C3xYz') == 31415
+    print("✅ Instagram: 按短码匹配")
+
+    assert video_id_from_url("https://www.tiktok.com/@a/video/7301?lang=en") == '7301'
+    assert video_id_from_url("https://www.instagram.com/reel/C3xYz/?igsh=1") == 'C3xYz'
+    assert video_id_from_url("https://vm.tiktok.com/ZMabc/") is None
+    print("✅ 从链接中提取视频ID")
+
+
+def test_extract_response():
+    """测试文档响应和接口响应的处理"""
+
+    scraper = ViewScraperSelenium(delay=0)
+
+    document = b'<script id="SIGI_STATE">' + json.dumps(
+        {'ItemModule': {'7301': {'stats': {'playCount': 777}}}}).encode() + b'</script>'
+    assert scraper._extract_response('tiktok', '7301', 'Document', 'https://www.tiktok.com/@a/video/7301',
+                                     document) == (777, 'network:sigi_state', None)
+
+    login = scraper._extract_response('instagram', 'C3xYz', 'Document',
+                                      'https://www.instagram.com/accounts/login/?next=/p/C3xYz/', b'')
+    assert login == (None, None, 'login_wall')
+
+    api = json.dumps({'data': {'xdt_shortcode_media': {'shortcode': 'C3xYz', 'video_view_count': 42}}}).encode()
+    assert scraper._extract_response('instagram', 'C3xYz', 'XHR', 'https://www.instagram.com/graphql/query',
+                                     api) == (42, 'network:api', None)
+    assert scraper._extract_response('instagram', 'C3xYz', 'XHR', 'https://x', b'not json') == (None, None, None)
+    print("✅ 文档/登录跳转/接口响应")
+
+
+if __name__ == "__main__":
+    test_find_view_count()
+    test_extract_response()
@@ -0,0 +1,118 @@
+"""
+测试并发下载 + 多进程解析
+验证 scrape_many 的结果与逐个爬取一致，并且在产出结果时设置 last_method / last_failure
+"""
+
+import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import view_scraper
+from view_scraper import ViewScraper
+
+try:
+    from .fake_http import FakeSession
+except ImportError:
+    from fake_http import FakeSession
+
+
+PAGES = {
+    "https://www.instagram.com/p/A/": (200, b'<meta property="og:description" content="1,234 views, 5 likes">'),
+    "https://www.tiktok.com/@a/video/1": (200, b'<script id="SIGI_STATE">' + json.dumps(
+        {'ItemModule': {'1': {'stats': {'playCount': 777}}}}).encode() + b'</script>'),
+    "https://www.instagram.com/p/B/": (200, b'<title>Login \xe2\x80\xa2 Instagram</title>'),
+    "https://www.instagram.com/p/C/": (404, b''),
+    "https://www.tiktok.com/@a/video/2": (429, b''),
+}
+
+
+def _collect(scraper, urls, **kwargs):
+    results = {}
+    for url, views in scraper.scrape_many(urls, **kwargs):
+        results[url] = (views, scraper.last_method if views is not None else scraper.last_failure)
+    return results
+
+
+def test_scrape_many():
+    """测试线程内解析和进程池解析得到相同结果"""
+
+    print("=" * 60)
+    print("测试并发爬取")
+    print("=" * 60)
+
+    expected = {
+        "https://www.instagram.com/p/A/": (1234, 'meta'),
+        "https://www.tiktok.com/@a/video/1": (777, 'sigi_state'),
+        "https://www.instagram.com/p/B/": (None, 'login_wall'),
+        "https://www.instagram.com/p/C/": (None, 'not_found'),
+        "https://www.tiktok.com/@a/video/2": (None, 'rate_limited'),
+        "https://example.com/x": (None, 'unsupported'),
+    }
+
+    scraper = ViewScraper(delay=0)
+    scraper.session = FakeSession(PAGES)
+
+    assert _collect(scraper, list(expected), fetch_workers=3, parse_workers=0) == expected
+    print("✅ 下载线程内解析")
+
+    assert _collect(scraper, list(expected), fetch_workers=3, parse_workers=1) == expected
+    print("✅ 解析进程池")
+
+    # 放行检查拒绝的链接不发请求
+    results = _collect(scraper, list(expected)[:2], fetch_workers=2, parse_workers=0,
+                       allow=lambda url: 'tiktok' not in url)
+    assert results["https://www.tiktok.com/@a/video/1"] == (None, 'deferred')
+    print("✅ 被拒绝的链接标记为 deferred")
+
+
+class BrokenPool:
+    """解析进程已被终止的进程池：提交时报错，或已提交的任务报错"""
+
+    instances = []
+
+    def __init__(self, fail_on_submit, **kwargs):
+        self.fail_on_submit = fail_on_submit
+        self.submitted = 0
+        self.closed = False
+        BrokenPool.instances.append(self)
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        if self.fail_on_submit:
+            raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+        future = Future()
+        future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.closed = True
+
+
+def test_broken_parse_pool():
+    """测试解析进程异常退出时改为线程内解析，不中断整批爬取"""
+
+    urls = ["https://www.instagram.com/p/A/", "https://www.tiktok.com/@a/video/1",
+            "https://www.instagram.com/p/B/"]
+    expected = {urls[0]: (1234, 'meta'), urls[1]: (777, 'sigi_state'), urls[2]: (None, 'login_wall')}
+
+    scraper = ViewScraper(delay=0)
+    scraper.session = FakeSession(PAGES)
+    original = view_scraper.ProcessPoolExecutor
+    try:
+        for fail_on_submit in (True, False):
+            BrokenPool.instances = []
+            view_scraper.ProcessPoolExecutor = lambda **kwargs: BrokenPool(fail_on_submit, **kwargs)
+            assert _collect(scraper, urls, fetch_workers=1, parse_workers=1) == expected
+            pool = BrokenPool.instances[0]
+            assert pool.closed
+            if fail_on_submit:
+                # 进程池损坏后不再使用
+                assert pool.submitted == 1
+    finally:
+        view_scraper.ProcessPoolExecutor = original
+    print("✅ 解析进程异常退出时改为线程内解析")
+
+
+if __name__ == "__main__":
+    test_scrape_many()
+    test_broken_parse_pool()
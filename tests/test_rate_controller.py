@@ -0,0 +1,101 @@
+"""
+测试自适应限速
+验证正常时加性提速、被拦截时乘性减速，以及按平台的并发名额
+"""
+
+import threading
+import time
+
+from rate_controller import RateController
+
+
+def test_aimd():
+    """测试加性增、乘性减和上下限"""
+
+    print("=" * 60)
+    print("测试自适应限速")
+    print("=" * 60)
+
+    controller = RateController(max_delay=2.0, min_delay=0.5, max_concurrency=4, increase_every=2,
+                                delay_step=0.5, state_file=None)
+    assert controller.delay('tiktok') == 2.0 and controller.concurrency('tiktok') == 1
+
+    for _ in range(10):
+        controller.record('tiktok', True, now=0)
+    assert controller.delay('tiktok') == 0.5 and controller.concurrency('tiktok') == 4
+    print("✅ 连续成功后逐步提速，不超过上下限")
+
+    # 视频级失败和偶发错误不加速也不减速
+    controller.record('tiktok', False, 'not_found', now=0)
+    controller.record('tiktok', False, 'http_error', now=0)
+    assert controller.concurrency('tiktok') == 4
+
+    controller.record('tiktok', False, 'rate_limited', now=100)
+    assert controller.delay('tiktok') == 1.0 and controller.concurrency('tiktok') == 2
+
+    # 同一批并发请求一起被拦截只减速一次
+    controller.record('tiktok', False, 'login_wall', now=100.5)
+    assert controller.concurrency('tiktok') == 2
+    controller.record('tiktok', False, 'timeout', now=102)
+    assert controller.delay('tiktok') == 2.0 and controller.concurrency('tiktok') == 1
+    controller.record('tiktok', False, 'timeout', now=110)
+    assert controller.delay('tiktok') == 2.0
+    print("✅ 被拦截时并发减半、间隔加倍，一批拦截只减速一次")
+
+    assert controller.concurrency('instagram') == 1
+    print("✅ 各平台分别调整")
+
+
+def test_no_data_not_success():
+    """测试没有播放量的响应（可能是软拦截）和视频级失败不会提速"""
+
+    controller = RateController(max_delay=2.0, min_delay=0.5, max_concurrency=4, increase_every=2,
+                                delay_step=0.5, state_file=None)
+    for failure in ['no_data', 'not_found', 'private'] * 5:
+        controller.record('instagram', False, failure, now=0)
+    assert controller.delay('instagram') == 2.0 and controller.concurrency('instagram') == 1
+
+    # no_data 打断连续正常结果
+    controller.record('instagram', True, now=0)
+    controller.record('instagram', False, 'no_data', now=0)
+    controller.record('instagram', True, now=0)
+    assert controller.concurrency('instagram') == 1
+    controller.record('instagram', True, now=0)
+    assert controller.concurrency('instagram') == 2
+    print("✅ 只有拿到播放量的请求计入提速，no_data 不提速并打断连续正常结果")
+
+
+def test_concurrency_slots():
+    """测试同一平台同时进行的请求数不超过允许的并发数"""
+
+    controller = RateController(max_concurrency=2, increase_every=1, state_file=None)
+    controller.record('instagram', True)
+    assert controller.concurrency('instagram') == 2
+
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def work():
+        controller.acquire('instagram')
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        controller.release('instagram')
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+    print("✅ 并发名额限制同一平台的同时请求数")
+
+
+if __name__ == "__main__":
+    test_aimd()
+    test_no_data_not_success()
+    test_concurrency_slots()
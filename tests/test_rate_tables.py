@@ -0,0 +1,119 @@
+"""
+测试结算费率表
+验证从配置文件加载费率表、按生效月份选用费率表、提成取整方式，以及多个方案一次计算与逐个方案计算相同
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from rate_tables import DEFAULT_TABLE, RateSchedule, RateTable, price_scenarios
+from utils import SettlementCalculator
+
+
+def test_load_schedule():
+    """测试加载配置文件和按月份选用费率表"""
+
+    print("=" * 60)
+    print("测试结算费率表")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_file = os.path.join(tmp, 'rate_tables.json')
+        schedule = RateSchedule.load(config_file)
+        assert [table.name for table in schedule.tables] == ['default'] and schedule.scenarios == {}
+        print("✅ 没有配置文件时使用默认费率")
+
+        with open(config_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'tables': [DEFAULT_TABLE,
+                           dict(DEFAULT_TABLE, name='2026', effective_from='2026-01',
+                                tiers=[{'name': 'Core UGC', 'labels': ['Core UGC'], 'base_pay': 25},
+                                       {'name': 'Discord UGC', 'labels': [], 'base_pay': 12}])],
+                'scenarios': {'up': dict(DEFAULT_TABLE, commission_rate=2)}
+            }, f)
+        schedule = RateSchedule.load(config_file)
+        assert schedule.table_for(2025, 12).name == 'default'
+        assert schedule.table_for(2026, 3).name == '2026'
+        assert schedule.scenarios['up'].name == 'up'
+        print("✅ 按生效月份选用费率表（后面的费率表优先）")
+
+        calculator = SettlementCalculator(rates=schedule)
+        assert calculator.calculate_settlement(2, 2500, 'Core UGC', 2025, 12)['total'] == 42
+        assert calculator.calculate_settlement(2, 2500, 'Core UGC', 2026, 1)['total'] == 52
+
+        with open(config_file, 'w', encoding='utf-8') as f:
+            f.write('{"tables": [')
+        try:
+            RateSchedule.load(config_file)
+            assert False, "配置文件无法解析时应报错"
+        except ValueError:
+            pass
+
+        only_2026 = RateSchedule([RateTable(dict(DEFAULT_TABLE, effective_from='2026-01'))])
+        try:
+            only_2026.table_for(2025, 12)
+            assert False, "没有覆盖该月份的费率表时应报错"
+        except ValueError:
+            pass
+        print("✅ 配置无效或没有适用的费率表时报错")
+
+
+def test_rounding_and_tiers():
+    """测试提成取整方式和标签匹配档位"""
+
+    views = np.array([0, 999, 1000, 1499, 1500, 2999])
+    expected = {
+        'floor': [0, 0, 1, 1, 1, 2],
+        'round': [0, 1, 1, 1, 2, 3],
+        'ceil': [0, 1, 1, 2, 2, 3],
+        'none': [0, 0.999, 1, 1.499, 1.5, 2.999]
+    }
+    for rounding, commission in expected.items():
+        table = RateTable(dict(DEFAULT_TABLE, rounding=rounding))
+        assert np.allclose(table.commission(views), commission), rounding
+    print("✅ 提成取整方式 floor / round / ceil / none")
+
+    table = RateTable(DEFAULT_TABLE)
+    assert list(table.tier_index(['Core UGC', 'coreugc', 'CoreUGC Team', 'discord ugc', '', None])) == [0, 0, 0, 1, 1, 1]
+    assert list(table.tier_index([])) == []
+    print("✅ 标签规范化后匹配档位，未匹配的标签使用默认档位")
+
+    for config in (dict(DEFAULT_TABLE, tiers=[]), dict(DEFAULT_TABLE, rounding='half'),
+                   dict(DEFAULT_TABLE, commission_unit=0), dict(DEFAULT_TABLE, effective_from='2026/01')):
+        try:
+            RateTable(config)
+            assert False, "费率表配置无效时应报错"
+        except ValueError:
+            pass
+
+
+def test_price_scenarios():
+    """测试多个方案一次计算与逐个方案计算相同"""
+
+    rng = np.random.default_rng(11)
+    video_count = rng.integers(1, 30, 200)
+    total_views = rng.integers(0, 500000, 200)
+    labels = rng.choice(['Core UGC', 'discord ugc', 'Premium', ''], 200)
+    scenarios = {
+        'default': RateTable(DEFAULT_TABLE),
+        'round': RateTable(dict(DEFAULT_TABLE, rounding='round', commission_unit=500, commission_rate=0.6)),
+        'three_tiers': RateTable(dict(DEFAULT_TABLE, rounding='none', tiers=[
+            {'name': 'Premium', 'labels': ['Premium'], 'base_pay': 40},
+            {'name': 'Core UGC', 'labels': ['Core UGC'], 'base_pay': 22},
+            {'name': 'Discord UGC', 'labels': [], 'base_pay': 10}]))
+    }
+
+    result = price_scenarios(video_count, total_views, labels, scenarios)
+    assert list(result.columns) == list(scenarios)
+    for name, table in scenarios.items():
+        assert np.allclose(result[name], table.price(video_count, total_views, labels)['total']), name
+    print("✅ 多个方案一次计算与逐个方案计算相同")
+
+
+if __name__ == "__main__":
+    test_load_schedule()
+    test_rounding_and_tiers()
+    test_price_scenarios()
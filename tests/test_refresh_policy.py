@@ -0,0 +1,149 @@
+"""
+测试刷新调度
+验证新视频每次刷新、增长放缓后间隔翻倍、已结算月份冻结
+"""
+
+from datetime import datetime
+
+from notion_integration import NotionIntegration
+from refresh_policy import RefreshPolicy
+from scrape_cache import ScrapeCache
+from url_canonical import URLCanonicalizer
+
+
+DAY = 86400
+
+
+def test_refresh_policy():
+    """测试刷新策略"""
+
+    print("=" * 60)
+    print("测试刷新调度")
+    print("=" * 60)
+
+    now = datetime(2025, 11, 20).timestamp()
+    policy = RefreshPolicy(history_file=None, settled_months=[(2025, 9)], fresh_days=7,
+                           base_interval_hours=12, max_interval_days=30)
+
+    # 新视频每次都刷新
+    new_video = {'id': 'new', 'name': '20251118-1'}
+    policy.record(new_video, 1000, now=now - 3600)
+    assert policy.is_due(new_video, now=now) == (True, 'fresh')
+    print("✅ 新视频每次都刷新")
+
+    # 已结算且已结束的月份冻结
+    assert policy.is_due({'id': 'old', 'name': '20250915'}, now=now) == (False, 'settled')
+    print("✅ 已结算月份冻结")
+
+    # 无法识别日期的照常刷新
+    assert policy.is_due({'id': 'x', 'name': 'Unknown'}, now=now)[0]
+    print("✅ 无日期视频照常刷新")
+
+    # 增长放缓后间隔翻倍
+    video = {'id': 'slow', 'name': '20251001'}
+    assert policy.is_due(video, now=now) == (True, 'no_history')
+    policy.record(video, 10000, now=now)
+    assert policy.is_due(video, now=now + 11 * 3600)[0] is False
+    assert policy.is_due(video, now=now + 13 * 3600)[0] is True
+
+    t = now + 13 * 3600
+    policy.record(video, 10001, now=t)
+    assert policy.history['slow']['slow_streak'] == 1
+    assert policy.is_due(video, now=t + 23 * 3600)[0] is False
+    assert policy.is_due(video, now=t + 25 * 3600)[0] is True
+    print("✅ 增长放缓后刷新间隔翻倍")
+
+    # 恢复增长后间隔复位
+    t += 25 * 3600
+    policy.record(video, 15000, now=t)
+    assert policy.history['slow']['slow_streak'] == 0
+    print("✅ 恢复增长后间隔复位")
+
+    print("\n✅ 所有测试通过！")
+
+
+
+class CountingScraper:
+    """每次返回更大播放量的假爬取器"""
+
+    def __init__(self):
+        self.calls = 0
+        self.last_method = None
+        self.last_failure = None
+
+    def scrape_views(self, url):
+        self.calls += 1
+        self.last_method = 'meta'
+        return 10000 * self.calls
+
+
+def test_cached_rows_not_recorded():
+    """测试缓存命中的行不记为新的观测，刷新间隔不会因此变长"""
+
+    notion = NotionIntegration("test-token")
+    notion.update_page_views = lambda page_id, field, views: None
+    policy = RefreshPolicy(history_file=None, base_interval_hours=12)
+    cache = ScrapeCache(cache_file=None, ttl_hours=48)
+    scraper = CountingScraper()
+    video = {'id': 'p1', 'name': '20250101', 'creator_id': 'c1', 'views_field': 'Views',
+             'links': ["https://www.tiktok.com/@a/video/1"]}
+
+    notion.update_videos([dict(video)], scraper, URLCanonicalizer(cache_file=None), cache=cache,
+                         refresh_policy=policy)
+    entry = policy.history['p1']
+    assert len(entry['observations']) == 1
+
+    # 到期后再次运行，缓存（有效期长于刷新间隔）仍然命中
+    for _ in range(3):
+        entry['next_due'] = 0
+        notion.update_videos([dict(video)], scraper, URLCanonicalizer(cache_file=None), cache=cache,
+                             refresh_policy=policy)
+    assert scraper.calls == 1
+    assert len(entry['observations']) == 1 and entry['slow_streak'] == 0
+    print("✅ 缓存命中的行不记为新的观测，刷新间隔不变长")
+
+
+class PartialScraper:
+    """第二个链接在第一次之后都失败的假爬取器"""
+
+    def __init__(self):
+        self.calls = 0
+        self.last_method = None
+        self.last_failure = None
+
+    def scrape_views(self, url):
+        self.calls += 1
+        if url.endswith('/2') and self.calls > 2:
+            self.last_method = None
+            self.last_failure = 'timeout'
+            return None
+        self.last_method = 'meta'
+        self.last_failure = None
+        return 10000 * self.calls
+
+
+def test_partial_rows_not_recorded():
+    """测试部分链接失败的行不记为新的观测（偏低的总播放量会被误判为增长放缓）"""
+
+    notion = NotionIntegration("test-token")
+    notion.update_page_views = lambda page_id, field, views: None
+    policy = RefreshPolicy(history_file=None, base_interval_hours=12)
+    scraper = PartialScraper()
+    video = {'id': 'p1', 'name': '20250101', 'creator_id': 'c1', 'views_field': 'Views',
+             'links': ["https://www.tiktok.com/@a/video/1", "https://www.tiktok.com/@a/video/2"]}
+
+    notion.update_videos([dict(video)], scraper, URLCanonicalizer(cache_file=None), refresh_policy=policy)
+    entry = policy.history['p1']
+    assert len(entry['observations']) == 1
+
+    entry['next_due'] = 0
+    notion.update_videos([dict(video)], scraper, URLCanonicalizer(cache_file=None), refresh_policy=policy)
+    assert scraper.calls == 4
+    assert len(entry['observations']) == 1 and entry['slow_streak'] == 0
+    print("✅ 部分链接失败的行不记为新的观测，刷新间隔不变长")
+
+
+if __name__ == "__main__":
+    test_refresh_policy()
+    test_cached_rows_not_recorded()
+    test_partial_rows_not_recorded()
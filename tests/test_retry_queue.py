@@ -0,0 +1,119 @@
+"""
+测试失败重试队列
+验证失败的行进入队列并按次数退避，已删除的视频不进入队列，重试模式只爬取队列中的行
+"""
+
+import os
+import tempfile
+
+from notion_integration import NotionIntegration
+from retry_queue import RetryQueue
+from url_canonical import URLCanonicalizer
+
+
+def test_retry_queue_backoff():
+    """测试尝试次数、退避时间和持久化"""
+
+    print("=" * 60)
+    print("测试重试队列")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue_file = os.path.join(tmp, 'retry_queue.json')
+        queue = RetryQueue(queue_file, base_delay_minutes=10, max_attempts=3)
+        video = {'id': 'p1', 'name': 'v1', 'links': ['https://x'], 'views_field': 'Views', 'creator_id': 'c1',
+                 'current_views': 5}
+
+        assert queue.add(video, {'https://x': 'timeout'}, now=0)
+        assert queue.due(now=599) == [] and len(queue.due(now=600)) == 1
+        assert queue.add(video, {'https://x': 'timeout'}, now=600)
+        assert queue.due(now=1799) == [] and len(queue.due(now=1800)) == 1
+        assert queue.due(now=0, force=True)[0]['name'] == 'v1'
+        print("✅ 每次失败后重试间隔翻倍")
+
+        queue.save()
+        reloaded = RetryQueue(queue_file)
+        assert reloaded.entries['p1']['attempts'] == 2
+        assert 'current_views' not in reloaded.entries['p1']['video']
+        print("✅ 队列保存到磁盘")
+
+        assert not queue.add(video, {'https://x': 'timeout'}, now=2000)
+        assert len(queue) == 0
+        print("✅ 超过最多尝试次数后移出队列")
+
+
+class FlakyScraper:
+    """指定的链接失败，其余成功的假爬取器"""
+
+    def __init__(self, failing):
+        self.failing = failing
+        self.calls = []
+        self.last_failure = None
+        self.last_method = None
+
+    def scrape_views(self, url):
+        self.calls.append(url)
+        if url in self.failing:
+            self.last_failure = self.failing[url]
+            return None
+        self.last_failure = None
+        self.last_method = 'meta'
+        return 100
+
+
+def test_retry_failed_rows():
+    """测试失败的行进入队列，重试模式只爬取队列中的行"""
+
+    notion = NotionIntegration("test-token")
+    written = {}
+    notion.update_page_views = lambda page_id, field, views: written.__setitem__(page_id, views)
+    notion.get_all_creators = lambda master_db_id: [{'id': 'c1', 'name': 'Creator', 'label': ''}]
+
+    links = {name: f"https://www.tiktok.com/@a/video/{idx}" for idx, name in enumerate(('ok', 'flaky', 'dead'))}
+    videos = [{'id': name, 'name': name, 'creator_id': 'c1', 'views_field': 'Views', 'links': [link]}
+              for name, link in links.items()]
+
+    queue = RetryQueue(queue_file=None)
+    scraper = FlakyScraper({links['flaky']: 'timeout', links['dead']: 'not_found'})
+    results = notion.update_videos(videos, scraper, URLCanonicalizer(cache_file=None), retry_queue=queue)
+    assert list(queue.entries) == ['flaky']
+    assert set(results['c1']['failed']) == {'flaky', 'dead'}
+    print("✅ 偶发失败的行进入队列，已删除的视频不进入")
+
+    scraper.failing = {}
+    scraper.calls = []
+    stats = notion.retry_failed_videos('master', scraper, queue, force=True)
+    assert scraper.calls == [links['flaky']]
+    assert written['flaky'] == 100 and stats['videos_updated'] == 1
+    assert len(queue) == 0
+    print("✅ 重试模式只爬取队列中的行，成功后移出队列")
+
+
+def test_partial_rows_queued():
+    """测试部分链接失败的行写回成功链接的播放量，失败的链接仍加入队列"""
+
+    notion = NotionIntegration("test-token")
+    written = {}
+    notion.update_page_views = lambda page_id, field, views: written.__setitem__(page_id, views)
+    notion.get_all_creators = lambda master_db_id: [{'id': 'c1', 'name': 'Creator', 'label': ''}]
+
+    links = ["https://www.tiktok.com/@a/video/1", "https://www.tiktok.com/@a/video/2"]
+    video = {'id': 'p1', 'name': 'p1', 'creator_id': 'c1', 'views_field': 'Views', 'links': links}
+
+    queue = RetryQueue(queue_file=None)
+    scraper = FlakyScraper({links[1]: 'timeout'})
+    notion.update_videos([dict(video)], scraper, URLCanonicalizer(cache_file=None), retry_queue=queue)
+    assert written['p1'] == 100
+    assert list(queue.entries) == ['p1'] and queue.entries['p1']['reasons'] == {links[1]: 'timeout'}
+    print("✅ 部分链接失败的行写回部分播放量，失败的链接加入队列")
+
+    scraper.failing = {}
+    notion.retry_failed_videos('master', scraper, queue, force=True)
+    assert written['p1'] == 200 and len(queue) == 0
+    print("✅ 重试成功后写回所有链接的播放量并移出队列")
+
+
+if __name__ == "__main__":
+    test_retry_queue_backoff()
+    test_retry_failed_rows()
+    test_partial_rows_queued()
@@ -0,0 +1,60 @@
+"""
+测试爬取结果缓存
+验证有效期、负缓存退避和崩溃后从文件恢复
+"""
+
+import os
+import tempfile
+
+from scrape_cache import ScrapeCache
+
+
+class FakeScraper:
+    """只提供 last_method / last_failure 的假爬取器"""
+
+    def __init__(self, method=None, failure=None):
+        self.last_method = method
+        self.last_failure = failure
+
+
+def test_scrape_cache():
+    """测试缓存读写"""
+
+    print("=" * 60)
+    print("测试爬取结果缓存")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, 'scrape_cache.jsonl')
+        cache = ScrapeCache(cache_file, ttl_hours=1, negative_ttl_hours=10)
+
+        # 成功结果在有效期内复用
+        cache.record('tiktok:1', 1500, FakeScraper(method='http:meta'), now=0)
+        assert cache.get('tiktok:1', now=1800)['views'] == 1500
+        assert cache.get('tiktok:1', now=3601) is None
+        print("✅ 有效期内复用，过期后重新爬取")
+
+        # 普通失败不缓存，不可用视频负缓存且退避翻倍
+        cache.record('tiktok:2', None, FakeScraper(failure='timeout'), now=0)
+        assert cache.get('tiktok:2', now=1) is None
+        cache.record('tiktok:3', None, FakeScraper(failure='not_found'), now=0)
+        assert cache.get('tiktok:3', now=9 * 3600)['status'] == 'dead'
+        assert cache.get('tiktok:3', now=11 * 3600) is None
+        cache.record('tiktok:3', None, FakeScraper(failure='not_found'), now=11 * 3600)
+        assert cache.get('tiktok:3', now=29 * 3600)['strikes'] == 2
+        print("✅ 不可用视频负缓存，连续不可用时退避翻倍")
+
+        # 重新加载（模拟崩溃后重启）
+        reloaded = ScrapeCache(cache_file, ttl_hours=1, negative_ttl_hours=10)
+        assert reloaded.get('tiktok:1', now=1800)['method'] == 'http:meta'
+        assert reloaded.get('tiktok:3', now=29 * 3600)['strikes'] == 2
+
+        # 压缩后只保留最新记录
+        reloaded.compact()
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            assert len(f.readlines()) == 2
+        print("✅ 重启后从文件恢复，压缩后每个链接只保留一条")
+
+
+if __name__ == "__main__":
+    test_scrape_cache()
@@ -0,0 +1,55 @@
+"""
+测试爬取指标
+验证直方图、方法计数、失败分类、分位数以及JSON/Prometheus导出
+"""
+
+import json
+import os
+import tempfile
+
+from scrape_metrics import ScrapeMetrics
+
+
+def test_scrape_metrics():
+    """测试指标记录和导出"""
+
+    print("=" * 60)
+    print("测试爬取指标")
+    print("=" * 60)
+
+    metrics = ScrapeMetrics()
+    for seconds in (0.1, 0.3, 0.6, 1.5, 3.0):
+        metrics.record('tiktok', 'http', seconds, 100, method='rehydration', bytes_downloaded=1000, status_code=200)
+    metrics.record('tiktok', 'http', 16.0, None, failure='timeout')
+    metrics.record('instagram', 'http', 0.2, None, failure='http_error', status_code=503)
+    metrics.record('instagram', 'browser', 5.0, 42, method='network:api', bytes_downloaded=2048)
+
+    snapshot = metrics.snapshot()
+    tiktok = snapshot['tiktok:http']
+    assert tiktok['requests'] == 6 and tiktok['success'] == 5
+    assert tiktok['methods'] == {'rehydration': 5}
+    assert tiktok['failures'] == {'timeout': 1}
+    assert tiktok['bytes'] == 5000
+    assert tiktok['latency']['buckets'][:4] == [1, 1, 1, 1]
+    assert tiktok['p50'] == 1.5 and tiktok['p95'] == 16.0
+    assert snapshot['instagram:http']['status_codes'] == {'503': 1}
+    json.dumps(snapshot)
+    print("✅ 直方图、方法计数、失败分类和分位数")
+
+    text = metrics.to_prometheus()
+    assert 'scraper_requests_total{platform="tiktok",tier="http",outcome="success"} 5' in text
+    assert 'scraper_latency_seconds_bucket{platform="tiktok",tier="http",le="+Inf"} 6' in text
+    assert 'scraper_latency_seconds_bucket{platform="tiktok",tier="http",le="1.0"} 3' in text
+    assert 'scraper_failures_total{platform="instagram",tier="http",reason="http_error"} 1' in text
+    assert 'scraper_method_total{platform="instagram",tier="browser",method="network:api"} 1' in text
+    print("✅ Prometheus文本格式")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_file = os.path.join(tmp, 'metrics.json')
+        metrics.save(json_file, os.path.join(tmp, 'metrics.prom'))
+        assert ScrapeMetrics.load_snapshot(json_file)['tiktok:http']['success'] == 5
+    print("✅ 保存和读取快照")
+
+
+if __name__ == "__main__":
+    test_scrape_metrics()
@@ -0,0 +1,147 @@
+"""
+测试批量结算计算
+验证按DataFrame分组计算的月度结算与逐个创作者、逐个视频计算的结果完全相同，多个月一次计算与逐月计算相同
+"""
+
+import random
+import time
+
+import pandas as pd
+
+from utils import SettlementCalculator, VideoIndex, cached_video_date, parse_video_date
+
+
+TITLES = ['20251114', '20251114-2', '20251130_01', '20251101a', '2025-11-03', '2025/11/09', '2025.11.21',
+          '20251014', '20251201-1', '20251131', 'invalid', '', '2025', None, 20251114, '２０２５１１１４']
+LABELS = ['Core UGC', 'coreugc', 'discord ugc', '', 'CoreUGC Team', None]
+
+
+def reference_settlement(creators_data, year, month):
+    """逐个创作者、逐个视频按默认费率计算（原来的实现）"""
+    settlements = []
+    for creator in creators_data:
+        monthly_videos = []
+        for video in creator.get('videos', []):
+            try:
+                video_date = parse_video_date(video.get('date', ''))
+                if video_date and video_date.year == year and video_date.month == month:
+                    monthly_videos.append(video)
+            except:
+                continue
+        if monthly_videos:
+            total_views = sum(v.get('views', 0) for v in monthly_videos)
+            is_large_ugc = 'coreugc' in (creator.get('label', '') or '').lower().replace(' ', '')
+            base_pay = len(monthly_videos) * (20 if is_large_ugc else 10)
+            commission = int(total_views / 1000)
+            settlement = {
+                'video_count': len(monthly_videos),
+                'total_views': total_views,
+                'base_pay': base_pay,
+                'commission': commission,
+                'total': base_pay + commission,
+                'ugc_type': 'Core UGC ($20/video)' if is_large_ugc else 'Discord UGC ($10/video)',
+                'label': creator.get('label', '')
+            }
+            settlement['creator'] = creator.get('name', 'Unknown')
+            settlement['year'] = year
+            settlement['month'] = month
+            settlements.append(settlement)
+    if not settlements:
+        return pd.DataFrame()
+    return pd.DataFrame(settlements)[['creator', 'label', 'ugc_type', 'video_count', 'total_views',
+                                      'base_pay', 'commission', 'total', 'year', 'month']]
+
+
+def make_creators(count, videos_per_creator, seed=7):
+    """随机生成创作者数据（包含同名创作者、各种标题格式和标签）"""
+    rng = random.Random(seed)
+    return [{
+        'name': f"creator{idx % (count - 1)}",
+        'label': rng.choice(LABELS),
+        'videos': [{'date': rng.choice(TITLES), 'views': rng.randint(0, 50000)}
+                   for _ in range(rng.randint(0, videos_per_creator))]
+    } for idx in range(count)]
+
+
+def test_matches_reference():
+    """测试批量计算与逐行计算结果相同"""
+
+    print("=" * 60)
+    print("测试批量结算计算")
+    print("=" * 60)
+
+    calculator = SettlementCalculator()
+    creators = make_creators(40, 12)
+    for year, month in ((2025, 11), (2025, 10), (2025, 12), (2024, 1)):
+        expected = reference_settlement(creators, year, month)
+        actual = calculator.calculate_monthly_settlement(creators, year, month)
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected)
+    print("✅ 与逐行计算的结果完全相同（包括同名创作者和各种日期格式）")
+
+    assert calculator.calculate_monthly_settlement([], 2025, 11).empty
+    assert calculator.calculate_monthly_settlement([{'name': 'a', 'label': '', 'videos': []}], 2025, 11).empty
+
+    for value in TITLES + ['20250229', '20240229-3', '20251301', '00001114', '2025-1-5']:
+        if isinstance(value, str):
+            assert cached_video_date(value) == parse_video_date(value), value
+    print("✅ 快速日期解析与 parse_video_date 相同")
+
+
+def test_video_index():
+    """测试按月份索引视频行，无法识别日期的标题只报告一次"""
+
+    creators = [{'name': 'a', 'label': 'Core UGC', 'videos': [
+        {'date': '20251114-1', 'views': 100}, {'date': '20251201', 'views': 5}, {'date': 'draft', 'views': 7}]}]
+    index = VideoIndex.from_creators_data(creators)
+    assert index.months() == [(2025, 11), (2025, 12)]
+    assert list(index.month_frame(2025, 11)['views']) == [100]
+    assert index.month_frame(2025, 10).empty
+    assert index.unparsed == {'draft': 'a'}
+    assert index.add_creator('b', '', [{'date': 'draft', 'views': 1}, {'date': 'todo', 'views': 1}]) == ['todo']
+    print("✅ 按月份直接取行，无法识别日期的标题只报告一次")
+
+    calculator = SettlementCalculator()
+    creators = make_creators(30, 15, seed=5)
+    index = VideoIndex.from_creators_data(creators)
+    pd.testing.assert_frame_equal(calculator.calculate_monthly_settlement(index, 2025, 11),
+                                  calculator.calculate_monthly_settlement(creators, 2025, 11))
+
+
+def test_range_settlement():
+    """测试一次计算多个月与逐月计算相同"""
+
+    calculator = SettlementCalculator()
+    creators = make_creators(30, 15, seed=3)
+    settlements = calculator.calculate_range_settlement(creators, 2025, 10, 2026, 1)
+    assert list(settlements) == [(2025, 10), (2025, 11), (2025, 12), (2026, 1)]
+    for (year, month), settlement in settlements.items():
+        expected = calculator.calculate_monthly_settlement(creators, year, month)
+        if expected.empty:
+            assert settlement.empty
+        else:
+            pd.testing.assert_frame_equal(settlement, expected)
+    assert settlements[(2026, 1)].empty
+    assert calculator.calculate_range_settlement(creators, 2025, 11, 2025, 10) == {}
+    print("✅ 一次读取计算范围内每个月的结算，与逐月计算相同")
+
+
+def test_large_history():
+    """测试大量视频时的耗时：索引只建立一次，之后每个月的结算直接查表"""
+
+    calculator = SettlementCalculator()
+    creators = make_creators(500, 400)
+    started = time.perf_counter()
+    index = VideoIndex.from_creators_data(creators)
+    built = time.perf_counter()
+    settlement = calculator.calculate_monthly_settlement(index, 2025, 11)
+    elapsed = time.perf_counter() - built
+    assert len(settlement) > 0
+    print(f"✅ {sum(len(c['videos']) for c in creators):,} 个视频：建立索引 {(built - started) * 1000:.0f} ms，"
+          f"月度结算 {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    test_matches_reference()
+    test_video_index()
+    test_range_settlement()
+    test_large_history()
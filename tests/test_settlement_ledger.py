@@ -0,0 +1,113 @@
+"""
+测试结算汇总
+验证写回播放量时按差值更新按月汇总，同步Notion时处理新增、修改和删除的行，
+并且按汇总计算的结算与从所有视频重新计算的结算完全相同
+"""
+
+import os
+import random
+import tempfile
+
+import pandas as pd
+
+from settlement_ledger import SettlementLedger
+from utils import SettlementCalculator
+
+
+def test_record_deltas():
+    """测试按差值更新汇总"""
+
+    print("=" * 60)
+    print("测试结算汇总")
+    print("=" * 60)
+
+    ledger = SettlementLedger(ledger_file=None)
+    ledger.set_creators([{'id': 'c1', 'name': 'Alice', 'label': 'Core UGC'}])
+
+    video = {'id': 'p1', 'name': '20251114-1', 'creator_id': 'c1'}
+    assert ledger.record(video, 1000) == 1000
+    assert ledger.record(video, 1500) == 500
+    assert ledger.record(video, 1500) == 0
+    assert ledger.months['2025-11']['c1'] == {'video_count': 1, 'total_views': 1500}
+    print("✅ 新的行计入视频数，之后只加上播放量的差值")
+
+    # 标题改成了另一个月份
+    assert ledger.record({'id': 'p1', 'name': '20251201', 'creator_id': 'c1'}, 1600) == 1600
+    assert '2025-11' not in ledger.months
+    assert ledger.months['2025-12']['c1'] == {'video_count': 1, 'total_views': 1600}
+
+    # 标题无法识别日期的行不计入汇总
+    assert ledger.record({'id': 'p1', 'name': 'draft', 'creator_id': 'c1'}, 1700) == 0
+    assert ledger.months == {} and len(ledger) == 0
+    print("✅ 标题改了月份的行移到新月份，无法识别日期的行移出汇总")
+
+
+def test_sync_and_persist():
+    """测试同步Notion中的当前播放量和保存加载"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger_file = os.path.join(tmp, 'settlement_ledger.json')
+        ledger = SettlementLedger(ledger_file=ledger_file)
+        ledger.set_creators([{'id': 'c1', 'name': 'Alice', 'label': 'Core UGC'},
+                             {'id': 'c2', 'name': 'Bob', 'label': ''}])
+        videos = [{'id': 'p1', 'name': '20251101', 'creator_id': 'c1', 'current_views': 100},
+                  {'id': 'p2', 'name': '20251102', 'creator_id': 'c1', 'current_views': 200},
+                  {'id': 'p3', 'name': '20251103', 'creator_id': 'c2', 'current_views': 300}]
+        ledger.sync(videos)
+        ledger.record(videos[0], 5000)
+        ledger.save()
+
+        ledger = SettlementLedger(ledger_file=ledger_file)
+        assert ledger.months['2025-11']['c1'] == {'video_count': 2, 'total_views': 5200}
+
+        # Notion中手动修改了 p2，删除了 p3
+        videos[0]['current_views'] = 5000
+        videos[1]['current_views'] = 250
+        ledger.sync(videos[:2], complete=True)
+        assert ledger.months['2025-11'] == {'c1': {'video_count': 2, 'total_views': 5250}}
+        print("✅ 按Notion中的播放量同步：手动修改按差值更新，完整读取时删除已不存在的行")
+
+        frame = ledger.month_frame(2025, 11)
+        assert list(frame['creator']) == ['Alice'] and list(frame['total_views']) == [5250]
+        assert ledger.month_frame(2025, 10).empty
+
+
+def test_matches_full_settlement():
+    """测试按汇总计算的结算与从所有视频重新计算的结算相同"""
+
+    rng = random.Random(13)
+    creators = [{'id': f"c{idx}", 'name': f"creator{idx % 7}", 'label': rng.choice(['Core UGC', 'discord ugc', ''])}
+                for idx in range(10)]
+    titles = ['20251103', '20251114-2', '20251130_01', '20251201', '2025-11-09', 'draft']
+    videos = [{'id': f"p{idx}", 'name': rng.choice(titles), 'creator_id': rng.choice(creators)['id'],
+               'current_views': rng.randint(0, 20000)} for idx in range(300)]
+
+    ledger = SettlementLedger(ledger_file=None)
+    ledger.set_creators(creators)
+    ledger.sync(videos)
+
+    # 多轮批量更新，每次写回一部分行的新播放量
+    for _ in range(5):
+        for video in rng.sample(videos, 60):
+            video['current_views'] += rng.randint(0, 5000)
+            ledger.record(video, video['current_views'])
+
+    calculator = SettlementCalculator()
+    creators_data = [{'name': creator['name'], 'label': creator['label'],
+                      'videos': [{'date': video['name'], 'views': video['current_views']}
+                                 for video in videos if video['creator_id'] == creator['id']]}
+                     for creator in creators]
+    for year, month in ((2025, 11), (2025, 12), (2025, 10)):
+        expected = calculator.calculate_monthly_settlement(creators_data, year, month)
+        actual = calculator.calculate_live_settlement(ledger, year, month)
+        if expected.empty:
+            assert actual.empty
+        else:
+            pd.testing.assert_frame_equal(actual, expected)
+    print("✅ 按汇总计算的实时结算与从所有视频重新计算的结算完全相同")
+
+
+if __name__ == "__main__":
+    test_record_deltas()
+    test_sync_and_persist()
+    test_matches_full_settlement()
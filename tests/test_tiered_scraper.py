@@ -0,0 +1,237 @@
+"""
+测试分级爬取
+验证HTTP优先、失败升级浏览器，以及难爬链接直接走浏览器
+"""
+
+from tiered_scraper import TieredScraper
+from view_scraper import ViewScraper
+
+
+class FakeScraper:
+    """记录调用次数的假爬取器"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+        self.closed = False
+        self.last_method = 'meta'
+        self.last_failure = None if result is not None else 'no_data'
+
+    def identify_platform(self, url):
+        return ViewScraper().identify_platform(url)
+
+    def scrape_views(self, url):
+        self.calls.append(url)
+        return self.result
+
+    def close(self):
+        self.closed = True
+
+
+def test_tiered_scraper():
+    """测试分级爬取逻辑"""
+
+    print("=" * 60)
+    print("测试分级爬取")
+    print("=" * 60)
+
+    # HTTP成功时不启动浏览器
+    fast = FakeScraper(1234)
+    browser = FakeScraper(999)
+    scraper = TieredScraper(fast, browser, state_file=None)
+    assert scraper.scrape_views("https://www.instagram.com/reel/abc/") == 1234
+    assert browser.calls == []
+    print("✅ HTTP成功时不启动浏览器")
+
+    # HTTP失败时升级到浏览器
+    fast = FakeScraper(None)
+    browser = FakeScraper(999)
+    scraper = TieredScraper(fast, browser, state_file=None, min_samples=3, reprobe_interval=5)
+    assert scraper.scrape_views("https://www.tiktok.com/t/ZTabc/") == 999
+    assert len(fast.calls) == 1 and len(browser.calls) == 1
+    print("✅ HTTP失败时升级到浏览器")
+
+    # 连续失败后，同模式链接直接走浏览器
+    for i in range(2):
+        scraper.scrape_views(f"https://www.tiktok.com/t/ZT{i}/")
+    assert len(fast.calls) == 3
+    scraper.scrape_views("https://www.tiktok.com/t/ZTnext/")
+    assert len(fast.calls) == 3
+    assert len(browser.calls) == 4
+    print("✅ 已知难爬的链接直接走浏览器")
+
+    # 其他模式不受影响
+    scraper.scrape_views("https://www.tiktok.com/@user/video/123")
+    assert len(fast.calls) == 4
+    assert scraper.pattern_key("https://www.tiktok.com/@user/video/123") == "tiktok:video"
+    assert scraper.pattern_key("https://vm.tiktok.com/ZMabc/") == "tiktok:short"
+    print("✅ 按平台和链接模式分别记录")
+
+    # 达到重试间隔后重新试一次HTTP（上面已跳过1次）
+    for i in range(4):
+        scraper.scrape_views(f"https://www.tiktok.com/t/ZR{i}/")
+    assert len(fast.calls) == 4
+    scraper.scrape_views("https://www.tiktok.com/t/ZRprobe/")
+    assert len(fast.calls) == 5
+    print("✅ 定期重新试探HTTP")
+
+    scraper.close()
+    assert browser.closed and fast.closed
+    print("\n✅ 所有测试通过！")
+
+
+class FakeBatchScraper(FakeScraper):
+    """支持 scrape_many 的假爬取器，按链接返回不同结果"""
+
+    def __init__(self, results):
+        super().__init__(None)
+        self.results = results
+        self.batches = []
+
+    def scrape_many(self, urls, fetch_workers=4, parse_workers=None, allow=None, **kwargs):
+        self.batches.append(list(urls))
+        for url in urls:
+            if allow is not None and not allow(url):
+                self.last_method, self.last_failure = None, 'deferred'
+                yield url, None
+                continue
+            views, note = self.results[url]
+            self.last_method = note if views is not None else None
+            self.last_failure = None if views is not None else note
+            yield url, views
+
+
+def test_tiered_scrape_many():
+    """测试并发分级爬取：HTTP失败的链接一起交给浏览器批量爬取"""
+
+    print("=" * 60)
+    print("测试并发分级爬取")
+    print("=" * 60)
+
+    ok = "https://www.tiktok.com/@a/video/1"
+    walled = "https://www.instagram.com/p/A/"
+    limited = "https://www.instagram.com/p/B/"
+    blocked = "https://www.tiktok.com/@a/video/2"
+
+    fast = FakeBatchScraper({ok: (100, 'meta'), walled: (None, 'login_wall'), limited: (None, 'rate_limited')})
+    browser = FakeBatchScraper({walled: (200, 'network:api')})
+    scraper = TieredScraper(fast, browser, state_file=None)
+
+    results = {}
+    for url, views in scraper.scrape_many([ok, walled, limited, blocked], allow=lambda url: url != blocked):
+        results[url] = (views, scraper.last_method, scraper.last_failure)
+
+    assert results[ok] == (100, 'http:meta', None)
+    assert results[walled] == (200, 'browser:network:api', None)
+    assert results[limited] == (None, None, 'rate_limited')
+    assert results[blocked] == (None, None, 'deferred')
+    assert browser.batches == [[walled]]
+    print("✅ 只有HTTP被拦的链接交给浏览器，限流和被熔断的链接不升级")
+
+
+class SessionScraper(FakeBatchScraper):
+    """没有浏览器会话时返回同意弹窗，导入会话后成功的假HTTP爬取器"""
+
+    def __init__(self, results):
+        super().__init__(results)
+        self.imported = []
+
+    def scrape_views(self, url):
+        self.calls.append(url)
+        views, note = self.results[url]
+        self.last_method = note if views is not None else None
+        self.last_failure = None if views is not None else note
+        return views
+
+    def import_session(self, platform, browser_session):
+        self.imported.append(platform)
+        self.results = {url: (views, note) if views is not None else (5, 'meta')
+                        for url, (views, note) in self.results.items()}
+
+
+class SessionBrowser(FakeBatchScraper):
+    """可以导出会话的假浏览器爬取器"""
+
+    def __init__(self):
+        super().__init__({})
+        self.exported = []
+
+    def export_session(self, platform):
+        self.exported.append(platform)
+        return {'cookies': [{'name': 'consent', 'value': '1'}], 'user_agent': 'Chrome'}
+
+
+def test_session_handoff():
+    """测试HTTP被同意弹窗拦住时导入浏览器会话后用HTTP重试，不渲染页面"""
+
+    print("=" * 60)
+    print("测试浏览器会话交给HTTP")
+    print("=" * 60)
+
+    urls = [f"https://www.instagram.com/p/C{i}/" for i in range(3)]
+    fast = SessionScraper({url: (None, 'consent_wall') for url in urls})
+    browser = SessionBrowser()
+    scraper = TieredScraper(fast, browser, state_file=None)
+
+    results = {url: (views, scraper.last_method) for url, views in scraper.scrape_many(urls)}
+    assert results == {url: (5, 'http:meta') for url in urls}
+    assert browser.exported == ['instagram'] and browser.batches == []
+    print("✅ 每个平台只导出一次会话，所有链接通过HTTP完成")
+
+    # 冷却期内不再导出，仍然失败的链接升级到浏览器
+    fast.results[urls[0]] = (None, 'consent_wall')
+    assert scraper.scrape_views(urls[0]) is None
+    assert browser.exported == ['instagram'] and browser.calls == [urls[0]]
+    print("✅ 冷却期内HTTP仍失败时直接升级到浏览器")
+
+
+def test_dead_videos_not_escalated():
+    """测试HTTP确定视频已删除/私密时不升级到浏览器"""
+
+    deleted = "https://www.tiktok.com/@a/video/404"
+    private = "https://www.instagram.com/p/PRIVATE/"
+
+    fast = FakeBatchScraper({deleted: (None, 'not_found'), private: (None, 'private')})
+    browser = FakeBatchScraper({})
+    scraper = TieredScraper(fast, browser, state_file=None)
+    results = {url: (views, scraper.last_failure) for url, views in scraper.scrape_many([deleted, private])}
+    assert results == {deleted: (None, 'not_found'), private: (None, 'private')}
+    assert browser.batches == [] and browser.calls == []
+
+    for url, failure in ((deleted, 'not_found'), (private, 'private')):
+        fast.last_failure = failure
+        fast.scrape_views = lambda url: None
+        assert scraper.scrape_views(url) is None and scraper.last_failure == failure
+    assert browser.calls == []
+    assert scraper.tier_stats[scraper.pattern_key(deleted)]['http_fail'] == 0
+    print("✅ 已删除/私密的视频不升级到浏览器，结果交给负缓存")
+
+
+def test_http_recovers():
+    """测试大量历史失败后，平台恢复时几次重新试探成功就回到HTTP"""
+
+    fast = FakeScraper(None)
+    browser = FakeScraper(999)
+    scraper = TieredScraper(fast, browser, state_file=None, reprobe_interval=5)
+    # 旧的记录文件没有衰减后的成功率，按累计次数开始
+    scraper.tier_stats['tiktok:t'] = {'http_success': 0, 'http_fail': 1000, 'browser_success': 1000,
+                                      'browser_fail': 0, 'skipped': 0}
+
+    fast.result, fast.last_failure = 1234, None
+    for i in range(5):
+        scraper.scrape_views(f"https://www.tiktok.com/t/ZT{i}/")
+    assert fast.calls == []
+    assert scraper.scrape_views("https://www.tiktok.com/t/ZTprobe/") == 1234
+    assert len(fast.calls) == 1
+
+    scraper.scrape_views("https://www.tiktok.com/t/ZTnext/")
+    assert len(fast.calls) == 2 and len(browser.calls) == 5
+    print("✅ 历史失败很多时，重新试探成功后立即回到HTTP")
+
+
+if __name__ == "__main__":
+    test_tiered_scraper()
+    test_tiered_scrape_many()
+    test_session_handoff()
+    test_dead_videos_not_escalated()
+    test_http_recovers()
@@ -0,0 +1,89 @@
+"""
+测试链接规范化和整批去重
+验证跟踪参数、/reel/ 与 /p/、TikTok短链接都能归并到同一个视频
+"""
+
+from url_canonical import URLCanonicalizer
+from notion_integration import NotionIntegration
+
+
+class CountingScraper:
+    """记录每个链接被爬取次数的假爬取器"""
+
+    def __init__(self, views):
+        self.views = views
+        self.calls = []
+
+    def scrape_views(self, url):
+        self.calls.append(url)
+        return self.views.get(url)
+
+
+def test_canonicalize():
+    """测试链接规范化"""
+
+    print("=" * 60)
+    print("测试链接规范化")
+    print("=" * 60)
+
+    resolved = []
+
+    def fake_resolver(url):
+        resolved.append(url)
+        return "https://www.tiktok.com/@sora/video/7311111111111111111?_r=1"
+
+    canonicalizer = URLCanonicalizer(cache_file=None, resolver=fake_resolver)
+
+    reel = canonicalizer.canonicalize("https://www.instagram.com/reel/DRD0cSOiecS/?igsh=MzRlODBiNWFlZA==")
+    post = canonicalizer.canonicalize("https://instagram.com/p/DRD0cSOiecS")
+    assert reel['key'] == post['key'] == "instagram:DRD0cSOiecS"
+    assert reel['url'] == "https://www.instagram.com/p/DRD0cSOiecS/"
+    print(f"✅ Instagram: {reel['key']}")
+
+    full = canonicalizer.canonicalize("https://www.tiktok.com/@sora/video/7311111111111111111?is_from_webapp=1")
+    short = canonicalizer.canonicalize("https://www.tiktok.com/t/ZTMTXDrt7/")
+    again = canonicalizer.canonicalize("https://www.tiktok.com/t/ZTMTXDrt7/?share=1")
+    assert full['key'] == short['key'] == again['key'] == "tiktok:7311111111111111111"
+    assert full['url'] == "https://www.tiktok.com/@sora/video/7311111111111111111"
+    assert len(resolved) == 1
+    print(f"✅ TikTok: {full['key']} (短链接只解析一次)")
+
+    unknown = canonicalizer.canonicalize("https://youtube.com/shorts/abc")
+    assert unknown['platform'] == 'unknown'
+    print("✅ 未知平台原样保留")
+
+
+def test_batch_dedupe():
+    """测试整批去重后结果分发到每一行"""
+
+    print("=" * 60)
+    print("测试整批去重")
+    print("=" * 60)
+
+    notion = NotionIntegration("test-token")
+    written = {}
+    notion.update_page_views = lambda page_id, field, views: written.__setitem__(page_id, views)
+
+    videos = [
+        {'id': 'row1', 'name': '20251114', 'creator_id': 'c1', 'views_field': 'Views',
+         'links': ["https://www.instagram.com/reel/ABC/?igsh=1", "https://www.instagram.com/p/ABC/"]},
+        {'id': 'row2', 'name': '20251115', 'creator_id': 'c2', 'views_field': 'Views',
+         'links': ["https://www.instagram.com/reel/ABC/", "https://www.tiktok.com/@a/video/1"]},
+    ]
+    scraper = CountingScraper({
+        "https://www.instagram.com/p/ABC/": 1000,
+        "https://www.tiktok.com/@a/video/1": 500,
+    })
+
+    results = notion.update_videos(videos, scraper, URLCanonicalizer(cache_file=None))
+
+    assert len(scraper.calls) == 2
+    assert written == {'row1': 1000, 'row2': 1500}
+    assert results['c1']['videos_updated'] == 1
+    assert results['c2']['total_views'] == 1500
+    print(f"✅ 4个链接只爬取 {len(scraper.calls)} 次，结果写回 {len(written)} 行")
+
+
+if __name__ == "__main__":
+    test_canonicalize()
+    test_batch_dedupe()